@@ -0,0 +1,127 @@
+"""Compressed storage for large text bodies
+
+Shared contexts and notes can hold whole pages or documents. Bodies longer
+than BODY_COMPRESS_THRESHOLD characters are stored as zlib-compressed binary
+in `<field>_z` and `<field>` keeps only a short preview, so list queries that
+project the blob out read and send previews only. The full text is inflated
+on demand for detail views, exports and AI use.
+
+Documents written before compression existed keep their inline body and are
+still read correctly. To compact them:
+
+    python -m database.compression
+"""
+import asyncio
+import os
+import sys
+import zlib
+from typing import Dict
+
+from bson import Binary
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Bodies longer than this many characters are compressed out of the main field
+BODY_COMPRESS_THRESHOLD = int(os.getenv("BODY_COMPRESS_THRESHOLD", "4096"))
+
+# Characters of a compressed body kept inline as its preview
+BODY_PREVIEW_CHARS = 500
+
+COMPRESSION_LEVEL = 6
+
+# Collections and fields holding compressible bodies
+COMPRESSED_BODIES = {
+    "shared_contexts": "content",
+    "notes": "content",
+}
+
+
+def pack_body(text: str, field: str = "content") -> Dict:
+    """Fields to store for a body: inline when small, preview + compressed blob when large"""
+    text = text or ""
+    if len(text) <= BODY_COMPRESS_THRESHOLD:
+        return {field: text, f"{field}_length": len(text)}
+
+    return {
+        field: text[:BODY_PREVIEW_CHARS],
+        f"{field}_z": Binary(zlib.compress(text.encode("utf-8"), COMPRESSION_LEVEL)),
+        f"{field}_length": len(text)
+    }
+
+
+def body_update(text: str, field: str = "content") -> Dict:
+    """$set / $unset operators replacing a stored body, dropping a stale blob"""
+    packed = pack_body(text, field)
+    update = {"$set": packed}
+    if f"{field}_z" not in packed:
+        update["$unset"] = {f"{field}_z": ""}
+    return update
+
+
+def unpack_body(doc: Dict, field: str = "content") -> str:
+    """Full text of a stored body"""
+    blob = doc.get(f"{field}_z")
+    if blob is None:
+        return doc.get(field) or ""
+    return zlib.decompress(blob).decode("utf-8")
+
+
+def inflate_body(doc: Dict, field: str = "content") -> Dict:
+    """Replace the preview with the full text and drop the blob (in place)"""
+    doc[field] = unpack_body(doc, field)
+    doc.pop(f"{field}_z", None)
+    return doc
+
+
+def is_truncated(doc: Dict, field: str = "content") -> bool:
+    """Whether the document holds only a preview of its body"""
+    return doc.get(f"{field}_length", 0) > len(doc.get(field) or "")
+
+
+def preview_projection(field: str = "content") -> Dict:
+    """Projection for list queries: everything except the compressed blob"""
+    return {f"{field}_z": 0}
+
+
+async def compact_collection(collection, field: str = "content") -> int:
+    """Compress inline bodies over the threshold; returns the number rewritten"""
+    from pymongo import UpdateOne
+
+    cursor = collection.find(
+        {
+            f"{field}_z": {"$exists": False},
+            "$expr": {"$gt": [{"$strLenCP": {"$ifNull": [f"${field}", ""]}}, BODY_COMPRESS_THRESHOLD]}
+        },
+        {field: 1}
+    )
+
+    compacted = 0
+    batch = []
+    async for doc in cursor.batch_size(100):
+        batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": pack_body(doc[field], field)}))
+        if len(batch) >= 100:
+            compacted += (await collection.bulk_write(batch, ordered=False)).modified_count
+            batch = []
+    if batch:
+        compacted += (await collection.bulk_write(batch, ordered=False)).modified_count
+    return compacted
+
+
+async def _main() -> int:
+    from database.mongodb import MONGODB_URL, DATABASE_NAME
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(MONGODB_URL)
+    database = client[DATABASE_NAME]
+    try:
+        for collection_name, field in COMPRESSED_BODIES.items():
+            compacted = await compact_collection(database[collection_name], field)
+            print(f"✅ {collection_name}: compressed {compacted} large {field} bodies")
+        return 0
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main()))
@@ -34,6 +34,8 @@ class Group(BaseModel):
     created_by: str  # user_id
     members: List[GroupMember] = []
     invite_code: str  # Unique code to join group
+    member_count: int = 0  # Denormalized len(members), maintained with $inc
+    context_count: int = 0  # Denormalized shared_contexts count, maintained with $inc
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     is_active: bool = True
@@ -83,3 +85,5 @@ class GetGroupContextRequest(BaseModel):
     group_id: str
     query: Optional[str] = None  # Optional search query to filter context
     limit: int = 50
+    cursor: Optional[str] = None  # next_cursor from the previous page
+    since: Optional[str] = None  # sync_cursor from the previous response (delta sync)
@@ -0,0 +1,260 @@
+"""Declarative index registry for all MongoDB collections
+
+Every index the API relies on is listed in INDEX_REGISTRY and applied at
+startup by database.mongodb.create_indexes(). QUERY_PROBES mirrors the hot
+route queries; run this module to explain() each probe and flag any that
+would fall back to a collection scan:
+
+    python -m database.indexes           # check probes only
+    python -m database.indexes --apply   # apply the registry, then check
+"""
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from typing import Dict, List
+import asyncio
+import os
+import sys
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Shared focus-mode verdicts untouched for this many days are expired
+REPUTATION_TTL_DAYS = int(os.getenv("FOCUS_REPUTATION_TTL_DAYS", "60"))
+
+# Deleted-context tombstones used by delta sync are kept this long
+TOMBSTONE_TTL_DAYS = 30
+
+
+INDEX_REGISTRY: Dict[str, List[IndexModel]] = {
+    "bookmarks": [
+        IndexModel([("user_id", ASCENDING), ("url", ASCENDING)], unique=True),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("user_id", ASCENDING), ("folder", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel(
+            [("user_id", ASCENDING), ("title", TEXT), ("url", TEXT), ("tags", TEXT)],
+            weights={"title": 10, "tags": 5, "url": 2},
+            name="bookmarks_text"
+        ),
+    ],
+    "history": [
+        IndexModel([("user_id", ASCENDING), ("url", ASCENDING)], unique=True),
+        IndexModel([("user_id", ASCENDING), ("visited_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("url", ASCENDING)]),
+        IndexModel(
+            [("user_id", ASCENDING), ("title", TEXT), ("url", TEXT)],
+            weights={"title": 10, "url": 2},
+            name="history_text"
+        ),
+    ],
+    "settings": [
+        IndexModel([("user_id", ASCENDING)], unique=True),
+    ],
+    "focus_sessions": [
+        IndexModel([("user_id", ASCENDING), ("active", ASCENDING)]),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)]),
+    ],
+    "domain_reputation": [
+        IndexModel(
+            [("domain", ASCENDING), ("cluster_id", ASCENDING), ("strict_mode", ASCENDING)],
+            unique=True
+        ),
+        IndexModel([("updated_at", ASCENDING)], expireAfterSeconds=REPUTATION_TTL_DAYS * 86400),
+    ],
+    "url_reputation": [
+        IndexModel(
+            [("url", ASCENDING), ("cluster_id", ASCENDING), ("strict_mode", ASCENDING)],
+            unique=True
+        ),
+        IndexModel([("updated_at", ASCENDING)], expireAfterSeconds=REPUTATION_TTL_DAYS * 86400),
+    ],
+    "notes": [
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("user_id", ASCENDING), ("page_url", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    "downloads": [
+        IndexModel([("user_id", ASCENDING), ("started_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("user_id", ASCENDING), ("status", ASCENDING)]),
+    ],
+    "quiz_scores": [
+        IndexModel([("user_id", ASCENDING), ("completed_at", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    "quiz_stats": [
+        IndexModel([("user_id", ASCENDING)], unique=True),
+    ],
+    "quiz_stats_buckets": [
+        IndexModel([("user_id", ASCENDING), ("period", ASCENDING), ("bucket", DESCENDING)], unique=True),
+    ],
+    "shared_contexts": [
+        IndexModel([("group_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("group_id", ASCENDING), ("seq", ASCENDING)]),
+        IndexModel(
+            [("group_id", ASCENDING), ("page_title", TEXT), ("search_query", TEXT), ("content", TEXT)],
+            weights={"page_title": 10, "search_query": 5, "content": 1},
+            name="shared_contexts_text"
+        ),
+    ],
+    "shared_context_tombstones": [
+        IndexModel([("group_id", ASCENDING), ("seq", ASCENDING)]),
+        # Clients that have not synced for a month fall back to a full reload
+        IndexModel([("deleted_at", ASCENDING)], expireAfterSeconds=TOMBSTONE_TTL_DAYS * 86400),
+    ],
+    "groups": [
+        IndexModel([("invite_code", ASCENDING)], unique=True),
+        IndexModel([("members.user_id", ASCENDING), ("is_active", ASCENDING)]),
+    ],
+    "parsed_documents": [
+        IndexModel([("sha256", ASCENDING)], unique=True),
+        IndexModel([("last_used_at", ASCENDING)]),
+    ],
+    "parsed_document_urls": [
+        IndexModel([("url", ASCENDING)], unique=True),
+        IndexModel([("sha256", ASCENDING)]),
+    ],
+    "users": [
+        IndexModel([("email", ASCENDING)], unique=True),
+    ],
+    "sessions": [
+        IndexModel([("token", ASCENDING)], unique=True),
+        # Expired sessions are removed by MongoDB as soon as expires_at passes
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+}
+
+
+# Representative shapes of the queries issued by the routes.
+# List endpoints sort by (sort_key, _id) for keyset pagination.
+QUERY_PROBES: List[Dict] = [
+    {"name": "bookmarks by user", "collection": "bookmarks",
+     "filter": {"user_id": "probe"}, "sort": [("created_at", DESCENDING), ("_id", DESCENDING)]},
+    {"name": "bookmarks by folder", "collection": "bookmarks",
+     "filter": {"user_id": "probe", "folder": "Default"}, "sort": [("created_at", DESCENDING), ("_id", DESCENDING)]},
+    {"name": "history by user", "collection": "history",
+     "filter": {"user_id": "probe"}, "sort": [("visited_at", DESCENDING), ("_id", DESCENDING)]},
+    {"name": "history upsert key", "collection": "history",
+     "filter": {"user_id": "probe", "url": "https://example.com"}},
+    {"name": "bookmark search", "collection": "bookmarks",
+     "filter": {"user_id": "probe", "$text": {"$search": "probe"}}},
+    {"name": "history search", "collection": "history",
+     "filter": {"user_id": "probe", "$text": {"$search": "probe"}}},
+    {"name": "settings by user", "collection": "settings",
+     "filter": {"user_id": "probe"}},
+    {"name": "active focus session", "collection": "focus_sessions",
+     "filter": {"user_id": "probe", "active": True}},
+    {"name": "focus history", "collection": "focus_sessions",
+     "filter": {"user_id": "probe"}, "sort": [("created_at", DESCENDING)]},
+    {"name": "domain reputation", "collection": "domain_reputation",
+     "filter": {"domain": "example.com", "cluster_id": "probe", "strict_mode": False}},
+    {"name": "url reputation", "collection": "url_reputation",
+     "filter": {"url": "example.com/page", "cluster_id": "probe", "strict_mode": False}},
+    {"name": "notes by user", "collection": "notes",
+     "filter": {"user_id": "probe"}, "sort": [("created_at", DESCENDING), ("_id", DESCENDING)]},
+    {"name": "notes by page", "collection": "notes",
+     "filter": {"user_id": "probe", "page_url": "https://example.com"}, "sort": [("created_at", DESCENDING), ("_id", DESCENDING)]},
+    {"name": "downloads by user", "collection": "downloads",
+     "filter": {"user_id": "probe"}, "sort": [("started_at", DESCENDING), ("_id", DESCENDING)]},
+    {"name": "clear downloads by status", "collection": "downloads",
+     "filter": {"user_id": "probe", "status": "completed"}},
+    {"name": "quiz scores by user", "collection": "quiz_scores",
+     "filter": {"user_id": "probe"}, "sort": [("completed_at", DESCENDING), ("_id", DESCENDING)]},
+    {"name": "quiz stats rollup", "collection": "quiz_stats",
+     "filter": {"user_id": "probe"}},
+    {"name": "quiz trends", "collection": "quiz_stats_buckets",
+     "filter": {"user_id": "probe", "period": "day"}, "sort": [("bucket", DESCENDING)]},
+    {"name": "group contexts", "collection": "shared_contexts",
+     "filter": {"group_id": "probe"}, "sort": [("timestamp", DESCENDING), ("_id", DESCENDING)]},
+    {"name": "group context search", "collection": "shared_contexts",
+     "filter": {"group_id": "probe", "$text": {"$search": "probe"}}},
+    {"name": "group context delta", "collection": "shared_contexts",
+     "filter": {"group_id": "probe", "seq": {"$gt": 0}}, "sort": [("seq", ASCENDING)]},
+    {"name": "group context tombstones", "collection": "shared_context_tombstones",
+     "filter": {"group_id": "probe", "seq": {"$gt": 0}}},
+    {"name": "group by invite code", "collection": "groups",
+     "filter": {"invite_code": "PROBE000", "is_active": True}},
+    {"name": "groups by member", "collection": "groups",
+     "filter": {"members.user_id": "probe", "is_active": True}},
+    {"name": "parsed document by hash", "collection": "parsed_documents",
+     "filter": {"sha256": "probe"}},
+    {"name": "parsed document eviction order", "collection": "parsed_documents",
+     "filter": {}, "sort": [("last_used_at", ASCENDING)]},
+    {"name": "parsed document by url", "collection": "parsed_document_urls",
+     "filter": {"url": "https://example.com/doc.pdf"}},
+    {"name": "user by email", "collection": "users",
+     "filter": {"email": "probe@example.com"}},
+    {"name": "session by token", "collection": "sessions",
+     "filter": {"token": "probe"}},
+]
+
+
+async def apply_index_registry(database) -> Dict[str, List[str]]:
+    """
+    Create every index in INDEX_REGISTRY
+
+    Collections are handled independently so one failing index (for example
+    a unique index over existing duplicates) does not block the others.
+    """
+    created = {}
+    for collection_name, indexes in INDEX_REGISTRY.items():
+        try:
+            created[collection_name] = await database[collection_name].create_indexes(indexes)
+        except Exception as e:
+            print(f"⚠️ Error creating indexes for {collection_name}: {e}")
+    return created
+
+
+def _plan_stages(plan: Dict) -> List[str]:
+    """Collect every stage name in an explain() plan tree"""
+    if not isinstance(plan, dict):
+        return []
+
+    stages = [plan["stage"]] if "stage" in plan else []
+    # Slot-based engine plans nest the classic plan under queryPlan
+    for key in ("queryPlan", "inputStage"):
+        if key in plan:
+            stages.extend(_plan_stages(plan[key]))
+    for child in plan.get("inputStages", []):
+        stages.extend(_plan_stages(child))
+    return stages
+
+
+async def check_query_plans(database) -> List[Dict]:
+    """explain() every probe and report which ones use a COLLSCAN"""
+    report = []
+    for probe in QUERY_PROBES:
+        cursor = database[probe["collection"]].find(probe["filter"])
+        if probe.get("sort"):
+            cursor = cursor.sort(probe["sort"])
+
+        explanation = await cursor.limit(1).explain()
+        stages = _plan_stages(explanation.get("queryPlanner", {}).get("winningPlan", {}))
+        report.append({
+            "name": probe["name"],
+            "collection": probe["collection"],
+            "stages": stages,
+            "collscan": "COLLSCAN" in stages
+        })
+    return report
+
+
+async def _main(apply: bool) -> int:
+    from database.mongodb import MONGODB_URL, DATABASE_NAME
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(MONGODB_URL)
+    database = client[DATABASE_NAME]
+    try:
+        if apply:
+            await apply_index_registry(database)
+
+        report = await check_query_plans(database)
+        for entry in report:
+            marker = "❌ COLLSCAN" if entry["collscan"] else "✅"
+            print(f"{marker} {entry['collection']}: {entry['name']} ({' <- '.join(entry['stages'])})")
+
+        failures = sum(entry["collscan"] for entry in report)
+        print(f"\n{failures} of {len(report)} probed queries do a collection scan")
+        return 1 if failures else 0
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(apply="--apply" in sys.argv[1:])))
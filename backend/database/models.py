@@ -123,6 +123,7 @@ class FocusSessionModel(BaseModel):
     keywords: List[str] = []
     allowed_domains: List[str] = []
     blocked_urls: List[str] = []
+    topic_cluster_id: Optional[str] = None  # Shared domain reputation cluster
     active: bool = True
     created_at: datetime = Field(default_factory=datetime.utcnow)
     ended_at: Optional[datetime] = None
@@ -1,6 +1,6 @@
 """MongoDB database configuration and connection"""
 from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo import ASCENDING, DESCENDING
+from database.indexes import apply_index_registry
 import os
 from dotenv import load_dotenv
 
@@ -42,21 +42,7 @@ async def close_mongo_connection():
 async def create_indexes():
     """Create database indexes for better performance"""
     try:
-        # Bookmarks indexes
-        await database.bookmarks.create_index([("user_id", ASCENDING), ("url", ASCENDING)], unique=True)
-        await database.bookmarks.create_index([("created_at", DESCENDING)])
-        
-        # History indexes
-        await database.history.create_index([("user_id", ASCENDING), ("visited_at", DESCENDING)])
-        await database.history.create_index([("url", ASCENDING)])
-        
-        # Settings indexes
-        await database.settings.create_index([("user_id", ASCENDING)], unique=True)
-        
-        # Focus mode indexes
-        await database.focus_sessions.create_index([("user_id", ASCENDING), ("active", ASCENDING)])
-        await database.focus_sessions.create_index([("created_at", DESCENDING)])
-        
+        await apply_index_registry(database)
         print("✅ Database indexes created")
     except Exception as e:
         print(f"⚠️ Error creating indexes: {e}")
@@ -0,0 +1,122 @@
+"""Keyset (cursor) pagination helpers
+
+List endpoints sort by (sort_key, _id) descending and hand clients an opaque
+cursor holding the last item's sort key and _id. The next page is fetched
+with a range filter on those values instead of skip(), so deep pages cost
+the same as the first one as long as an index covers (filter..., sort_key, _id).
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from fastapi import HTTPException
+
+# Hard upper bound on page size for every paginated endpoint
+MAX_PAGE_SIZE = 500
+
+
+def _encode_value(value: Any) -> Dict:
+    if isinstance(value, datetime):
+        return {"t": "dt", "v": value.isoformat()}
+    return {"t": "raw", "v": value}
+
+
+def _decode_value(value: Dict) -> Any:
+    return datetime.fromisoformat(value["v"]) if value["t"] == "dt" else value["v"]
+
+
+def _encode_token(payload: Dict) -> str:
+    data = json.dumps(payload, separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def _decode_token(token: str) -> Dict:
+    padded = token + "=" * (-len(token) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode()))
+
+
+def encode_cursor(sort_value: Any, doc_id: ObjectId) -> str:
+    """Encode the position after a document as an opaque URL-safe token"""
+    return _encode_token({"k": _encode_value(sort_value), "id": str(doc_id)})
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, ObjectId]:
+    """Decode a cursor token back into (sort_value, _id)"""
+    try:
+        payload = _decode_token(cursor)
+        return _decode_value(payload["k"]), ObjectId(payload["id"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def encode_sync_token(seq: int) -> str:
+    """Encode a delta-sync position: the change sequence number the client is synced through"""
+    return _encode_token({"seq": seq})
+
+
+def decode_sync_token(token: str) -> int:
+    """Decode a sync token back into its sequence number"""
+    try:
+        return int(_decode_token(token)["seq"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid sync cursor")
+
+
+def keyset_filter(sort_field: str, cursor: Optional[str]) -> Dict:
+    """
+    Filter selecting documents strictly after the cursor in descending order
+
+    Documents missing the sort field (or holding null) sort after all others
+    in descending order and are paged through by _id alone.
+    """
+    if not cursor:
+        return {}
+
+    sort_value, doc_id = decode_cursor(cursor)
+    if sort_value is None:
+        return {sort_field: None, "_id": {"$lt": doc_id}}
+    return {
+        "$or": [
+            {sort_field: {"$lt": sort_value}},
+            {sort_field: sort_value, "_id": {"$lt": doc_id}},
+            # $lt never matches null or missing values, which come last
+            {sort_field: None}
+        ]
+    }
+
+
+async def paginate(
+    collection,
+    query: Dict,
+    sort_field: str,
+    limit: int,
+    cursor: Optional[str] = None,
+    projection: Optional[Dict] = None
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    Fetch one page of documents, newest first
+
+    Returns the documents and the cursor for the next page (None on the last page).
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    page_query = dict(query)
+    after = keyset_filter(sort_field, cursor)
+    if after:
+        # Combine with $and so an existing $or in the query is preserved
+        page_query = {"$and": [page_query, after]} if "$or" in page_query else {**page_query, **after}
+
+    # Fetch one extra document to learn whether another page exists
+    docs = await collection.find(page_query, projection).sort(
+        [(sort_field, -1), ("_id", -1)]
+    ).limit(limit + 1).to_list(length=limit + 1)
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        next_cursor = encode_cursor(last.get(sort_field), last["_id"])
+
+    return docs, next_cursor
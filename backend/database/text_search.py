@@ -0,0 +1,53 @@
+"""Helpers for MongoDB $text search
+
+$text matches whole, stemmed words: terms are ORed, case and diacritics
+are ignored and stop words are dropped, but a term never matches part of a
+word ("gith" does not find "github", "java" does not find "javascript").
+Search-as-you-type therefore falls back to prefix_filter when $text finds
+nothing.
+"""
+import re
+from typing import Dict, List, Optional
+
+# Projection / sort spec for the relevance score of a $text match
+TEXT_SCORE = {"$meta": "textScore"}
+
+# Characters with special meaning in a $text search string:
+# double quotes start a phrase and a leading minus negates a term
+_TEXT_OPERATORS = re.compile(r'["\\]|(?:^|\s)-+')
+
+# Terms of a query used for prefix matching
+MAX_PREFIX_TERMS = 5
+
+
+def sanitize_text_query(query: str) -> str:
+    """Strip $text operators so user input is always matched as plain terms"""
+    query = _TEXT_OPERATORS.sub(" ", query or "")
+    return " ".join(query.split())[:256]
+
+
+def text_filter(query: str) -> Optional[Dict]:
+    """Build a $text filter for the query, or None if nothing searchable is left"""
+    terms = sanitize_text_query(query)
+    if not terms:
+        return None
+    return {"$text": {"$search": terms}}
+
+
+def prefix_filter(query: str, fields: List[str]) -> Optional[Dict]:
+    """
+    Filter matching documents where every query term starts a word in one of fields
+
+    Case-insensitive regexes cannot use an index, so combine this with an
+    indexed equality (user_id, group_id) that bounds the documents scanned.
+    """
+    terms = sanitize_text_query(query).split()[:MAX_PREFIX_TERMS]
+    if not terms:
+        return None
+    return {"$and": [
+        {"$or": [
+            {field: {"$regex": r"(?:^|\W)" + re.escape(term), "$options": "i"}}
+            for field in fields
+        ]}
+        for term in terms
+    ]}
@@ -5,9 +5,17 @@ print("Loaded GROQ_API_KEY:")
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+import asyncio
 import logging
+from bson import ObjectId
 
 from database.mongodb import connect_to_mongo, close_mongo_connection
+from services.realtime import realtime_hub, group_channel
+from services.group_cache import group_cache
+from services.document_fetcher import close_session as close_download_session
+from services.http_client import http_client
+from services.document_extraction import extraction_engine
+from services.context_packer import load_tokenizer
 from routes import ai, voice, browser, proxy, data, focus, auth, downloads, voice_navigation, vector_storage, notes, quiz, document_parser, groups
 
 # Load environment variables
@@ -28,12 +36,21 @@ app = FastAPI(
 @app.on_event("startup")
 async def startup_event():
     """Initialize database connection on startup"""
+    # Fork extraction workers before other startup work opens more threads
+    await extraction_engine.start()
     await connect_to_mongo()
+    await realtime_hub.start()
+    # May download the tokenizer, so it is loaded off the event loop
+    await asyncio.to_thread(load_tokenizer)
     logger.info("✅ Lernova API started successfully")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Close database connection on shutdown"""
+    await realtime_hub.stop()
+    await close_download_session()
+    await http_client.close()
+    await extraction_engine.stop()
     await close_mongo_connection()
     logger.info("✅ Lernova API shutdown complete")
 
@@ -85,20 +102,57 @@ async def health_check():
     return {"status": "healthy"}
 
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    """WebSocket endpoint for real-time communication"""
+async def websocket_endpoint(websocket: WebSocket, user_id: str = "default_user"):
+    """
+    WebSocket endpoint for real-time group updates
+
+    Clients send {"action": "subscribe", "group_id": ...} to receive delta
+    events for a group they belong to, {"action": "unsubscribe", "group_id": ...}
+    to stop, and {"action": "ping"} as a keepalive.
+    """
     await websocket.accept()
-    logger.info("WebSocket connection established")
+    logger.info(f"WebSocket connection established for {user_id}")
     
     try:
         while True:
-            data = await websocket.receive_text()
-            logger.info(f"Received: {data}")
+            try:
+                message = await websocket.receive_json()
+            except ValueError:
+                await websocket.send_json({"type": "error", "detail": "Messages must be JSON"})
+                continue
+            
+            if not isinstance(message, dict):
+                await websocket.send_json({"type": "error", "detail": "Messages must be JSON objects"})
+                continue
+            
+            action = message.get("action")
+            group_id = message.get("group_id")
+            
+            if action == "ping":
+                await websocket.send_json({"type": "pong"})
+            
+            elif action == "subscribe" and group_id:
+                if not ObjectId.is_valid(group_id):
+                    await websocket.send_json({"type": "error", "detail": "Invalid group ID"})
+                    continue
+                
+                if not await group_cache.is_member(group_id, user_id):
+                    await websocket.send_json({"type": "error", "detail": "You are not a member of this group"})
+                    continue
+                
+                realtime_hub.subscribe(websocket, group_channel(group_id), user_id)
+                await websocket.send_json({"type": "subscribed", "group_id": group_id})
+            
+            elif action == "unsubscribe" and group_id:
+                realtime_hub.unsubscribe(websocket, group_channel(group_id))
+                await websocket.send_json({"type": "unsubscribed", "group_id": group_id})
             
-            # Echo back for now - can be extended for real-time features
-            await websocket.send_text(f"Echo: {data}")
+            else:
+                await websocket.send_json({"type": "error", "detail": f"Unknown action: {action}"})
     except WebSocketDisconnect:
         logger.info("WebSocket connection closed")
+    finally:
+        realtime_hub.unsubscribe(websocket)
 
 if __name__ == "__main__":
     import uvicorn
@@ -44,14 +44,16 @@ class AIResponse(BaseModel):
 
 class SummarizeRequest(BaseModel):
     """Page summarization request"""
-    content: str = Field(..., description="Page content to summarize")
+    content: str = Field("", description="Page content to summarize")
     url: Optional[str] = Field(None, description="Page URL")
+    document_id: Optional[str] = Field(None, description="Indexed document to summarize instead of content")
 
 class QuestionRequest(BaseModel):
     """Question answering request"""
     question: str
-    context: str = Field(..., description="Page content or PDF text")
+    context: str = Field("", description="Page content or PDF text")
     url: Optional[str] = None
+    document_id: Optional[str] = Field(None, description="Indexed document to answer from instead of context")
 
 class TTSRequest(BaseModel):
     """Text-to-speech request"""
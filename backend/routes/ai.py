@@ -1,12 +1,15 @@
 from fastapi import APIRouter, HTTPException
 from models import AIRequest, AIResponse, SummarizeRequest, QuestionRequest, TTSRequest
 from pydantic import BaseModel
-from typing import List, Dict, Optional
+from typing import Awaitable, List, Dict, Optional, Tuple
 from services.langchain_utils import langchain_service
 from services.eleven_labs import eleven_labs_client
 from services.vector_store import vector_store
+from services.context_packer import ContextPacker, prompt_budget, truncate_to_tokens
+import asyncio
 import logging
 import json
+import os
 import re
 
 logger = logging.getLogger(__name__)
@@ -100,26 +103,14 @@ class AnswerQuestionsRequest(BaseModel):
 async def chat(request: AIRequest):
     """General AI chat endpoint with RAG (Retrieval Augmented Generation)"""
     try:
-        # Query vector store for relevant context from browsing history
-        relevant_chunks = await vector_store.query_relevant_content(
-            query=request.query,
-            n_results=3  # Get top 3 most relevant chunks
-        )
+        # Retrieve relevant context from browsing history (bounded by a timeout)
+        sources, _ = await gather_context_sources({
+            "history": build_history_context(request.query, include_accessed=True)
+        })
         
-        # Build enhanced context from vector store results
-        enhanced_context = request.context or ""
-        
-        if relevant_chunks:
-            logger.info(f"Found {len(relevant_chunks)} relevant chunks from browsing history")
-            vector_context = "\n\n--- Relevant information from your browsing history ---\n"
-            
-            for i, chunk in enumerate(relevant_chunks, 1):
-                metadata = chunk['metadata']
-                vector_context += f"\n[Source {i}] {metadata['title']} ({metadata['url']})\n"
-                vector_context += f"Accessed: {metadata['access_date']}\n"
-                vector_context += f"Content: {chunk['content'][:500]}...\n"
-            
-            enhanced_context = vector_context + "\n\n" + enhanced_context
+        # Pack the page and vector store results into the model's token budget
+        sources["page"] = [request.context or ""]
+        enhanced_context = await asyncio.to_thread(pack_chat_context, request.query, sources)
         
         # Generate text response with enhanced context
         text_response = await langchain_service.general_chat(
@@ -127,21 +118,30 @@ async def chat(request: AIRequest):
             context=enhanced_context
         )
         
-        # Generate voice response (optional - don't fail if quota exceeded)
-        audio_base64 = None
-        try:
-            audio_base64 = await eleven_labs_client.text_to_speech(text_response)
-        except Exception as tts_error:
-            logger.warning(f"TTS generation failed (continuing without audio): {tts_error}")
-        
         # Check if query is about learning/research and suggest websites
-        suggested_websites = []
         learning_keywords = ['learn', 'study', 'tutorial', 'course', 'guide', 'teach', 'explain', 'understand', 'research', 'information', 'about']
         query_lower = request.query.lower()
+        wants_suggestions = any(keyword in query_lower for keyword in learning_keywords)
         
-        if any(keyword in query_lower for keyword in learning_keywords):
-            # Generate website suggestions based on the query
-            suggested_websites = await generate_website_suggestions(request.query, text_response)
+        # Voice response and website suggestions only depend on the answer, so run them together
+        audio_result, suggestions_result = await asyncio.gather(
+            eleven_labs_client.text_to_speech(text_response),
+            generate_website_suggestions(request.query, text_response) if wants_suggestions else _no_suggestions(),
+            return_exceptions=True
+        )
+        
+        # Voice response is optional - don't fail if quota exceeded
+        audio_base64 = None
+        if isinstance(audio_result, Exception):
+            logger.warning(f"TTS generation failed (continuing without audio): {audio_result}")
+        else:
+            audio_base64 = audio_result
+        
+        suggested_websites = []
+        if isinstance(suggestions_result, Exception):
+            logger.warning(f"Website suggestions failed: {suggestions_result}")
+        else:
+            suggested_websites = suggestions_result
         
         return AIResponse(
             text=text_response,
@@ -157,10 +157,13 @@ async def summarize(request: SummarizeRequest):
     """Summarize webpage content"""
     try:
         # Generate summary
-        summary = await langchain_service.summarize_content(
-            content=request.content,
-            url=request.url
-        )
+        if request.document_id:
+            summary = await langchain_service.summarize_document(request.document_id)
+        else:
+            summary = await langchain_service.summarize_content(
+                content=request.content,
+                url=request.url
+            )
         
         # Generate voice (optional)
         audio_base64 = None
@@ -185,7 +188,8 @@ async def answer_question(request: QuestionRequest):
         answer = await langchain_service.answer_question(
             question=request.question,
             context=request.context,
-            url=request.url
+            url=request.url,
+            document_id=request.document_id
         )
         
         # Generate voice (optional)
@@ -399,65 +403,157 @@ Provide real, working URLs for popular educational websites. Your response (JSON
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Retrieval settings for group AI chat
+GROUP_CONTEXT_TOP_K = 12
+
+# Characters of each recent context used when a group has no indexed chunks
+GROUP_FALLBACK_PREVIEW_CHARS = 500
+
+# Per-source deadline when assembling chat context; slower sources are skipped
+CONTEXT_SOURCE_TIMEOUT_SECONDS = float(os.getenv("CONTEXT_SOURCE_TIMEOUT_SECONDS", "2.5"))
+
+# Chat context sources: name -> (priority, share of the token budget, header).
+# Lower priority is packed first; sections are rendered in this order.
+CHAT_CONTEXT_SOURCES = {
+    "history": (2, 0.2, "--- Relevant information from your browsing history ---\n"),
+    "group": (1, 0.3, "--- Shared Context from Group Members ---\n"),
+    "page": (0, 0.5, ""),
+}
+
+
+async def build_group_context(group_id: str, query: str) -> List[str]:
+    """
+    Group context chunks most relevant to the query, best match first
+    
+    Chunks come from the group's vector partition. Groups whose contexts were
+    shared before indexing existed fall back to previews of the latest contexts.
+    """
+    chunks = await vector_store.query_group_context(group_id, query, n_results=GROUP_CONTEXT_TOP_K)
+    
+    if not chunks:
+        from database.mongodb import get_database
+        
+        latest = await get_database().shared_contexts.aggregate([
+            {"$match": {"group_id": group_id}},
+            {"$sort": {"timestamp": -1}},
+            {"$limit": 10},
+            {"$project": {
+                "user_name": 1,
+                "page_title": 1,
+                "page_url": 1,
+                "search_query": 1,
+                "content": {"$substrCP": ["$content", 0, GROUP_FALLBACK_PREVIEW_CHARS]}
+            }}
+        ]).to_list(length=10)
+        chunks = [
+            {
+                "content": ctx["content"],
+                "metadata": {
+                    "user_name": ctx["user_name"],
+                    "title": ctx["page_title"],
+                    "url": ctx["page_url"],
+                    "search_query": ctx.get("search_query")
+                }
+            }
+            for ctx in latest
+        ]
+    
+    logger.info(f"Found {len(chunks)} shared context chunks from group {group_id}")
+    
+    entries = []
+    for chunk in chunks:
+        metadata = chunk["metadata"]
+        entry = f"[{metadata.get('user_name', 'Member')}] {metadata.get('title', '')}\n"
+        entry += f"URL: {metadata.get('url', '')}\n"
+        if metadata.get("search_query"):
+            entry += f"Searched for: {metadata['search_query']}\n"
+        entry += f"Content: {chunk['content']}\n---"
+        entries.append(entry)
+    
+    return entries
+
+
+async def build_history_context(query: str, include_accessed: bool = False) -> List[str]:
+    """Browsing-history chunks most relevant to the query, best match first"""
+    relevant_chunks = await vector_store.query_relevant_content(
+        query=query,
+        n_results=6
+    )
+    
+    if relevant_chunks:
+        logger.info(f"Found {len(relevant_chunks)} relevant chunks from browsing history")
+    
+    entries = []
+    for i, chunk in enumerate(relevant_chunks, 1):
+        metadata = chunk['metadata']
+        entry = f"[Source {i}] {metadata['title']} ({metadata['url']})\n"
+        if include_accessed:
+            entry += f"Accessed: {metadata['access_date']}\n"
+        entry += f"Content: {chunk['content']}"
+        entries.append(entry)
+    
+    return entries
+
+
+async def gather_context_sources(
+    sources: Dict[str, Awaitable[List[str]]],
+    timeout: float = CONTEXT_SOURCE_TIMEOUT_SECONDS
+) -> Tuple[Dict[str, List[str]], List[str]]:
+    """
+    Run context sources concurrently, each under its own timeout
+    
+    Returns the chunks from every source (empty for one that failed or timed
+    out) and the names of the sources that were skipped.
+    """
+    async def run(name: str, source: Awaitable[List[str]]) -> Optional[List[str]]:
+        try:
+            return await asyncio.wait_for(source, timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Context source '{name}' timed out after {timeout}s, continuing without it")
+        except Exception as e:
+            logger.error(f"Error fetching {name} context: {e}")
+        return None
+    
+    results = await asyncio.gather(*(run(name, source) for name, source in sources.items()))
+    
+    chunks = {name: result or [] for name, result in zip(sources, results)}
+    skipped = [name for name, result in zip(sources, results) if result is None]
+    return chunks, skipped
+
+
+def pack_chat_context(query: str, sources: Dict[str, List[str]]) -> str:
+    """Pack page, group and history chunks into the chat prompt's token budget"""
+    packer = ContextPacker(prompt_budget(query))
+    for name, (priority, share, header) in CHAT_CONTEXT_SOURCES.items():
+        packer.add(name, sources.get(name, []), priority=priority, share=share, header=header)
+    
+    context = packer.pack()
+    logger.info(f"Packed chat context {packer.summary()} into {packer.used_tokens}/{packer.budget} tokens")
+    return context
+
+
+async def _no_suggestions() -> List[Dict[str, str]]:
+    return []
+
+
 @router.post("/ai/chat")
 async def ai_chat_with_group_context(request: ChatRequest):
     """AI chat endpoint with optional group context support"""
     try:
-        from database.mongodb import get_database
-        from bson import ObjectId
-        
-        # Start with the provided context
-        enhanced_context = request.context or ""
-        
-        # If group_id is provided, fetch shared context from the group
+        # Retrieve group and browsing-history context concurrently; a slow or
+        # failing source is skipped instead of delaying the whole chat
+        context_sources = {
+            "history": build_history_context(request.query)
+        }
         if request.group_id:
-            logger.info(f"Fetching shared context for group: {request.group_id}")
-            
-            try:
-                db = get_database()
-                
-                # Get all shared contexts from the group (limit to recent 20)
-                contexts = await db.shared_contexts.find({
-                    "group_id": request.group_id
-                }).sort("timestamp", -1).limit(20).to_list(length=20)
-                
-                if contexts:
-                    logger.info(f"Found {len(contexts)} shared contexts in group")
-                    
-                    # Build group context string
-                    group_context = "\n\n--- Shared Context from Group Members ---\n"
-                    
-                    for ctx in contexts:
-                        group_context += f"\n[{ctx['user_name']}] {ctx['page_title']}\n"
-                        group_context += f"URL: {ctx['page_url']}\n"
-                        if ctx.get('search_query'):
-                            group_context += f"Searched for: {ctx['search_query']}\n"
-                        # Add truncated content (first 300 chars)
-                        content_preview = ctx['content'][:300] + "..." if len(ctx['content']) > 300 else ctx['content']
-                        group_context += f"Content: {content_preview}\n"
-                        group_context += f"---\n"
-                    
-                    enhanced_context = group_context + "\n\n" + enhanced_context
-            except Exception as group_error:
-                logger.error(f"Error fetching group context: {group_error}")
-                # Continue without group context
-        
-        # Query vector store for relevant context from browsing history
-        relevant_chunks = await vector_store.query_relevant_content(
-            query=request.query,
-            n_results=3
-        )
+            logger.info(f"Retrieving shared context for group: {request.group_id}")
+            context_sources["group"] = build_group_context(request.group_id, request.query)
+        
+        sources, skipped_sources = await gather_context_sources(context_sources)
         
-        if relevant_chunks:
-            logger.info(f"Found {len(relevant_chunks)} relevant chunks from browsing history")
-            vector_context = "\n\n--- Relevant information from your browsing history ---\n"
-            
-            for i, chunk in enumerate(relevant_chunks, 1):
-                metadata = chunk['metadata']
-                vector_context += f"\n[Source {i}] {metadata['title']} ({metadata['url']})\n"
-                vector_context += f"Content: {chunk['content'][:400]}...\n"
-            
-            enhanced_context = vector_context + "\n\n" + enhanced_context
+        # History, group and the provided context, packed into the model's token budget
+        sources["page"] = [request.context or ""]
+        enhanced_context = await asyncio.to_thread(pack_chat_context, request.query, sources)
         
         # Generate text response with enhanced context
         text_response = await langchain_service.general_chat(
@@ -476,35 +572,46 @@ async def ai_chat_with_group_context(request: ChatRequest):
             "success": True,
             "text": text_response,
             "audio_base64": audio_base64,
-            "used_group_context": bool(request.group_id)
+            "used_group_context": bool(sources.get("group")),
+            "skipped_context_sources": skipped_sources
         }
         
     except Exception as e:
         logger.error(f"AI chat error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/highlight-important")
-async def highlight_important(request: HighlightRequest):
-    """Analyze page content and identify important sections based on topic"""
-    try:
-        # Build prompt for AI
-        elements_text = "\n\n".join([
-            f"[ID: {el['id']}] {el['tag']}: {el['text'][:300]}"
-            for el in request.elements[:50]  # Limit to first 50 elements
-        ])
-        
-        prompt = f"""You are analyzing a webpage titled "{request.pageTitle}" to help a user research the topic: "{request.topic}".
+# Tokens of each page section shown to the model when picking highlights
+HIGHLIGHT_SECTION_TOKENS = 75
+
+# Split at {sections} before the title and topic are filled in, so user text
+# is never searched for the placeholder
+HIGHLIGHT_PROMPT_HEAD, HIGHLIGHT_PROMPT_TAIL = """You are analyzing a webpage titled "{title}" to help a user research the topic: "{topic}".
 
-Below are sections of the webpage with their IDs. Identify which sections are most relevant and important for understanding "{request.topic}".
+Below are sections of the webpage with their IDs. Identify which sections are most relevant and important for understanding "{topic}".
 
 Webpage sections:
-{elements_text}
+{sections}
 
-Task: Return ONLY a JSON array of IDs for the most important sections. Include 5-15 sections that are most relevant to the topic "{request.topic}".
+Task: Return ONLY a JSON array of IDs for the most important sections. Include 5-15 sections that are most relevant to the topic "{topic}".
 
 Example response format: {{"important_ids": [0, 3, 7, 12]}}
 
-Your response (JSON only):"""
+Your response (JSON only):""".split("{sections}")
+
+@router.post("/highlight-important")
+async def highlight_important(request: HighlightRequest):
+    """Analyze page content and identify important sections based on topic"""
+    try:
+        # Build prompt for AI
+        head = HIGHLIGHT_PROMPT_HEAD.format(title=request.pageTitle, topic=request.topic)
+        tail = HIGHLIGHT_PROMPT_TAIL.format(topic=request.topic)
+
+        # Short excerpt of every section, in page order, as many as fit the prompt
+        sections = ContextPacker(prompt_budget(head, tail)).add("sections", [
+            f"[ID: {el['id']}] {el['tag']}: {truncate_to_tokens(el['text'], HIGHLIGHT_SECTION_TOKENS)}"
+            for el in request.elements
+        ])
+        prompt = head + sections.pack() + tail
 
         # Call AI
         response = await langchain_service.general_chat(
@@ -4,10 +4,14 @@ from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime
 from services.database_service import db_service
+from services.export_stream import export_response, iter_ndjson
 from database.models import BookmarkModel, HistoryModel
 
 router = APIRouter()
 
+# Upper bound on visits accepted by one bulk history request
+MAX_HISTORY_BATCH = 1000
+
 
 # ============ Request Models ============
 
@@ -25,6 +29,17 @@ class HistoryCreate(BaseModel):
     favicon: Optional[str] = None
 
 
+class HistoryVisit(BaseModel):
+    url: str
+    title: str
+    favicon: Optional[str] = None
+    visited_at: Optional[datetime] = None
+
+
+class HistoryBulkCreate(BaseModel):
+    visits: List[HistoryVisit]
+
+
 class SettingsUpdate(BaseModel):
     default_search_engine: Optional[str] = None
     homepage_url: Optional[str] = None
@@ -57,11 +72,32 @@ async def add_bookmark(bookmark: BookmarkCreate, user_id: str = "default_user"):
 
 
 @router.get("/bookmarks")
-async def get_bookmarks(user_id: str = "default_user", folder: Optional[str] = None):
-    """Get all bookmarks"""
+async def get_bookmarks(
+    user_id: str = "default_user",
+    folder: Optional[str] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None
+):
+    """Get bookmarks, newest first, one page at a time"""
     try:
-        bookmarks = await db_service.get_bookmarks(user_id, folder)
-        return {"success": True, "bookmarks": bookmarks}
+        bookmarks, next_cursor = await db_service.get_bookmarks(user_id, folder, limit, cursor)
+        return {"success": True, "bookmarks": bookmarks, "next_cursor": next_cursor}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/bookmarks/export")
+async def export_bookmarks(user_id: str = "default_user", gzip: bool = False):
+    """Export all bookmarks as newline-delimited JSON"""
+    try:
+        return export_response(
+            iter_ndjson(db_service.export_bookmarks_cursor(user_id)),
+            filename="bookmarks.ndjson",
+            media_type="application/x-ndjson",
+            gzip=gzip
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -107,14 +143,50 @@ async def add_history(history: HistoryCreate, user_id: str = "default_user"):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/history/bulk")
+async def add_history_bulk(request: HistoryBulkCreate, user_id: str = "default_user"):
+    """Add a batch of browsing history visits"""
+    try:
+        if len(request.visits) > MAX_HISTORY_BATCH:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Too many visits in one batch (max {MAX_HISTORY_BATCH})"
+            )
+        
+        result = await db_service.add_history_bulk(
+            user_id,
+            [visit.dict() for visit in request.visits]
+        )
+        return {"success": True, **result}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/history")
-async def get_history(user_id: str = "default_user", limit: int = 100):
-    """Get browsing history"""
+async def get_history(user_id: str = "default_user", limit: int = 100, cursor: Optional[str] = None):
+    """Get browsing history, most recent first, one page at a time"""
     try:
-        print(user_id)
-        history = await db_service.get_history(user_id, limit)
-        print(history)
-        return {"success": True, "history": history}
+        history, next_cursor = await db_service.get_history(user_id, limit, cursor)
+        return {"success": True, "history": history, "next_cursor": next_cursor}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/history/export")
+async def export_history(user_id: str = "default_user", gzip: bool = False):
+    """Export the whole browsing history as newline-delimited JSON"""
+    try:
+        return export_response(
+            iter_ndjson(db_service.export_history_cursor(user_id)),
+            filename="history.ndjson",
+            media_type="application/x-ndjson",
+            gzip=gzip
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
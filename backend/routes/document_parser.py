@@ -1,19 +1,44 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 import logging
-import PyPDF2
-import io
-import requests
-from typing import Optional
-import docx
-import openpyxl
-from bs4 import BeautifulSoup
+import asyncio
+import os
+import aiohttp
+import shutil
+from functools import partial
+from tempfile import SpooledTemporaryFile
+from typing import AsyncIterator, Awaitable, BinaryIO, Callable, Dict, List, Optional, Tuple
+from services.context_packer import fit_document
+from services.document_fetcher import (
+    DocumentTooLarge, DownloadedDocument, DOCUMENT_SPOOL_MEMORY_BYTES,
+    download_document, sniff_doc_type, doc_type_from_content_type
+)
+from services.document_extraction import (
+    extraction_engine, join_sections, split_sections, ExtractionTimeout, ExtractionTooLarge, SECTION_UNITS
+)
+from services.document_cache import document_cache, content_sha256
+from services.export_stream import dumps
+from services.vector_store import vector_store
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Parsed documents are returned for use as LLM context, so they are capped in tokens
+MAX_DOCUMENT_TOKENS = int(os.getenv("DOCUMENT_MAX_TOKENS", "3750"))
+
+# Characters of each section shown in the outline of an indexed document
+OUTLINE_PREVIEW_CHARS = 160
+
+# Documents accepted per batch, and how many of them are parsed at once
+BATCH_MAX_DOCUMENTS = int(os.getenv("DOCUMENT_BATCH_MAX_DOCUMENTS", "50"))
+BATCH_CONCURRENCY = int(os.getenv("DOCUMENT_BATCH_CONCURRENCY", "8"))
+
 class ParseDocumentRequest(BaseModel):
     url: str
+    # Index the whole document for retrieval and return a handle instead of its text
+    index: bool = False
 
 class ParseDocumentResponse(BaseModel):
     success: bool
@@ -23,75 +48,153 @@ class ParseDocumentResponse(BaseModel):
     error: Optional[str] = None
     is_truncated: bool = False
     total_length: int = 0
+    cached: bool = False
+    document_id: Optional[str] = None
+    outline: Optional[List[Dict]] = None
 
-def extract_pdf_content(file_bytes: bytes) -> str:
-    """Extract text from PDF bytes"""
-    try:
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_bytes))
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-        return text.strip()
-    except Exception as e:
-        logger.error(f"Error extracting PDF: {e}")
-        raise
-
-def extract_docx_content(file_bytes: bytes) -> str:
-    """Extract text from DOCX bytes"""
-    try:
-        doc = docx.Document(io.BytesIO(file_bytes))
-        text = ""
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
-        return text.strip()
-    except Exception as e:
-        logger.error(f"Error extracting DOCX: {e}")
-        raise
+def doc_type_from_url(url: str) -> Optional[str]:
+    """Document type implied by the URL's file extension"""
+    url_lower = url.lower()
+    if url_lower.endswith('.pdf'):
+        return "pdf"
+    elif url_lower.endswith('.docx') or url_lower.endswith('.doc'):
+        return "docx"
+    elif url_lower.endswith('.xlsx') or url_lower.endswith('.xls'):
+        return "xlsx"
+    elif url_lower.endswith('.html') or url_lower.endswith('.htm'):
+        return "html"
+    return None
 
-def extract_xlsx_content(file_bytes: bytes) -> str:
-    """Extract text from XLSX bytes"""
-    try:
-        workbook = openpyxl.load_workbook(io.BytesIO(file_bytes), data_only=True)
-        text = ""
-        
-        for sheet_name in workbook.sheetnames:
-            sheet = workbook[sheet_name]
-            text += f"\n=== Sheet: {sheet_name} ===\n"
-            
-            # Get all rows
-            for row in sheet.iter_rows(values_only=True):
-                row_text = " | ".join([str(cell) if cell is not None else "" for cell in row])
-                if row_text.strip():
-                    text += row_text + "\n"
+async def extract_document(doc_type: str, source: BinaryIO, url: Optional[str] = None) -> Tuple[str, List[Dict], str]:
+    """
+    Extract text in the worker pool, trying every parser for unknown types
+    
+    Returns the text, its section outline and the document type it was parsed as.
+    """
+    content, outline = "", []
+    if doc_type in ("pdf", "docx", "xlsx", "html"):
+        content, outline = join_sections(await extraction_engine.extract_sections(doc_type, source, url))
+        logger.info(f"Extracted {len(content)} characters from {doc_type.upper()}")
+    else:
+        # Try all parsers
+        logger.info("Unknown document type, trying all parsers...")
+        for parser_type in ["pdf", "docx", "xlsx", "html"]:
+            try:
+                content, outline = join_sections(await extraction_engine.extract_sections(parser_type, source, url))
+                doc_type = parser_type
+                logger.info(f"Successfully parsed as {parser_type.upper()}")
+                break
+            except (ExtractionTimeout, ExtractionTooLarge):
+                raise
+            except Exception:
+                continue
         
-        return text.strip()
-    except Exception as e:
-        logger.error(f"Error extracting XLSX: {e}")
-        raise
+        if not content:
+            raise HTTPException(
+                status_code=400,
+                detail="Unable to parse document. Supported formats: PDF, DOCX, XLSX, HTML"
+            )
+    
+    if not content.strip():
+        raise HTTPException(
+            status_code=400,
+            detail="Document appears to be empty or content could not be extracted"
+        )
+    
+    return content, outline, doc_type
 
-def extract_html_content(html_bytes: bytes) -> str:
-    """Extract text from HTML bytes"""
+def detect_doc_type(document: DownloadedDocument, url: str) -> str:
+    """Document type from magic bytes first, then the URL, then Content-Type"""
+    return (
+        sniff_doc_type(document)
+        or doc_type_from_url(url)
+        or doc_type_from_content_type(document.content_type)
+        or "unknown"
+    )
+
+async def open_document(url: str) -> Tuple[Optional[Dict], Optional[DownloadedDocument]]:
+    """
+    Cached parse of a URL, or the downloaded document if it must be parsed
+    
+    Parsed text is cached: an unchanged URL (conditional GET) or a file
+    already seen at another URL is not parsed again. Exactly one of the two
+    results is set; the caller closes the document.
+    """
+    # Download the document (streamed to a spooled file, size-limited),
+    # conditionally if this URL was parsed before
+    known_url = await document_cache.get_url(url)
+    document = await download_document(url, validators=known_url)
+    
+    if document is None:
+        logger.info(f"Document not modified since last parse: {url}")
+        parsed = await document_cache.get_content(known_url["sha256"])
+        if parsed:
+            return parsed, None
+        # Cached text was evicted; download it again in full
+        document = await download_document(url)
+    
     try:
-        soup = BeautifulSoup(html_bytes, 'html.parser')
-        
-        # Remove script and style elements
-        for script in soup(["script", "style"]):
-            script.decompose()
-        
-        # Get text
-        text = soup.get_text()
-        
-        # Break into lines and remove leading/trailing space
-        lines = (line.strip() for line in text.splitlines())
-        # Break multi-headlines into a line each
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        # Drop blank lines
-        text = '\n'.join(chunk for chunk in chunks if chunk)
-        
-        return text
-    except Exception as e:
-        logger.error(f"Error extracting HTML: {e}")
+        await document_cache.put_url(url, document.sha256, document.etag, document.last_modified)
+        parsed = await document_cache.get_content(document.sha256)
+    except BaseException:
+        document.close()
         raise
+    
+    if parsed:
+        logger.info(f"Parsed text cache hit by content hash for {url}")
+        document.close()
+        return parsed, None
+    
+    logger.info(f"Downloaded {document.size} bytes from {url}")
+    return None, document
+
+async def parse_and_cache(
+    document_sha256: str,
+    doc_type: str,
+    source: BinaryIO,
+    url: Optional[str] = None
+) -> Dict:
+    """Extract a document and cache its text; returns it in the shape of a cache hit"""
+    content, outline, doc_type = await extract_document(doc_type, source, url)
+    await document_cache.put_content(document_sha256, doc_type, content, outline)
+    return {"sha256": document_sha256, "content": content, "doc_type": doc_type, "outline": outline}
+
+def describe_outline(content: str, outline: Optional[List[Dict]]) -> List[Dict]:
+    """Label, size and opening text of each section"""
+    return [
+        {"index": i, "label": label, "length": len(text), "preview": text[:OUTLINE_PREVIEW_CHARS].strip()}
+        for i, (label, text) in enumerate(split_sections(content, outline))
+    ]
+
+async def document_fields(parsed: Dict, title: str, url: str, index: bool) -> Dict:
+    """
+    Response fields for a parsed document
+    
+    By default the text is fitted into the token budget. With index, the
+    whole document is indexed for retrieval instead and only its id and
+    outline are returned; Q&A and summaries then fetch the relevant parts.
+    """
+    content = parsed["content"]
+    total_length = len(content)
+    
+    if index:
+        sections = split_sections(content, parsed.get("outline"))
+        result = await vector_store.store_document(parsed["sha256"], title, url, parsed["doc_type"], sections)
+        if not result["success"]:
+            raise HTTPException(status_code=500, detail=f"Failed to index document: {result['error']}")
+        return {
+            "content": "",
+            "total_length": total_length,
+            "document_id": parsed["sha256"],
+            "outline": describe_outline(content, parsed.get("outline"))
+        }
+    
+    # Fit content into the token budget, keeping its beginning and end
+    # This prevents Groq API token limit errors
+    content, is_truncated = await asyncio.to_thread(fit_document, content, MAX_DOCUMENT_TOKENS)
+    if is_truncated:
+        logger.info(f"Truncated content from {total_length} to {len(content)} characters")
+    return {"content": content, "is_truncated": is_truncated, "total_length": total_length}
 
 @router.post("/document/parse", response_model=ParseDocumentResponse)
 async def parse_document(request: ParseDocumentRequest):
@@ -102,134 +205,165 @@ async def parse_document(request: ParseDocumentRequest):
     try:
         url = request.url
         logger.info(f"Parsing document from URL: {url}")
+        title = url.split('/')[-1]  # Default title from filename
         
-        # Determine document type from URL
-        url_lower = url.lower()
-        doc_type = "unknown"
+        parsed, document = await open_document(url)
+        cached = parsed is not None
         
-        if url_lower.endswith('.pdf'):
-            doc_type = "pdf"
-        elif url_lower.endswith('.docx') or url_lower.endswith('.doc'):
-            doc_type = "docx"
-        elif url_lower.endswith('.xlsx') or url_lower.endswith('.xls'):
-            doc_type = "xlsx"
-        elif url_lower.endswith('.html') or url_lower.endswith('.htm'):
-            doc_type = "html"
-        else:
-            # Try to detect from content-type
+        if document is not None:
             try:
-                head_response = requests.head(url, timeout=5, allow_redirects=True)
-                content_type = head_response.headers.get('content-type', '').lower()
-                
-                if 'pdf' in content_type:
-                    doc_type = "pdf"
-                elif 'word' in content_type or 'officedocument.wordprocessing' in content_type:
-                    doc_type = "docx"
-                elif 'excel' in content_type or 'spreadsheet' in content_type:
-                    doc_type = "xlsx"
-                elif 'html' in content_type:
-                    doc_type = "html"
-            except:
-                pass
-        
-        # Download the document
-        logger.info(f"Downloading document (type: {doc_type})...")
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-        
-        file_bytes = response.content
+                doc_type = detect_doc_type(document, url)
+                logger.info(f"Parsing {document.size} bytes (type: {doc_type})")
+                parsed = await parse_and_cache(document.sha256, doc_type, document.file, url)
+            finally:
+                document.close()
         
-        # Extract content based on type
-        content = ""
-        title = url.split('/')[-1]  # Default title from filename
+        return ParseDocumentResponse(
+            success=True,
+            title=title,
+            doc_type=parsed["doc_type"],
+            cached=cached,
+            **await document_fields(parsed, title, url, request.index)
+        )
         
-        if doc_type == "pdf":
-            content = extract_pdf_content(file_bytes)
-            logger.info(f"Extracted {len(content)} characters from PDF")
-        elif doc_type == "docx":
-            content = extract_docx_content(file_bytes)
-            logger.info(f"Extracted {len(content)} characters from DOCX")
-        elif doc_type == "xlsx":
-            content = extract_xlsx_content(file_bytes)
-            logger.info(f"Extracted {len(content)} characters from XLSX")
-        elif doc_type == "html":
-            content = extract_html_content(file_bytes)
-            logger.info(f"Extracted {len(content)} characters from HTML")
+    except HTTPException:
+        raise
+    except (DocumentTooLarge, ExtractionTooLarge) as e:
+        logger.warning(f"Document too large: {request.url}")
+        raise HTTPException(status_code=413, detail=str(e))
+    except ExtractionTimeout as e:
+        logger.warning(f"Document extraction timed out: {request.url}")
+        raise HTTPException(status_code=504, detail=str(e))
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.error(f"Error downloading document: {e}")
+        raise HTTPException(status_code=400, detail=f"Failed to download document: {str(e) or 'timed out'}")
+    except Exception as e:
+        logger.error(f"Error parsing document: {e}")
+        raise HTTPException(status_code=500, detail=f"Error parsing document: {str(e)}")
+
+def _event(event: str, **fields) -> bytes:
+    return (dumps({"event": event, **fields}) + "\n").encode("utf-8")
+
+async def iter_parse_events(
+    url: str,
+    title: str,
+    parsed: Optional[Dict],
+    document: Optional[DownloadedDocument],
+    index: bool = False
+) -> AsyncIterator[bytes]:
+    """
+    NDJSON events for a streamed parse
+    
+    {"event": "start"}, then one {"event": "section"} per page, sheet or
+    section with progress counts, then {"event": "done"} carrying the same
+    fields as /document/parse, or {"event": "error"} if parsing fails part way.
+    """
+    try:
+        if parsed is not None:
+            # Replay cached sections; they are ready all at once
+            sections = split_sections(parsed["content"], parsed.get("outline"))
+            unit = SECTION_UNITS.get(parsed["doc_type"], "section") if parsed.get("outline") else "document"
+            yield _event("start", title=title, doc_type=parsed["doc_type"], unit=unit, cached=True)
+            for i, (label, content) in enumerate(sections):
+                yield _event(
+                    "section", index=i, total=len(sections), label=label, content=content,
+                    progress={"done": i + 1, "total": len(sections)}
+                )
         else:
-            # Try all parsers
-            logger.info("Unknown document type, trying all parsers...")
-            for parser_name, parser_func in [
-                ("PDF", extract_pdf_content),
-                ("DOCX", extract_docx_content),
-                ("XLSX", extract_xlsx_content),
-                ("HTML", extract_html_content)
-            ]:
-                try:
-                    content = parser_func(file_bytes)
-                    doc_type = parser_name.lower()
-                    logger.info(f"Successfully parsed as {parser_name}")
-                    break
-                except:
-                    continue
-            
-            if not content:
-                raise HTTPException(
-                    status_code=400,
-                    detail="Unable to parse document. Supported formats: PDF, DOCX, XLSX, HTML"
+            doc_type = detect_doc_type(document, url)
+            if doc_type in SECTION_UNITS:
+                yield _event("start", title=title, doc_type=doc_type, unit=SECTION_UNITS[doc_type], cached=False)
+                sections = []
+                async for section in extraction_engine.iter_sections(doc_type, document.file, url):
+                    sections.append(section)
+                    yield _event(
+                        "section", **section,
+                        progress={"done": section["index"] + 1, "total": section["total"]}
+                    )
+                content, outline = join_sections(sections)
+                if not content.strip():
+                    raise HTTPException(
+                        status_code=400,
+                        detail="Document appears to be empty or content could not be extracted"
+                    )
+                await document_cache.put_content(document.sha256, doc_type, content, outline)
+                parsed = {"sha256": document.sha256, "content": content, "doc_type": doc_type, "outline": outline}
+            else:
+                # Type unknown until a parser succeeds; nothing to stream early
+                parsed = await parse_and_cache(document.sha256, doc_type, document.file, url)
+                yield _event("start", title=title, doc_type=parsed["doc_type"], unit="document", cached=False)
+                yield _event(
+                    "section", index=0, total=1, label=title, content=parsed["content"],
+                    progress={"done": 1, "total": 1}
                 )
         
-        if not content.strip():
-            raise HTTPException(
-                status_code=400,
-                detail="Document appears to be empty or content could not be extracted"
-            )
-        
-        # Truncate content if too large (max ~15000 characters = ~3750 tokens)
-        # This prevents Groq API token limit errors
-        MAX_CONTENT_LENGTH = 15000
-        total_length = len(content)
-        is_truncated = False
+        yield _event(
+            "done", success=True, title=title, doc_type=parsed["doc_type"],
+            **await document_fields(parsed, title, url, index)
+        )
+    except HTTPException as e:
+        yield _event("error", status=e.status_code, detail=e.detail)
+    except ExtractionTooLarge as e:
+        yield _event("error", status=413, detail=str(e))
+    except ExtractionTimeout as e:
+        yield _event("error", status=504, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error streaming document parse: {e}")
+        yield _event("error", status=500, detail=f"Error parsing document: {str(e)}")
+    finally:
+        if document is not None:
+            document.close()
+
+@router.post("/document/parse-stream")
+async def parse_document_stream(request: ParseDocumentRequest):
+    """
+    Parse document from URL, streaming NDJSON events as pages are extracted.
+    Supports: PDF, DOCX, XLSX, HTML
+    
+    Download failures are reported as HTTP errors before the stream starts;
+    extraction failures arrive as an "error" event.
+    """
+    try:
+        url = request.url
+        logger.info(f"Streaming parse of document from URL: {url}")
+        parsed, document = await open_document(url)
         
-        if total_length > MAX_CONTENT_LENGTH:
-            is_truncated = True
-            # Keep first 70% and last 10% to preserve context
-            first_part_length = int(MAX_CONTENT_LENGTH * 0.7)
-            last_part_length = int(MAX_CONTENT_LENGTH * 0.1)
-            
-            content = (
-                content[:first_part_length] + 
-                f"\n\n... [Content truncated - showing first {first_part_length} and last {last_part_length} characters of {total_length} total] ...\n\n" +
-                content[-last_part_length:]
+        try:
+            return StreamingResponse(
+                iter_parse_events(url, url.split('/')[-1], parsed, document, request.index),
+                media_type="application/x-ndjson",
+                # The stream closes the document itself, unless it never starts
+                background=BackgroundTask(document.close) if document is not None else None
             )
-            logger.info(f"Truncated content from {total_length} to {len(content)} characters")
-        
-        return ParseDocumentResponse(
-            success=True,
-            content=content,
-            title=title,
-            doc_type=doc_type,
-            is_truncated=is_truncated,
-            total_length=total_length
-        )
+        except BaseException:
+            if document is not None:
+                document.close()
+            raise
         
-    except requests.exceptions.RequestException as e:
+    except DocumentTooLarge as e:
+        logger.warning(f"Document too large: {request.url}")
+        raise HTTPException(status_code=413, detail=str(e))
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
         logger.error(f"Error downloading document: {e}")
-        raise HTTPException(status_code=400, detail=f"Failed to download document: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Failed to download document: {str(e) or 'timed out'}")
     except Exception as e:
         logger.error(f"Error parsing document: {e}")
         raise HTTPException(status_code=500, detail=f"Error parsing document: {str(e)}")
 
 @router.post("/document/upload-parse")
-async def parse_uploaded_document(file: UploadFile = File(...)):
+async def parse_uploaded_document(file: UploadFile = File(...), index: bool = False):
     """
     Parse uploaded document file and extract text content.
     Supports: PDF, DOCX, XLSX
+    
+    With index=true the whole document is indexed and a document_id and
+    outline are returned instead of its text.
     """
     try:
         logger.info(f"Parsing uploaded file: {file.filename}")
         
-        # Read file bytes
-        file_bytes = await file.read()
+        # Uploads are already spooled to a temporary file; parse from it directly
+        source = file.file
         
         # Determine document type from filename
         filename_lower = file.filename.lower()
@@ -237,53 +371,133 @@ async def parse_uploaded_document(file: UploadFile = File(...)):
         
         if filename_lower.endswith('.pdf'):
             doc_type = "pdf"
-            content = extract_pdf_content(file_bytes)
         elif filename_lower.endswith('.docx') or filename_lower.endswith('.doc'):
             doc_type = "docx"
-            content = extract_docx_content(file_bytes)
         elif filename_lower.endswith('.xlsx') or filename_lower.endswith('.xls'):
             doc_type = "xlsx"
-            content = extract_xlsx_content(file_bytes)
         else:
             raise HTTPException(
                 status_code=400,
                 detail="Unsupported file type. Supported formats: PDF, DOCX, XLSX"
             )
         
-        if not content.strip():
-            raise HTTPException(
-                status_code=400,
-                detail="Document appears to be empty or content could not be extracted"
-            )
+        # Identical files are only parsed once
+        sha256 = await asyncio.to_thread(content_sha256, source)
+        parsed = await document_cache.get_content(sha256)
         
-        # Truncate content if too large
-        MAX_CONTENT_LENGTH = 15000
-        total_length = len(content)
-        is_truncated = False
+        cached = parsed is not None
         
-        if total_length > MAX_CONTENT_LENGTH:
-            is_truncated = True
-            first_part_length = int(MAX_CONTENT_LENGTH * 0.7)
-            last_part_length = int(MAX_CONTENT_LENGTH * 0.1)
-            
-            content = (
-                content[:first_part_length] + 
-                f"\n\n... [Content truncated - showing first {first_part_length} and last {last_part_length} characters of {total_length} total] ...\n\n" +
-                content[-last_part_length:]
-            )
-            logger.info(f"Truncated uploaded file content from {total_length} to {len(content)} characters")
+        if cached:
+            logger.info(f"Parsed text cache hit for upload {file.filename}")
+        else:
+            # Extraction runs in the worker pool, off the event loop
+            parsed = await parse_and_cache(sha256, doc_type, source)
         
         return ParseDocumentResponse(
             success=True,
-            content=content,
             title=file.filename,
-            doc_type=doc_type,
-            is_truncated=is_truncated,
-            total_length=total_length
+            doc_type=parsed["doc_type"],
+            cached=cached,
+            **await document_fields(parsed, file.filename, file.filename, index)
         )
         
     except HTTPException:
         raise
+    except ExtractionTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ExtractionTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         logger.error(f"Error parsing uploaded document: {e}")
         raise HTTPException(status_code=500, detail=f"Error parsing document: {str(e)}")
+
+def copy_upload(file: UploadFile) -> UploadFile:
+    """
+    A copy of an upload that outlives the request handler (blocking)
+    
+    Form uploads are closed when the endpoint returns, before a streamed
+    response has been sent.
+    """
+    copy = SpooledTemporaryFile(max_size=DOCUMENT_SPOOL_MEMORY_BYTES)
+    file.file.seek(0)
+    shutil.copyfileobj(file.file, copy)
+    copy.seek(0)
+    return UploadFile(file=copy, filename=file.filename)
+
+async def parse_batch_item(
+    index: int,
+    source: Dict,
+    parse: Callable[[], Awaitable[ParseDocumentResponse]],
+    semaphore: asyncio.Semaphore
+) -> Dict:
+    """Run one document of a batch, turning its failure into a result"""
+    async with semaphore:
+        try:
+            response = await parse()
+            return {"index": index, **source, **response.model_dump()}
+        except HTTPException as e:
+            return {"index": index, **source, "success": False, "status": e.status_code, "error": e.detail}
+
+async def iter_batch_events(
+    jobs: List[Tuple[Dict, Callable[[], Awaitable[ParseDocumentResponse]]]],
+    uploads: List[UploadFile]
+) -> AsyncIterator[bytes]:
+    """
+    NDJSON events for a batch parse: {"event": "start"}, one
+    {"event": "result"} per document in completion order, then {"event": "done"}
+    """
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    tasks = [
+        asyncio.ensure_future(parse_batch_item(i, source, parse, semaphore))
+        for i, (source, parse) in enumerate(jobs)
+    ]
+    succeeded = 0
+    try:
+        yield _event("start", total=len(tasks))
+        for completed, next_result in enumerate(asyncio.as_completed(tasks), start=1):
+            result = await next_result
+            succeeded += result["success"]
+            yield _event("result", **result, progress={"done": completed, "total": len(tasks)})
+        yield _event("done", total=len(tasks), succeeded=succeeded, failed=len(tasks) - succeeded)
+    finally:
+        # Stop the remaining documents if the client went away
+        for task in tasks:
+            task.cancel()
+        for upload in uploads:
+            upload.file.close()
+
+@router.post("/document/parse-batch")
+async def parse_document_batch(
+    urls: List[str] = Form([]),
+    files: List[UploadFile] = File([]),
+    index: bool = Form(False)
+):
+    """
+    Parse many documents (URLs and/or uploads) concurrently, streaming NDJSON
+    results as each one finishes.
+    
+    Downloads share a connection pool with per-host limits and extraction
+    runs in the worker pool; each result carries the same fields as
+    /document/parse (or upload-parse) plus its index, url or filename.
+    """
+    total = len(urls) + len(files)
+    if not total:
+        raise HTTPException(status_code=400, detail="No documents to parse")
+    if total > BATCH_MAX_DOCUMENTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many documents in one batch (limit {BATCH_MAX_DOCUMENTS})"
+        )
+    
+    logger.info(f"Parsing batch of {len(urls)} URLs and {len(files)} uploads")
+    uploads = [await asyncio.to_thread(copy_upload, file) for file in files]
+    jobs = [
+        ({"url": url}, partial(parse_document, ParseDocumentRequest(url=url, index=index)))
+        for url in urls
+    ]
+    jobs += [
+        ({"filename": upload.filename}, partial(parse_uploaded_document, upload, index))
+        for upload in uploads
+    ]
+    
+    return StreamingResponse(iter_batch_events(jobs, uploads), media_type="application/x-ndjson")
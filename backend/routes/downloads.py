@@ -5,6 +5,7 @@ from pydantic import BaseModel
 from datetime import datetime
 from database.mongodb import get_database
 from database.models import DownloadModel
+from database.pagination import paginate
 from bson import ObjectId
 
 router = APIRouter()
@@ -41,17 +42,18 @@ async def create_download(download: DownloadCreate, user_id: str = "default_user
 
 
 @router.get("/downloads")
-async def get_downloads(user_id: str = "default_user", limit: int = 100):
-    """Get all downloads for a user"""
+async def get_downloads(user_id: str = "default_user", limit: int = 100, cursor: Optional[str] = None):
+    """Get downloads for a user, newest first, one page at a time"""
     try:
         db = get_database()
-        cursor = db.downloads.find({"user_id": user_id}).sort("started_at", -1).limit(limit)
-        downloads = await cursor.to_list(length=limit)
+        downloads, next_cursor = await paginate(db.downloads, {"user_id": user_id}, "started_at", limit, cursor)
         
         for download in downloads:
             download["_id"] = str(download["_id"])
         
-        return {"success": True, "downloads": downloads}
+        return {"success": True, "downloads": downloads, "next_cursor": next_cursor}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -3,6 +3,7 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import List, Optional
 from services.focus_mode import focus_service
+from services.domain_reputation import domain_reputation_store
 from services.database_service import db_service
 from database.models import FocusSessionModel
 
@@ -37,6 +38,13 @@ async def start_focus_session(session: FocusSessionCreate, user_id: str = "defau
         settings = await db_service.get_settings(user_id)
         strict_mode = settings.get("focus_mode_strict", False)
         
+        # Join a shared topic cluster so earlier checks from similar sessions are reused
+        topic_cluster_id = await domain_reputation_store.resolve_topic_cluster(
+            session.topic,
+            session.description or "",
+            session.keywords
+        )
+        
         # Create focus session
         focus_session = FocusSessionModel(
             user_id=user_id,
@@ -44,6 +52,7 @@ async def start_focus_session(session: FocusSessionCreate, user_id: str = "defau
             description=session.description,
             keywords=session.keywords,
             allowed_domains=session.allowed_domains,
+            topic_cluster_id=topic_cluster_id,
             active=True
         )
         
@@ -119,7 +128,8 @@ async def check_url(request: URLCheckRequest, user_id: str = "default_user"):
             topic=session["topic"],
             description=session.get("description", ""),
             keywords=session.get("keywords", []),
-            strict_mode=strict_mode
+            strict_mode=strict_mode,
+            cluster_id=session.get("topic_cluster_id")
         )
         
         # Update session stats
@@ -130,6 +140,7 @@ async def check_url(request: URLCheckRequest, user_id: str = "default_user"):
             "allowed": result["allowed"],
             "reason": result["reason"],
             "confidence": result["confidence"],
+            "shared_verdict": result.get("shared_verdict", False),
             "session_active": True,
             "topic": session["topic"]
         }
@@ -162,7 +173,8 @@ async def check_multiple_urls(request: BatchURLCheckRequest, user_id: str = "def
             topic=session["topic"],
             description=session.get("description", ""),
             keywords=session.get("keywords", []),
-            strict_mode=strict_mode
+            strict_mode=strict_mode,
+            cluster_id=session.get("topic_cluster_id")
         )
         
         return {
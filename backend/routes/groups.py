@@ -1,25 +1,99 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header, Response
 from database.mongodb import get_database
+from database.text_search import TEXT_SCORE, prefix_filter, text_filter
+from database.compression import pack_body, unpack_body, is_truncated, preview_projection
+from database.pagination import MAX_PAGE_SIZE, paginate, encode_sync_token, decode_sync_token
+from services.realtime import realtime_hub, group_channel
+from services.group_cache import group_cache
+from services.vector_store import vector_store
 from database.group_model import (
     Group, GroupMember, SharedContext,
     CreateGroupRequest, JoinGroupRequest,
     AddContextRequest, GetGroupContextRequest
 )
-from datetime import datetime
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+import asyncio
 import logging
 import secrets
 import string
-from typing import List
+from typing import Dict, List, Optional
 from bson import ObjectId
+import hashlib
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# A gap in the change sequence older than this is a failed insert, not one still in flight
+SEQ_GAP_SECONDS = 30
+
+# Keep references to fire-and-forget tasks so they are not garbage collected
+_background_tasks = set()
+
+def run_in_background(coro):
+    """Schedule a coroutine without awaiting it"""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
 def generate_invite_code(length=8):
     """Generate a random invite code"""
     characters = string.ascii_uppercase + string.digits
     return ''.join(secrets.choice(characters) for _ in range(length))
 
+async def next_context_seq(db, group_id: str) -> Optional[int]:
+    """
+    Allocate the group's next change sequence number (None if the group is gone)
+
+    Every added context and every deletion tombstone gets one, so delta sync
+    orders changes by a per-group counter instead of server clocks.
+    """
+    group = await db.groups.find_one_and_update(
+        {"_id": ObjectId(group_id)},
+        {"$inc": {"context_seq": 1}},
+        projection={"context_seq": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    return group["context_seq"] if group else None
+
+def synced_through(since: int, changes: Dict[int, datetime], now: datetime) -> int:
+    """
+    Highest sequence number a client holding `changes` is synced through
+
+    Sequence numbers are allocated just before their insert, so a missing
+    number right after a newer change may still appear; the position stops
+    before such a gap (the newer changes are sent again next time) unless
+    the gap is older than SEQ_GAP_SECONDS.
+    """
+    position = since
+    settled = now - timedelta(seconds=SEQ_GAP_SECONDS)
+    for seq in sorted(changes):
+        if seq <= position:
+            continue
+        if seq != position + 1 and changes[seq] > settled:
+            break
+        position = seq
+    return position
+
+def serialize_context(ctx: dict) -> dict:
+    """List-view representation of a shared context (content truncated)"""
+    truncated = is_truncated(ctx) or len(ctx["content"]) > 500
+    return {
+        "id": str(ctx["_id"]),
+        "user_id": ctx["user_id"],
+        "user_name": ctx["user_name"],
+        "page_url": ctx["page_url"],
+        "page_title": ctx["page_title"],
+        "content": ctx["content"][:500] + "..." if truncated else ctx["content"],  # Truncate for list view
+        "content_length": ctx.get("content_length", len(ctx["content"])),
+        "truncated": truncated,
+        "content_type": ctx["content_type"],
+        "search_query": ctx.get("search_query"),
+        "tags": ctx.get("tags", []),
+        "timestamp": ctx["timestamp"].isoformat()
+    }
+
 @router.post("/groups/create")
 async def create_group(request: CreateGroupRequest, user_id: str = "default_user"):
     """Create a new group"""
@@ -44,6 +118,7 @@ async def create_group(request: CreateGroupRequest, user_id: str = "default_user
             description=request.description,
             created_by=user_id,
             invite_code=invite_code,
+            member_count=1,
             members=[
                 GroupMember(
                     user_id=user_id,
@@ -103,16 +178,32 @@ async def join_group(request: JoinGroupRequest, user_id: str = "default_user"):
             role="member"
         )
         
+        update = {
+            "$push": {"members": new_member.model_dump()},
+            "$set": {"updated_at": datetime.utcnow()}
+        }
+        if "member_count" in group:
+            update["$inc"] = {"member_count": 1}
+        else:
+            # Group created before the counter existed
+            update["$set"]["member_count"] = len(group.get("members", [])) + 1
+        
         await db.groups.update_one(
-            {"_id": group["_id"]},
-            {
-                "$push": {"members": new_member.model_dump()},
-                "$set": {"updated_at": datetime.utcnow()}
-            }
+            {"_id": group["_id"], "members.user_id": {"$ne": user_id}},
+            update
         )
         
+        group_cache.invalidate(str(group["_id"]))
+        
         logger.info(f"User {user_id} joined group {group['name']}")
         
+        await realtime_hub.publish(group_channel(str(group["_id"])), {
+            "type": "member_joined",
+            "group_id": str(group["_id"]),
+            "user_id": user_id,
+            "user_name": user_name
+        })
+        
         return {
             "success": True,
             "group_id": str(group["_id"]),
@@ -132,27 +223,56 @@ async def get_my_groups(user_id: str = "default_user"):
     try:
         db = get_database()
         
-        # Find all groups where user is a member
-        groups = await db.groups.find({
-            "members.user_id": user_id,
-            "is_active": True
-        }).to_list(length=100)
+        # Find all groups where user is a member, returning only the caller's
+        # member entry and the denormalized counters
+        groups = await db.groups.aggregate([
+            {"$match": {"members.user_id": user_id, "is_active": True}},
+            {"$limit": 100},
+            {"$project": {
+                "name": 1,
+                "description": 1,
+                "invite_code": 1,
+                "created_at": 1,
+                "context_count": 1,
+                "member_count": {"$ifNull": ["$member_count", {"$size": "$members"}]},
+                "me": {"$filter": {
+                    "input": "$members",
+                    "as": "member",
+                    "cond": {"$eq": ["$$member.user_id", user_id]}
+                }}
+            }}
+        ]).to_list(length=100)
+        
+        # Groups created before the counters existed: count their contexts
+        # in one grouped query and store the result
+        missing = [str(g["_id"]) for g in groups if "context_count" not in g]
+        if missing:
+            counts = {
+                row["_id"]: row["count"]
+                for row in await db.shared_contexts.aggregate([
+                    {"$match": {"group_id": {"$in": missing}}},
+                    {"$group": {"_id": "$group_id", "count": {"$sum": 1}}}
+                ]).to_list(length=len(missing))
+            }
+            for group in groups:
+                if "context_count" not in group:
+                    group["context_count"] = counts.get(str(group["_id"]), 0)
+                    await db.groups.update_one(
+                        {"_id": group["_id"], "context_count": {"$exists": False}},
+                        {"$set": {"context_count": group["context_count"], "member_count": group["member_count"]}}
+                    )
         
         result = []
         for group in groups:
-            # Count members and contexts
-            member_count = len(group.get("members", []))
-            context_count = await db.shared_contexts.count_documents({"group_id": str(group["_id"])})
-            
             result.append({
                 "id": str(group["_id"]),
                 "name": group["name"],
                 "description": group.get("description"),
                 "invite_code": group["invite_code"],
-                "member_count": member_count,
-                "context_count": context_count,
+                "member_count": group["member_count"],
+                "context_count": group["context_count"],
                 "created_at": group["created_at"].isoformat(),
-                "is_admin": any(m["user_id"] == user_id and m["role"] == "admin" for m in group.get("members", []))
+                "is_admin": any(m["role"] == "admin" for m in group.get("me", []))
             })
         
         return {
@@ -173,19 +293,19 @@ async def get_group_details(group_id: str, user_id: str = "default_user"):
         if not ObjectId.is_valid(group_id):
             raise HTTPException(status_code=400, detail="Invalid group ID")
         
-        group = await db.groups.find_one({"_id": ObjectId(group_id)})
+        group = await group_cache.get(group_id)
         
         if not group:
             raise HTTPException(status_code=404, detail="Group not found")
         
         # Check if user is a member
-        is_member = any(member["user_id"] == user_id for member in group.get("members", []))
-        
-        if not is_member:
+        if not await group_cache.is_member(group_id, user_id):
             raise HTTPException(status_code=403, detail="You are not a member of this group")
         
-        # Get context count
-        context_count = await db.shared_contexts.count_documents({"group_id": group_id})
+        # Get context count (counted once for groups created before the counter)
+        context_count = group.get("context_count")
+        if context_count is None:
+            context_count = await db.shared_contexts.count_documents({"group_id": group_id})
         
         return {
             "success": True,
@@ -217,19 +337,17 @@ async def add_shared_context(request: AddContextRequest, user_id: str = "default
         if not ObjectId.is_valid(request.group_id):
             raise HTTPException(status_code=400, detail="Invalid group ID")
         
-        group = await db.groups.find_one({"_id": ObjectId(request.group_id)})
+        group = await group_cache.get(request.group_id)
         
         if not group:
             raise HTTPException(status_code=404, detail="Group not found")
         
-        is_member = any(member["user_id"] == user_id for member in group.get("members", []))
+        user_member = await group_cache.get_member(request.group_id, user_id)
         
-        if not is_member:
+        if not user_member:
             raise HTTPException(status_code=403, detail="You are not a member of this group")
         
-        # Get user name
-        user_member = next((m for m in group.get("members", []) if m["user_id"] == user_id), None)
-        user_name = user_member["user_name"] if user_member else f"User_{user_id}"
+        user_name = user_member["user_name"]
         
         # Create shared context
         context = SharedContext(
@@ -244,16 +362,45 @@ async def add_shared_context(request: AddContextRequest, user_id: str = "default
             tags=request.tags
         )
         
-        result = await db.shared_contexts.insert_one(context.model_dump(by_alias=True, exclude=["id"]))
+        context_doc = context.model_dump(by_alias=True, exclude=["id"])
+        # Large bodies are stored compressed, with only a preview inline
+        context_doc.update(pack_body(request.content))
+        context_doc["seq"] = await next_context_seq(db, request.group_id)
+        if context_doc["seq"] is None:
+            raise HTTPException(status_code=404, detail="Group not found")
+        result = await db.shared_contexts.insert_one(context_doc)
         
-        # Update group's updated_at
-        await db.groups.update_one(
-            {"_id": ObjectId(request.group_id)},
-            {"$set": {"updated_at": datetime.utcnow()}}
-        )
+        # Update group's updated_at and context counter
+        update = {"$set": {"updated_at": datetime.utcnow()}}
+        if "context_count" in group:
+            update["$inc"] = {"context_count": 1}
+        else:
+            # Group created before the counter existed
+            update["$set"]["context_count"] = await db.shared_contexts.count_documents({"group_id": request.group_id})
+        
+        await db.groups.update_one({"_id": ObjectId(request.group_id)}, update)
+        group_cache.invalidate(request.group_id)
         
         logger.info(f"Added shared context to group {request.group_id} by user {user_id}")
         
+        # Index the content for retrieval by group AI chat without delaying the response
+        run_in_background(vector_store.store_group_context(
+            group_id=request.group_id,
+            context_id=str(result.inserted_id),
+            title=request.page_title,
+            url=request.page_url,
+            user_name=user_name,
+            content=request.content,
+            timestamp=context.timestamp
+        ))
+        
+        # Push the new item to subscribed members
+        await realtime_hub.publish(group_channel(request.group_id), {
+            "type": "context_added",
+            "group_id": request.group_id,
+            "context": serialize_context({**context_doc, "_id": result.inserted_id})
+        })
+        
         return {
             "success": True,
             "context_id": str(result.inserted_id),
@@ -266,9 +413,35 @@ async def add_shared_context(request: AddContextRequest, user_id: str = "default
         logger.error(f"Error adding shared context: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def context_etag(group: dict, request: GetGroupContextRequest) -> str:
+    """
+    Weak ETag for a context listing: changes whenever the group is updated
+
+    `group` must be read from the database, not the group cache, which may
+    lag behind a change made by another API process. The since token itself
+    is left out so a steady-state delta poll, which gets the same sync
+    cursor back while nothing changed, still matches.
+    """
+    updated_at = group.get("updated_at") or group.get("created_at")
+    params = f"{bool(request.since)}|{request.cursor}|{request.query}|{request.limit}"
+    digest = hashlib.sha1(params.encode()).hexdigest()[:12]
+    return f'W/"{group["_id"]}-{group.get("context_seq", 0)}-{int(updated_at.timestamp() * 1000)}-{digest}"'
+
 @router.post("/groups/context/get")
-async def get_shared_context(request: GetGroupContextRequest, user_id: str = "default_user"):
-    """Get all shared context from a group"""
+async def get_shared_context(
+    request: GetGroupContextRequest,
+    response: Response,
+    user_id: str = "default_user",
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    Get shared context from a group
+
+    Pass the returned sync_cursor as `since` to receive only contexts added
+    and deleted since then; a delta may repeat contexts the client already
+    has, so merge them by id. Send the returned ETag in If-None-Match to get
+    304 Not Modified when nothing in the group has changed.
+    """
     try:
         db = get_database()
         
@@ -276,56 +449,233 @@ async def get_shared_context(request: GetGroupContextRequest, user_id: str = "de
         if not ObjectId.is_valid(request.group_id):
             raise HTTPException(status_code=400, detail="Invalid group ID")
         
-        group = await db.groups.find_one({"_id": ObjectId(request.group_id)})
+        group = await group_cache.get(request.group_id)
         
         if not group:
             raise HTTPException(status_code=404, detail="Group not found")
         
-        is_member = any(member["user_id"] == user_id for member in group.get("members", []))
-        
-        if not is_member:
+        if not await group_cache.is_member(request.group_id, user_id):
             raise HTTPException(status_code=403, detail="You are not a member of this group")
         
+        version = await db.groups.find_one(
+            {"_id": ObjectId(request.group_id)},
+            {"context_seq": 1, "updated_at": 1, "created_at": 1}
+        )
+        if not version:
+            raise HTTPException(status_code=404, detail="Group not found")
+        
+        etag = context_etag(version, request)
+        if if_none_match == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+        
+        if request.since:
+            return await _get_context_delta(db, request)
+        
         # Build query
         query = {"group_id": request.group_id}
+        search = text_filter(request.query) if request.query else None
+        
+        next_cursor = None
+        if search:
+            # Optional text search, best matches first (single page)
+            contexts = await _search_contexts(db, request.group_id, request.query, search, request.limit)
+        else:
+            # Get contexts sorted by timestamp (newest first), one page at a time
+            contexts, next_cursor = await paginate(
+                db.shared_contexts, query, "timestamp", request.limit, request.cursor,
+                projection=preview_projection()
+            )
+        
+        # Previews only; full bodies are fetched per item from /groups/context/{id}
+        result = [serialize_context(ctx) for ctx in contexts]
+        
+        # The first unfiltered page holds the newest items, so it can seed delta sync
+        sync_cursor = None
+        if not search and not request.cursor:
+            changes = {ctx["seq"]: ctx["timestamp"] for ctx in contexts if ctx.get("seq")}
+            start = min(changes) - 1 if changes else version.get("context_seq", 0)
+            sync_cursor = encode_sync_token(synced_through(start, changes, datetime.utcnow()))
         
-        # Optional text search
-        if request.query:
-            query["$or"] = [
-                {"content": {"$regex": request.query, "$options": "i"}},
-                {"page_title": {"$regex": request.query, "$options": "i"}},
-                {"search_query": {"$regex": request.query, "$options": "i"}}
-            ]
+        return {
+            "success": True,
+            "contexts": result,
+            "total": len(result),
+            "next_cursor": next_cursor,
+            "sync_cursor": sync_cursor
+        }
         
-        # Get contexts sorted by timestamp (newest first)
-        contexts = await db.shared_contexts.find(query).sort("timestamp", -1).limit(request.limit).to_list(length=request.limit)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting shared context: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def _search_contexts(db, group_id: str, text: str, search: dict, limit: int) -> List[dict]:
+    """
+    Contexts matching a search: $text first, then word prefixes, then meaning
+
+    Compressed contexts only have their preview in the text index, so when
+    both text searches come up empty the group's vector index, which holds
+    their full bodies, is searched for them.
+    """
+    query = {"group_id": group_id, **search}
+    contexts = await db.shared_contexts.find(
+        query, {**preview_projection(), "score": TEXT_SCORE}
+    ).sort([("score", TEXT_SCORE), ("timestamp", -1)]).limit(limit).to_list(length=limit)
+    if contexts:
+        return contexts
+    
+    query = {"group_id": group_id, **prefix_filter(text, ["page_title", "search_query", "content"])}
+    contexts = await db.shared_contexts.find(query, preview_projection()).sort(
+        [("timestamp", -1), ("_id", -1)]
+    ).limit(limit).to_list(length=limit)
+    if contexts:
+        return contexts
+    
+    chunks = await vector_store.query_group_context(group_id, text, n_results=limit)
+    ranked = list(dict.fromkeys(chunk["metadata"]["context_id"] for chunk in chunks))
+    ids = [ObjectId(context_id) for context_id in ranked if ObjectId.is_valid(context_id)]
+    if not ids:
+        return []
+    found = await db.shared_contexts.find(
+        {"_id": {"$in": ids}, "group_id": group_id, "content_z": {"$exists": True}},
+        preview_projection()
+    ).to_list(length=len(ids))
+    by_id = {str(ctx["_id"]): ctx for ctx in found}
+    return [by_id[context_id] for context_id in ranked if context_id in by_id]
+
+async def _get_context_delta(db, request: GetGroupContextRequest) -> dict:
+    """Contexts added and deleted since the client's sync cursor"""
+    since = decode_sync_token(request.since)
+    limit = max(1, min(request.limit, MAX_PAGE_SIZE))
+    now = datetime.utcnow()
+    
+    added = await db.shared_contexts.find(
+        {"group_id": request.group_id, "seq": {"$gt": since}},
+        preview_projection()
+    ).sort("seq", 1).limit(limit + 1).to_list(length=limit + 1)
+    
+    has_more = len(added) > limit
+    added = added[:limit]
+    
+    deleted = await db.shared_context_tombstones.find(
+        {"group_id": request.group_id, "seq": {"$gt": since}},
+        {"context_id": 1, "seq": 1, "context_seq": 1, "deleted_at": 1}
+    ).to_list(length=None)
+    
+    changes = {ctx["seq"]: ctx["timestamp"] for ctx in added}
+    for tombstone in deleted:
+        changes[tombstone["seq"]] = tombstone["deleted_at"]
+        if tombstone.get("context_seq"):
+            # The deleted context's own number is accounted for too
+            changes[tombstone["context_seq"]] = tombstone["deleted_at"]
+    if has_more:
+        # Later changes are on the next page
+        changes = {seq: at for seq, at in changes.items() if seq <= added[-1]["seq"]}
+    sync_cursor = encode_sync_token(synced_through(since, changes, now))
+    
+    return {
+        "success": True,
+        "contexts": [
+            serialize_context(ctx)
+            for ctx in reversed(added)  # Newest first, like the full listing
+        ],
+        "deleted": [tombstone["context_id"] for tombstone in deleted],
+        "total": len(added),
+        "has_more": has_more,
+        "sync_cursor": sync_cursor
+    }
+
+@router.get("/groups/context/{context_id}")
+async def get_shared_context_item(context_id: str, user_id: str = "default_user"):
+    """Get one shared context with its full content"""
+    try:
+        db = get_database()
         
-        result = []
-        for ctx in contexts:
-            result.append({
-                "id": str(ctx["_id"]),
-                "user_id": ctx["user_id"],
-                "user_name": ctx["user_name"],
-                "page_url": ctx["page_url"],
-                "page_title": ctx["page_title"],
-                "content": ctx["content"][:500] + "..." if len(ctx["content"]) > 500 else ctx["content"],  # Truncate for list view
-                "full_content": ctx["content"],  # Full content for AI
-                "content_type": ctx["content_type"],
-                "search_query": ctx.get("search_query"),
-                "tags": ctx.get("tags", []),
-                "timestamp": ctx["timestamp"].isoformat()
+        if not ObjectId.is_valid(context_id):
+            raise HTTPException(status_code=400, detail="Invalid context ID")
+        
+        context = await db.shared_contexts.find_one({"_id": ObjectId(context_id)})
+        
+        if not context:
+            raise HTTPException(status_code=404, detail="Context not found")
+        
+        if not await group_cache.is_member(context["group_id"], user_id):
+            raise HTTPException(status_code=403, detail="You are not a member of this group")
+        
+        return {
+            "success": True,
+            "context": {
+                **serialize_context(context),
+                "content": unpack_body(context),
+                "truncated": False
+            }
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting shared context item: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.delete("/groups/context/{context_id}")
+async def delete_shared_context(context_id: str, user_id: str = "default_user"):
+    """Delete a shared context (its author or a group admin)"""
+    try:
+        db = get_database()
+        
+        if not ObjectId.is_valid(context_id):
+            raise HTTPException(status_code=400, detail="Invalid context ID")
+        
+        context = await db.shared_contexts.find_one(
+            {"_id": ObjectId(context_id)},
+            {"group_id": 1, "user_id": 1, "seq": 1}
+        )
+        
+        if not context:
+            raise HTTPException(status_code=404, detail="Context not found")
+        
+        group_id = context["group_id"]
+        
+        if context["user_id"] != user_id:
+            member = await group_cache.get_member(group_id, user_id)
+            if not member or member["role"] != "admin":
+                raise HTTPException(status_code=403, detail="Only the author or a group admin can delete this context")
+        
+        result = await db.shared_contexts.delete_one({"_id": ObjectId(context_id)})
+        
+        if result.deleted_count:
+            now = datetime.utcnow()
+            # Tombstones let delta-sync clients drop the item
+            await db.shared_context_tombstones.insert_one({
+                "group_id": group_id,
+                "context_id": context_id,
+                "seq": await next_context_seq(db, group_id),
+                "context_seq": context.get("seq"),
+                "deleted_at": now
+            })
+            await db.groups.update_one(
+                {"_id": ObjectId(group_id), "context_count": {"$gt": 0}},
+                {"$set": {"updated_at": now}, "$inc": {"context_count": -1}}
+            )
+            group_cache.invalidate(group_id)
+            await vector_store.delete_group_context(context_id=context_id)
+            await realtime_hub.publish(group_channel(group_id), {
+                "type": "context_deleted",
+                "group_id": group_id,
+                "context_id": context_id
             })
         
         return {
             "success": True,
-            "contexts": result,
-            "total": len(result)
+            "message": "Context deleted"
         }
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error getting shared context: {e}")
+        logger.error(f"Error deleting shared context: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/groups/{group_id}/leave")
@@ -337,7 +687,7 @@ async def leave_group(group_id: str, user_id: str = "default_user"):
         if not ObjectId.is_valid(group_id):
             raise HTTPException(status_code=400, detail="Invalid group ID")
         
-        group = await db.groups.find_one({"_id": ObjectId(group_id)})
+        group = await group_cache.get(group_id)
         
         if not group:
             raise HTTPException(status_code=404, detail="Group not found")
@@ -348,15 +698,31 @@ async def leave_group(group_id: str, user_id: str = "default_user"):
             raise HTTPException(status_code=400, detail="Cannot leave group as the only admin. Transfer admin role first or delete the group.")
         
         # Remove user from group
-        await db.groups.update_one(
-            {"_id": ObjectId(group_id)},
-            {
-                "$pull": {"members": {"user_id": user_id}},
-                "$set": {"updated_at": datetime.utcnow()}
-            }
+        update = {
+            "$pull": {"members": {"user_id": user_id}},
+            "$set": {"updated_at": datetime.utcnow()}
+        }
+        if "member_count" in group:
+            update["$inc"] = {"member_count": -1}
+        else:
+            # Group created before the counter existed
+            update["$set"]["member_count"] = max(len(group.get("members", [])) - 1, 0)
+        
+        result = await db.groups.update_one(
+            {"_id": ObjectId(group_id), "members.user_id": user_id},
+            update
         )
+        group_cache.invalidate(group_id)
         
-        logger.info(f"User {user_id} left group {group_id}")
+        # Not a member (or already left): nothing changed, nothing to announce
+        if result.modified_count:
+            logger.info(f"User {user_id} left group {group_id}")
+            
+            await realtime_hub.publish(group_channel(group_id), {
+                "type": "member_left",
+                "group_id": group_id,
+                "user_id": user_id
+            })
         
         return {
             "success": True,
@@ -378,25 +744,33 @@ async def delete_group(group_id: str, user_id: str = "default_user"):
         if not ObjectId.is_valid(group_id):
             raise HTTPException(status_code=400, detail="Invalid group ID")
         
-        group = await db.groups.find_one({"_id": ObjectId(group_id)})
+        group = await group_cache.get(group_id)
         
         if not group:
             raise HTTPException(status_code=404, detail="Group not found")
         
         # Check if user is admin
-        user_member = next((m for m in group.get("members", []) if m["user_id"] == user_id), None)
+        user_member = await group_cache.get_member(group_id, user_id)
         
         if not user_member or user_member["role"] != "admin":
             raise HTTPException(status_code=403, detail="Only group admins can delete the group")
         
         # Delete all shared contexts for this group
         await db.shared_contexts.delete_many({"group_id": group_id})
+        await db.shared_context_tombstones.delete_many({"group_id": group_id})
+        await vector_store.delete_group_context(group_id=group_id)
         
         # Delete the group
         await db.groups.delete_one({"_id": ObjectId(group_id)})
+        group_cache.invalidate(group_id)
         
         logger.info(f"Group {group_id} deleted by admin {user_id}")
         
+        await realtime_hub.publish(group_channel(group_id), {
+            "type": "group_deleted",
+            "group_id": group_id
+        })
+        
         return {
             "success": True,
             "message": "Group deleted successfully"
@@ -4,6 +4,9 @@ from typing import List, Optional
 from datetime import datetime
 from database.mongodb import get_database
 from database.notes_model import NoteModel
+from database.pagination import paginate
+from database.compression import body_update, inflate_body, is_truncated, pack_body, preview_projection
+from services.export_stream import export_response, iter_json_envelope, iter_ndjson
 from bson import ObjectId
 import logging
 
@@ -38,7 +41,11 @@ async def create_note(request: CreateNoteRequest):
             created_at=datetime.utcnow()
         )
         
-        result = await notes_collection.insert_one(note.dict(by_alias=True, exclude={"id"}))
+        note_doc = note.dict(by_alias=True, exclude={"id"})
+        # Large bodies are stored compressed, with only a preview inline
+        note_doc.update(pack_body(request.content))
+        
+        result = await notes_collection.insert_one(note_doc)
         
         return {
             "success": True,
@@ -54,9 +61,10 @@ async def create_note(request: CreateNoteRequest):
 async def get_notes(
     user_id: str = "default_user",
     page_url: Optional[str] = None,
-    limit: int = 100
+    limit: int = 100,
+    cursor: Optional[str] = None
 ):
-    """Get all notes, optionally filtered by page URL"""
+    """Get notes, newest first, optionally filtered by page URL"""
     try:
         db = get_database()
         notes_collection = db.notes
@@ -65,19 +73,25 @@ async def get_notes(
         if page_url:
             query["page_url"] = page_url
         
-        cursor = notes_collection.find(query).sort("created_at", -1).limit(limit)
-        notes = await cursor.to_list(length=limit)
+        notes, next_cursor = await paginate(
+            notes_collection, query, "created_at", limit, cursor,
+            projection=preview_projection()
+        )
         
-        # Convert ObjectId to string
+        # Convert ObjectId to string; long notes carry a preview, fetch /notes/{id} for the rest
         for note in notes:
             note["_id"] = str(note["_id"])
+            note["truncated"] = is_truncated(note)
         
         return {
             "success": True,
             "notes": notes,
-            "count": len(notes)
+            "count": len(notes),
+            "next_cursor": next_cursor
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting notes: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -95,6 +109,7 @@ async def get_note(note_id: str):
             raise HTTPException(status_code=404, detail="Note not found")
         
         note["_id"] = str(note["_id"])
+        inflate_body(note)
         
         return {
             "success": True,
@@ -112,9 +127,10 @@ async def update_note(note_id: str, request: UpdateNoteRequest):
         db = get_database()
         notes_collection = db.notes
         
-        update_data = {}
+        update = {"$set": {}}
         if request.content is not None:
-            update_data["content"] = request.content
+            update = body_update(request.content)
+        update_data = update["$set"]
         if request.tags is not None:
             update_data["tags"] = request.tags
         if request.color is not None:
@@ -124,7 +140,7 @@ async def update_note(note_id: str, request: UpdateNoteRequest):
         
         result = await notes_collection.update_one(
             {"_id": ObjectId(note_id)},
-            {"$set": update_data}
+            update
         )
         
         if result.matched_count == 0:
@@ -181,29 +197,41 @@ async def delete_multiple_notes(note_ids: List[str]):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/notes/export/json")
-async def export_notes_json(user_id: str = "default_user"):
-    """Export all notes as JSON"""
+async def export_notes_json(user_id: str = "default_user", gzip: bool = False):
+    """Export all notes as JSON, streamed from the database"""
     try:
         db = get_database()
         notes_collection = db.notes
         
         cursor = notes_collection.find({"user_id": user_id}).sort("created_at", -1)
-        notes = await cursor.to_list(length=None)
         
-        # Convert ObjectId to string and datetime to ISO format
-        for note in notes:
-            note["_id"] = str(note["_id"])
-            if "created_at" in note:
-                note["created_at"] = note["created_at"].isoformat()
-            if "updated_at" in note and note["updated_at"]:
-                note["updated_at"] = note["updated_at"].isoformat()
+        return export_response(
+            iter_json_envelope(cursor, "notes", transform=inflate_body, extra={
+                "success": True,
+                "exported_at": datetime.utcnow().isoformat()
+            }),
+            filename="notes.json",
+            media_type="application/json",
+            gzip=gzip
+        )
         
-        return {
-            "success": True,
-            "notes": notes,
-            "count": len(notes),
-            "exported_at": datetime.utcnow().isoformat()
-        }
+    except Exception as e:
+        logger.error(f"Error exporting notes: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/notes/export/ndjson")
+async def export_notes_ndjson(user_id: str = "default_user", gzip: bool = False):
+    """Export all notes as newline-delimited JSON, one note per line"""
+    try:
+        db = get_database()
+        cursor = db.notes.find({"user_id": user_id}).sort("created_at", -1)
+        
+        return export_response(
+            iter_ndjson(cursor, transform=inflate_body),
+            filename="notes.ndjson",
+            media_type="application/x-ndjson",
+            gzip=gzip
+        )
         
     except Exception as e:
         logger.error(f"Error exporting notes: {e}")
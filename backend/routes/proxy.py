@@ -1,16 +1,40 @@
 from fastapi import APIRouter, HTTPException, Request
-from fastapi.responses import Response
-import requests
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
+from typing import AsyncIterator
+import aiohttp
+import asyncio
 import logging
+from services.http_client import http_client
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Bytes forwarded per chunk while relaying a page
+PROXY_CHUNK_BYTES = 64 * 1024
+
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+    'Access-Control-Allow-Headers': '*',
+}
+
+async def relay_body(response: aiohttp.ClientResponse) -> AsyncIterator[bytes]:
+    """Forward the upstream body as it arrives, then return the connection to the pool"""
+    try:
+        async for chunk in response.content.iter_chunked(PROXY_CHUNK_BYTES):
+            yield chunk
+    finally:
+        response.release()
+
 @router.get("/fetch")
 async def proxy_fetch(url: str):
     """
     Proxy endpoint to fetch web content and bypass CORS
     Usage: /api/proxy/fetch?url=https://example.com
+    
+    Uses the shared pooled HTTP client and streams the page through, so the
+    event loop never blocks and connections are reused across requests.
     """
     try:
         # Validate URL
@@ -18,37 +42,25 @@ async def proxy_fetch(url: str):
             raise HTTPException(status_code=400, detail="Invalid URL")
         
         # Fetch the content
-        response = requests.get(
-            url,
-            headers={
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            },
-            timeout=10
-        )
+        response = await http_client.session.get(url, allow_redirects=True)
         
         # Return the content with CORS headers
-        return Response(
-            content=response.content,
-            status_code=response.status_code,
+        return StreamingResponse(
+            relay_body(response),
+            status_code=response.status,
             media_type=response.headers.get('content-type', 'text/html'),
-            headers={
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
-                'Access-Control-Allow-Headers': '*',
-            }
+            headers=CORS_HEADERS,
+            # Also release if the client disconnects before the body is relayed
+            background=BackgroundTask(response.release)
         )
         
-    except requests.RequestException as e:
-        logger.error(f"Proxy fetch error: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to fetch URL: {str(e)}")
+    except HTTPException:
+        raise
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.error(f"Proxy fetch error: {e!r}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch URL: {str(e) or 'timed out'}")
 
 @router.options("/fetch")
 async def proxy_options():
     """Handle OPTIONS preflight requests"""
-    return Response(
-        headers={
-            'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
-            'Access-Control-Allow-Headers': '*',
-        }
-    )
+    return Response(headers=CORS_HEADERS)
@@ -4,6 +4,8 @@ from typing import List, Dict, Optional
 from datetime import datetime
 from database.mongodb import get_database
 from database.quiz_model import QuizScoreModel, QuizQuestion
+from database.pagination import paginate
+from pymongo.errors import DuplicateKeyError
 from services.groq_client import groq_client
 import logging
 import json
@@ -23,6 +25,124 @@ class SaveQuizScoreRequest(BaseModel):
     questions: List[Dict]
     time_taken_seconds: Optional[int] = None
 
+# Time buckets kept in the per-user quiz rollup
+TREND_PERIODS = {
+    "day": "%Y-%m-%d",
+    "week": "%G-W%V",  # ISO week, same format in Python and $dateToString
+}
+
+
+def _trend_bucket(period: str, completed_at: datetime) -> str:
+    """Bucket key for a quiz completion time"""
+    if period == "week":
+        year, week, _ = completed_at.isocalendar()
+        return f"{year}-W{week:02d}"
+    return completed_at.strftime(TREND_PERIODS[period])
+
+
+async def _update_quiz_rollup(db, user_id: str, percentage: float, total_questions: int, completed_at: datetime):
+    """Atomically fold one quiz result into the user's totals and trend buckets"""
+    await db.quiz_stats.update_one(
+        {"user_id": user_id},
+        {
+            "$inc": {
+                "total_quizzes": 1,
+                "percentage_sum": percentage,
+                "total_questions_answered": total_questions
+            },
+            "$max": {"best_score": percentage},
+            "$set": {"updated_at": datetime.utcnow()}
+        },
+        upsert=True
+    )
+    
+    for period in TREND_PERIODS:
+        await db.quiz_stats_buckets.update_one(
+            {"user_id": user_id, "period": period, "bucket": _trend_bucket(period, completed_at)},
+            {
+                "$inc": {
+                    "quizzes": 1,
+                    "percentage_sum": percentage,
+                    "questions": total_questions
+                },
+                "$max": {"best_score": percentage}
+            },
+            upsert=True
+        )
+
+
+async def _backfill_quiz_rollup(db, user_id: str) -> Optional[Dict]:
+    """
+    Fold scores saved before rollups existed into the user's rollup, once
+
+    Scores saved since carry `rolled_up` and were already counted by
+    _update_quiz_rollup, so only the others are added. Claiming the backfill
+    and adding its totals is one conditional write, so a concurrent backfill
+    (which finds `backfilled` set, or collides on the unique user_id) adds
+    nothing and a concurrent save only counts its own score. Totals and
+    trend buckets are computed server-side with $group; only the small
+    grouped results are transferred, never the questions arrays.
+    """
+    legacy = {"user_id": user_id, "rolled_up": {"$ne": True}}
+    totals = await db.quiz_scores.aggregate([
+        {"$match": legacy},
+        {"$group": {
+            "_id": None,
+            "total_quizzes": {"$sum": 1},
+            "percentage_sum": {"$sum": "$percentage"},
+            "best_score": {"$max": "$percentage"},
+            "total_questions_answered": {"$sum": "$total_questions"}
+        }}
+    ]).to_list(length=1)
+    totals = totals[0] if totals else {}
+    
+    # Written even without legacy scores, so the backfill never runs again
+    update = {
+        "$inc": {
+            "total_quizzes": totals.get("total_quizzes", 0),
+            "percentage_sum": totals.get("percentage_sum", 0),
+            "total_questions_answered": totals.get("total_questions_answered", 0)
+        },
+        "$set": {"backfilled": True, "updated_at": datetime.utcnow()}
+    }
+    if totals.get("best_score") is not None:
+        update["$max"] = {"best_score": totals["best_score"]}
+    
+    try:
+        result = await db.quiz_stats.update_one(
+            {"user_id": user_id, "backfilled": {"$ne": True}},
+            update,
+            upsert=True
+        )
+        claimed = bool(result.modified_count or result.upserted_id)
+    except DuplicateKeyError:
+        # Another request backfilled first
+        claimed = False
+    
+    if claimed and totals:
+        for period, date_format in TREND_PERIODS.items():
+            buckets = await db.quiz_scores.aggregate([
+                {"$match": legacy},
+                {"$group": {
+                    "_id": {"$dateToString": {"format": date_format, "date": "$completed_at"}},
+                    "quizzes": {"$sum": 1},
+                    "percentage_sum": {"$sum": "$percentage"},
+                    "best_score": {"$max": "$percentage"},
+                    "questions": {"$sum": "$total_questions"}
+                }}
+            ]).to_list(length=None)
+            
+            for bucket in buckets:
+                key = bucket.pop("_id")
+                best_score = bucket.pop("best_score")
+                await db.quiz_stats_buckets.update_one(
+                    {"user_id": user_id, "period": period, "bucket": key},
+                    {"$inc": bucket, "$max": {"best_score": best_score}},
+                    upsert=True
+                )
+    
+    return await db.quiz_stats.find_one({"user_id": user_id})
+
 @router.post("/quiz/generate")
 async def generate_quiz(request: GenerateQuizRequest):
     """Generate a quiz based on user's browsing history"""
@@ -165,7 +285,19 @@ async def save_quiz_score(request: SaveQuizScoreRequest):
             time_taken_seconds=request.time_taken_seconds
         )
         
-        result = await quiz_scores_collection.insert_one(quiz_score.dict(by_alias=True, exclude={"id"}))
+        # rolled_up: counted by the rollup below, so a backfill skips it
+        result = await quiz_scores_collection.insert_one({
+            **quiz_score.dict(by_alias=True, exclude={"id"}),
+            "rolled_up": True
+        })
+        
+        await _update_quiz_rollup(
+            db,
+            request.user_id,
+            percentage,
+            request.total_questions,
+            quiz_score.completed_at
+        )
         
         return {
             "success": True,
@@ -179,14 +311,13 @@ async def save_quiz_score(request: SaveQuizScoreRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/quiz/scores")
-async def get_quiz_scores(user_id: str = "default_user", limit: int = 10):
-    """Get recent quiz scores"""
+async def get_quiz_scores(user_id: str = "default_user", limit: int = 10, cursor: Optional[str] = None):
+    """Get recent quiz scores, one page at a time"""
     try:
         db = get_database()
         quiz_scores_collection = db.quiz_scores
         
-        cursor = quiz_scores_collection.find({"user_id": user_id}).sort("completed_at", -1).limit(limit)
-        scores = await cursor.to_list(length=limit)
+        scores, next_cursor = await paginate(quiz_scores_collection, {"user_id": user_id}, "completed_at", limit, cursor)
         
         # Convert ObjectId to string and format dates
         for score in scores:
@@ -197,24 +328,29 @@ async def get_quiz_scores(user_id: str = "default_user", limit: int = 10):
         return {
             "success": True,
             "scores": scores,
-            "count": len(scores)
+            "count": len(scores),
+            "next_cursor": next_cursor
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting quiz scores: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/quiz/stats")
 async def get_quiz_stats(user_id: str = "default_user"):
-    """Get quiz statistics"""
+    """Get quiz statistics from the per-user rollup"""
     try:
         db = get_database()
-        quiz_scores_collection = db.quiz_scores
         
-        cursor = quiz_scores_collection.find({"user_id": user_id})
-        all_scores = await cursor.to_list(length=None)
+        rollup = await db.quiz_stats.find_one({"user_id": user_id})
         
-        if not all_scores:
+        # Scores saved before rollups existed are folded in once
+        if not rollup or not rollup.get("backfilled"):
+            rollup = await _backfill_quiz_rollup(db, user_id)
+        
+        if not rollup or not rollup.get("total_quizzes"):
             return {
                 "success": True,
                 "stats": {
@@ -225,21 +361,60 @@ async def get_quiz_stats(user_id: str = "default_user"):
                 }
             }
         
-        total_quizzes = len(all_scores)
-        average_percentage = sum(s.get("percentage", 0) for s in all_scores) / total_quizzes
-        best_score = max(s.get("percentage", 0) for s in all_scores)
-        total_questions = sum(s.get("total_questions", 0) for s in all_scores)
+        total_quizzes = rollup["total_quizzes"]
         
         return {
             "success": True,
             "stats": {
                 "total_quizzes": total_quizzes,
-                "average_score": round(average_percentage, 1),
-                "best_score": round(best_score, 1),
-                "total_questions_answered": total_questions
+                "average_score": round(rollup.get("percentage_sum", 0) / total_quizzes, 1),
+                "best_score": round(rollup.get("best_score", 0), 1),
+                "total_questions_answered": rollup.get("total_questions_answered", 0)
             }
         }
         
     except Exception as e:
         logger.error(f"Error getting quiz stats: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/quiz/stats/trends")
+async def get_quiz_trends(user_id: str = "default_user", period: str = "day", limit: int = 30):
+    """Get quiz performance per day or ISO week, most recent first"""
+    try:
+        if period not in TREND_PERIODS:
+            raise HTTPException(status_code=400, detail=f"period must be one of: {', '.join(TREND_PERIODS)}")
+        
+        db = get_database()
+        
+        rollup = await db.quiz_stats.find_one({"user_id": user_id}, {"backfilled": 1})
+        if not rollup or not rollup.get("backfilled"):
+            await _backfill_quiz_rollup(db, user_id)
+        
+        limit = max(1, min(limit, 365))
+        buckets = await db.quiz_stats_buckets.find(
+            {"user_id": user_id, "period": period},
+            {"_id": 0, "user_id": 0, "period": 0}
+        ).sort("bucket", -1).limit(limit).to_list(length=limit)
+        
+        trends = [
+            {
+                "bucket": bucket["bucket"],
+                "quizzes": bucket.get("quizzes", 0),
+                "average_score": round(bucket.get("percentage_sum", 0) / bucket["quizzes"], 1) if bucket.get("quizzes") else 0,
+                "best_score": round(bucket.get("best_score", 0), 1),
+                "questions": bucket.get("questions", 0)
+            }
+            for bucket in buckets
+        ]
+        
+        return {
+            "success": True,
+            "period": period,
+            "trends": trends
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting quiz trends: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,262 @@
+"""Token-budgeted context packing for LLM prompts
+
+Prompts are assembled from several sources (the current page, group context,
+browsing history, documents). ContextPacker counts tokens with a real
+tokenizer and fills the prompt window source by source:
+
+1. Each source gets whole chunks up to its own share of the budget, in
+   priority order.
+2. Budget left over goes to the remaining chunks, again in priority order,
+   and the first chunk that does not fit whole is cut at a token boundary.
+3. Chunks that mostly repeat an already-packed chunk are skipped.
+
+Token counts come from the Hugging Face `tokenizers` library, using the
+tokenizer named by CONTEXT_TOKENIZER. If that cannot be loaded (for example
+offline), a ~4 characters per token estimate is used instead.
+
+Counts are approximate: the default tokenizer (GPT-2) is not the served
+model's, which usually splits the same text into more tokens. Budgets are
+therefore shrunk by TOKEN_COUNT_MARGIN. The tokenizer is loaded once at
+startup (load_tokenizer), since loading it may download files.
+"""
+import logging
+import os
+import re
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Tokenizer used for counting; set to the served model's tokenizer when available
+CONTEXT_TOKENIZER = os.getenv("CONTEXT_TOKENIZER", "gpt2")
+
+# Share of every token budget held back because counts are approximate
+# (lower it once CONTEXT_TOKENIZER matches the served model)
+TOKEN_COUNT_MARGIN = float(os.getenv("TOKEN_COUNT_MARGIN", "0.15"))
+
+# Model window and the share of it kept free for the answer
+LLM_CONTEXT_TOKENS = int(os.getenv("LLM_CONTEXT_TOKENS", "8192"))
+LLM_RESPONSE_TOKENS = int(os.getenv("LLM_RESPONSE_TOKENS", "1024"))
+
+# Headroom for prompt templates
+PROMPT_OVERHEAD_TOKENS = 256
+
+# A chunk whose word shingles are mostly contained in a packed chunk is a duplicate
+DEDUPE_CONTAINMENT = 0.8
+SHINGLE_SIZE = 5
+
+# Do not bother cutting a chunk down to fewer tokens than this
+MIN_PARTIAL_TOKENS = 48
+
+CHARS_PER_TOKEN = 4
+
+_tokenizer = None
+_tokenizer_failed = False
+
+
+def load_tokenizer():
+    """Load the counting tokenizer (blocking; call once at startup, off the event loop)"""
+    global _tokenizer, _tokenizer_failed
+    if _tokenizer is None and not _tokenizer_failed:
+        try:
+            from tokenizers import Tokenizer
+            _tokenizer = Tokenizer.from_pretrained(CONTEXT_TOKENIZER)
+            logger.info(f"✅ Loaded tokenizer '{CONTEXT_TOKENIZER}' for context packing")
+        except Exception as e:
+            _tokenizer_failed = True
+            logger.warning(f"Tokenizer '{CONTEXT_TOKENIZER}' unavailable, estimating tokens from length: {e}")
+    return _tokenizer
+
+
+def _get_tokenizer():
+    # Normally loaded at startup; loading here is the fallback for scripts
+    if _tokenizer is None and not _tokenizer_failed:
+        return load_tokenizer()
+    return _tokenizer
+
+
+def with_margin(tokens: int) -> int:
+    """A token budget reduced by the counting margin"""
+    return int(tokens * (1 - TOKEN_COUNT_MARGIN))
+
+
+def count_tokens(text: str) -> int:
+    """Number of tokens in text"""
+    if not text:
+        return 0
+    tokenizer = _get_tokenizer()
+    if tokenizer is None:
+        return len(text) // CHARS_PER_TOKEN + 1
+    return len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Longest prefix of text that fits in max_tokens"""
+    if max_tokens <= 0:
+        return ""
+    tokenizer = _get_tokenizer()
+    if tokenizer is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+
+    encoding = tokenizer.encode(text, add_special_tokens=False)
+    if len(encoding.ids) <= max_tokens:
+        return text
+    return text[:encoding.offsets[max_tokens - 1][1]]
+
+
+def truncate_tail_to_tokens(text: str, max_tokens: int) -> str:
+    """Longest suffix of text that fits in max_tokens"""
+    if max_tokens <= 0:
+        return ""
+    tokenizer = _get_tokenizer()
+    if tokenizer is None:
+        return text[-max_tokens * CHARS_PER_TOKEN:]
+
+    encoding = tokenizer.encode(text, add_special_tokens=False)
+    if len(encoding.ids) <= max_tokens:
+        return text
+    return text[encoding.offsets[-max_tokens][0]:]
+
+
+def prompt_budget(*fixed_parts: str, window: int = LLM_CONTEXT_TOKENS) -> int:
+    """Tokens available for context once the answer, template and fixed parts are reserved"""
+    used = LLM_RESPONSE_TOKENS + PROMPT_OVERHEAD_TOKENS + sum(count_tokens(part) for part in fixed_parts)
+    return max(with_margin(window) - used, 0)
+
+
+def fit_document(content: str, max_tokens: int, head_share: float = 0.875) -> Tuple[str, bool]:
+    """
+    Fit a long document into max_tokens, keeping its beginning and end
+
+    Returns the (possibly shortened) text and whether it was shortened.
+    Blocking for large documents; call it via asyncio.to_thread.
+    """
+    max_tokens = with_margin(max_tokens)
+    tokenizer = _get_tokenizer()
+    if tokenizer is None:
+        total_tokens = count_tokens(content)
+        offsets = None
+    else:
+        # Encode once; head and tail are cut at token offsets
+        offsets = tokenizer.encode(content, add_special_tokens=False).offsets
+        total_tokens = len(offsets)
+    if total_tokens <= max_tokens:
+        return content, False
+
+    marker = f"\n\n... [Content truncated - showing about {max_tokens} of {total_tokens} tokens] ...\n\n"
+    available = max(max_tokens - count_tokens(marker), 0)
+    head_tokens = int(available * head_share)
+    tail_tokens = available - head_tokens
+    if offsets is None:
+        head = truncate_to_tokens(content, head_tokens)
+        tail = truncate_tail_to_tokens(content, tail_tokens)
+    else:
+        head = content[:offsets[head_tokens - 1][1]] if head_tokens else ""
+        tail = content[offsets[-tail_tokens][0]:] if tail_tokens else ""
+    return head + marker + tail, True
+
+
+def _shingles(text: str) -> set:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+class ContextPacker:
+    """
+    Packs chunks from several sources into a token budget
+
+    Sources are rendered in the order they were added; `priority` (lower
+    first) only decides who gets budget first. `share` caps a source's first
+    pass at that fraction of the budget.
+    """
+
+    def __init__(self, budget: int):
+        self.budget = budget
+        self.used_tokens = 0
+        self._sources: List[Dict] = []
+
+    def add(
+        self,
+        name: str,
+        chunks: List[str],
+        priority: int = 0,
+        share: float = 1.0,
+        header: str = ""
+    ) -> "ContextPacker":
+        chunks = [chunk for chunk in chunks if chunk and chunk.strip()]
+        if chunks:
+            self._sources.append({
+                "name": name,
+                "chunks": chunks,
+                "priority": priority,
+                "share": share,
+                "header": header,
+                "packed": [],
+                "next": 0,
+                "full": False
+            })
+        return self
+
+    def _fill(self, source: Dict, allowance: int, seen: List[set], partial: bool) -> int:
+        """Pack the source's next chunks into allowance tokens; returns tokens used"""
+        used = 0
+        if not source["packed"] and source["header"]:
+            header_tokens = count_tokens(source["header"])
+            if header_tokens >= allowance:
+                return 0
+            used += header_tokens
+
+        while source["next"] < len(source["chunks"]) and not source["full"]:
+            chunk = source["chunks"][source["next"]]
+            shingles = _shingles(chunk)
+            if shingles and any(len(shingles & other) / len(shingles) >= DEDUPE_CONTAINMENT for other in seen):
+                source["next"] += 1
+                continue
+
+            tokens = count_tokens(chunk)
+            remaining = allowance - used
+            if tokens > remaining:
+                if partial and remaining >= MIN_PARTIAL_TOKENS:
+                    source["packed"].append(truncate_to_tokens(chunk, remaining) + " ...")
+                    used = allowance
+                    source["full"] = True
+                break
+
+            source["packed"].append(chunk)
+            seen.append(shingles)
+            used += tokens
+            source["next"] += 1
+
+        if used and not source["packed"]:
+            # Only the header fitted; give its tokens back
+            return 0
+        return used
+
+    def pack(self) -> str:
+        """Render the packed sources as one context string"""
+        remaining = self.budget
+        seen: List[set] = []
+        by_priority = sorted(self._sources, key=lambda source: source["priority"])
+
+        # First pass: every source up to its own share
+        for source in by_priority:
+            allowance = min(int(self.budget * source["share"]), remaining)
+            remaining -= self._fill(source, allowance, seen, partial=False)
+
+        # Second pass: hand unused budget to sources that still have chunks
+        for source in by_priority:
+            if remaining <= 0:
+                break
+            remaining -= self._fill(source, remaining, seen, partial=True)
+
+        self.used_tokens = self.budget - remaining
+        sections = []
+        for source in self._sources:
+            if source["packed"]:
+                sections.append(source["header"] + "\n".join(source["packed"]))
+        return "\n\n".join(sections)
+
+    def summary(self) -> Dict[str, int]:
+        """Number of chunks packed per source (after pack())"""
+        return {source["name"]: len(source["packed"]) for source in self._sources}
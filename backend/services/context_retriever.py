@@ -0,0 +1,80 @@
+"""In-request retrieval over a supplied context
+
+Question answering receives the whole page or document text. Instead of
+always using its first chunks, the chunks are embedded and ranked by
+similarity to the question. Embeddings are kept briefly per URL so follow-up
+questions about the same page skip re-embedding.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# How long and how many documents' chunk embeddings are kept
+RETRIEVER_CACHE_TTL_SECONDS = 30 * 60
+RETRIEVER_CACHE_MAX_ENTRIES = 64
+
+
+class ContextRetriever:
+    """Ranks a context's chunks against a question, caching chunk embeddings per URL"""
+
+    def __init__(self, ttl: float = RETRIEVER_CACHE_TTL_SECONDS, max_entries: int = RETRIEVER_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._embedding_function = None
+        # cache key -> {"digest", "chunks", "embeddings", "expires_at"}
+        self._cache: "OrderedDict[str, Dict]" = OrderedDict()
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        """Unit-normalized embeddings, one row per text (blocking)"""
+        if self._embedding_function is None:
+            from services.vector_store import vector_store
+            self._embedding_function = vector_store.embedding_function
+
+        vectors = np.asarray(self._embedding_function(texts), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    async def _chunk_embeddings(self, chunks: List[str], url: Optional[str]) -> np.ndarray:
+        digest = hashlib.sha256("\x00".join(chunks).encode("utf-8")).hexdigest()
+        key = url or digest
+
+        entry = self._cache.get(key)
+        if entry and entry["digest"] == digest and entry["expires_at"] > time.monotonic():
+            self._cache.move_to_end(key)
+            return entry["embeddings"]
+
+        embeddings = await asyncio.to_thread(self._embed, chunks)
+        # One entry per URL: a changed page replaces its stale embeddings
+        self._cache[key] = {
+            "digest": digest,
+            "embeddings": embeddings,
+            "expires_at": time.monotonic() + self.ttl
+        }
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+        logger.info(f"Embedded {len(chunks)} context chunks for {url or 'inline context'}")
+        return embeddings
+
+    async def rank(self, question: str, chunks: List[str], url: Optional[str] = None) -> List[str]:
+        """Chunks ordered from most to least relevant to the question"""
+        if len(chunks) <= 1:
+            return chunks
+
+        embeddings = await self._chunk_embeddings(chunks, url)
+        query = (await asyncio.to_thread(self._embed, [question]))[0]
+        order = np.argsort(-(embeddings @ query))
+        return [chunks[i] for i in order]
+
+
+# Global instance
+context_retriever = ContextRetriever()
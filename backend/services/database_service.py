@@ -1,7 +1,10 @@
 """Database service for CRUD operations"""
-from datetime import datetime
-from typing import List, Optional
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+from pymongo import ReturnDocument, UpdateOne
 from database.mongodb import get_database
+from database.text_search import TEXT_SCORE, prefix_filter, text_filter
+from database.pagination import paginate
 from database.models import BookmarkModel, HistoryModel, SettingsModel, FocusSessionModel
 
 
@@ -22,21 +25,31 @@ class DatabaseService:
         result = await self.db.bookmarks.insert_one(bookmark.dict(by_alias=True, exclude={"id"}))
         return str(result.inserted_id)
     
-    async def get_bookmarks(self, user_id: str = "default_user", folder: Optional[str] = None) -> List[dict]:
-        """Get all bookmarks for a user"""
+    async def get_bookmarks(
+        self,
+        user_id: str = "default_user",
+        folder: Optional[str] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Get one page of bookmarks for a user and the cursor for the next page"""
         self.ensure_db()
         query = {"user_id": user_id}
         if folder:
             query["folder"] = folder
         
-        cursor = self.db.bookmarks.find(query).sort("created_at", -1)
-        bookmarks = await cursor.to_list(length=1000)
+        bookmarks, next_cursor = await paginate(self.db.bookmarks, query, "created_at", limit, cursor)
         
         # Convert ObjectId to string
         for bookmark in bookmarks:
             bookmark["_id"] = str(bookmark["_id"])
         
-        return bookmarks
+        return bookmarks, next_cursor
+    
+    def export_bookmarks_cursor(self, user_id: str = "default_user"):
+        """Cursor over every bookmark of a user, for streaming exports"""
+        self.ensure_db()
+        return self.db.bookmarks.find({"user_id": user_id}).sort("created_at", -1)
     
     async def delete_bookmark(self, bookmark_id: str) -> bool:
         """Delete a bookmark"""
@@ -46,18 +59,23 @@ class DatabaseService:
         return result.deleted_count > 0
     
     async def search_bookmarks(self, user_id: str, query: str) -> List[dict]:
-        """Search bookmarks by title or URL"""
+        """Search bookmarks by title, URL or tags, best matches first"""
         self.ensure_db()
-        cursor = self.db.bookmarks.find({
-            "user_id": user_id,
-            "$or": [
-                {"title": {"$regex": query, "$options": "i"}},
-                {"url": {"$regex": query, "$options": "i"}},
-                {"tags": {"$regex": query, "$options": "i"}}
-            ]
-        }).sort("created_at", -1)
+        search = text_filter(query)
+        if search is None:
+            return []
+        
+        cursor = self.db.bookmarks.find(
+            {"user_id": user_id, **search},
+            {"score": TEXT_SCORE}
+        ).sort([("score", TEXT_SCORE), ("created_at", -1)]).limit(100)
         
         bookmarks = await cursor.to_list(length=100)
+        if not bookmarks:
+            # Partial words, e.g. while the user is still typing
+            bookmarks = await self.db.bookmarks.find(
+                {"user_id": user_id, **prefix_filter(query, ["title", "url", "tags"])}
+            ).sort("created_at", -1).limit(100).to_list(length=100)
         for bookmark in bookmarks:
             bookmark["_id"] = str(bookmark["_id"])
         
@@ -66,56 +84,115 @@ class DatabaseService:
     # ============ History ============
     
     async def add_history(self, history: HistoryModel) -> str:
-        """Add or update browsing history"""
+        """Add or update browsing history in a single atomic upsert"""
+        self.ensure_db()
+        entry = await self.db.history.find_one_and_update(
+            {"user_id": history.user_id, "url": history.url},
+            {
+                "$set": {
+                    "visited_at": datetime.utcnow(),
+                    "title": history.title,
+                    "favicon": history.favicon
+                },
+                "$inc": {"visit_count": 1},
+                "$setOnInsert": {"last_visit_duration": history.last_visit_duration}
+            },
+            projection={"_id": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return str(entry["_id"])
+    
+    async def add_history_bulk(self, user_id: str, visits: List[dict]) -> dict:
+        """Apply many history visits with a single bulk_write"""
         self.ensure_db()
-        # Check if URL already exists for user
-        existing = await self.db.history.find_one({
-            "user_id": history.user_id,
-            "url": history.url
-        })
         
-        if existing:
-            # Update visit count and timestamp
-            await self.db.history.update_one(
-                {"_id": existing["_id"]},
-                {
-                    "$set": {
-                        "visited_at": datetime.utcnow(),
-                        "title": history.title,
-                        "favicon": history.favicon
-                    },
-                    "$inc": {"visit_count": 1}
+        # Collapse repeated visits to the same URL into one upsert
+        merged = {}
+        for visit in visits:
+            url = visit["url"]
+            visited_at = visit.get("visited_at") or datetime.utcnow()
+            if visited_at.tzinfo is not None:
+                visited_at = visited_at.astimezone(timezone.utc).replace(tzinfo=None)
+            entry = merged.get(url)
+            if entry is None:
+                merged[url] = {
+                    "title": visit["title"],
+                    "favicon": visit.get("favicon"),
+                    "visited_at": visited_at,
+                    "count": 1
                 }
+                continue
+            
+            entry["count"] += 1
+            if visited_at >= entry["visited_at"]:
+                entry["visited_at"] = visited_at
+                entry["title"] = visit["title"]
+                entry["favicon"] = visit.get("favicon")
+        
+        if not merged:
+            return {"received": 0, "upserted": 0, "updated": 0}
+        
+        operations = [
+            UpdateOne(
+                {"user_id": user_id, "url": url},
+                {
+                    "$set": {"title": entry["title"], "favicon": entry["favicon"]},
+                    "$max": {"visited_at": entry["visited_at"]},
+                    "$inc": {"visit_count": entry["count"]},
+                    "$setOnInsert": {"last_visit_duration": None}
+                },
+                upsert=True
             )
-            return str(existing["_id"])
-        else:
-            # Insert new history entry
-            result = await self.db.history.insert_one(history.dict(by_alias=True, exclude={"id"}))
-            return str(result.inserted_id)
+            for url, entry in merged.items()
+        ]
+        
+        result = await self.db.history.bulk_write(operations, ordered=False)
+        
+        return {
+            "received": len(visits),
+            "upserted": result.upserted_count,
+            "updated": result.modified_count
+        }
     
-    async def get_history(self, user_id: str = "default_user", limit: int = 100) -> List[dict]:
-        """Get browsing history for a user"""
+    async def get_history(
+        self,
+        user_id: str = "default_user",
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Get one page of browsing history for a user and the cursor for the next page"""
         self.ensure_db()
-        cursor = self.db.history.find({"user_id": user_id}).sort("visited_at", -1).limit(limit)
-        history = await cursor.to_list(length=limit)
+        history, next_cursor = await paginate(self.db.history, {"user_id": user_id}, "visited_at", limit, cursor)
         
         for item in history:
             item["_id"] = str(item["_id"])
         
-        return history
+        return history, next_cursor
+    
+    def export_history_cursor(self, user_id: str = "default_user"):
+        """Cursor over the whole browsing history of a user, for streaming exports"""
+        self.ensure_db()
+        return self.db.history.find({"user_id": user_id}).sort("visited_at", -1)
     
     async def search_history(self, user_id: str, query: str) -> List[dict]:
-        """Search browsing history"""
+        """Search browsing history by title or URL, best matches first"""
         self.ensure_db()
-        cursor = self.db.history.find({
-            "user_id": user_id,
-            "$or": [
-                {"title": {"$regex": query, "$options": "i"}},
-                {"url": {"$regex": query, "$options": "i"}}
-            ]
-        }).sort("visited_at", -1).limit(50)
+        search = text_filter(query)
+        if search is None:
+            return []
+        
+        cursor = self.db.history.find(
+            {"user_id": user_id, **search},
+            {"score": TEXT_SCORE}
+        ).sort([("score", TEXT_SCORE), ("visited_at", -1)]).limit(50)
         
         history = await cursor.to_list(length=50)
+        if not history:
+            # Partial words, e.g. while the user is still typing
+            history = await self.db.history.find(
+                {"user_id": user_id, **prefix_filter(query, ["title", "url"])}
+            ).sort("visited_at", -1).limit(50).to_list(length=50)
         for item in history:
             item["_id"] = str(item["_id"])
         
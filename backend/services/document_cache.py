@@ -0,0 +1,178 @@
+"""Persistent cache of parsed document text
+
+Parsed text is stored once per file content (SHA-256) in `parsed_documents`.
+`parsed_document_urls` maps each URL to the content it last served together
+with its ETag / Last-Modified, so re-opening a URL costs one conditional GET
+and no parsing. Identical files at other URLs, and uploads, hit the cache by
+content hash.
+
+The cache is bounded by the total stored (compressed) size; least recently
+used documents are evicted first. The total is kept as a running counter in
+`parsed_document_stats`, adjusted on every insert and eviction.
+
+Caching is best-effort: a failing cache operation is logged and treated as
+a miss, never as a failed request.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+from datetime import datetime
+from typing import BinaryIO, Dict, List, Optional
+
+from pymongo import ReturnDocument
+
+from database.compression import pack_body, unpack_body
+from database.mongodb import get_database
+
+logger = logging.getLogger(__name__)
+
+PARSED_CACHE_MAX_BYTES = int(os.getenv("PARSED_CACHE_MAX_MB", "512")) * 1024 * 1024
+
+# Eviction frees space down to this share of the limit, so it does not run on every insert
+EVICTION_TARGET_RATIO = 0.9
+
+# _id of the running size counter in parsed_document_stats
+STATS_ID = "totals"
+
+
+def content_sha256(file: BinaryIO) -> str:
+    """SHA-256 of a file object's content (blocking; rewinds the file)"""
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in iter(lambda: file.read(1024 * 1024), b""):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+class DocumentCache:
+    """Parsed text by content hash, plus URL -> content validators"""
+
+    def __init__(self, max_bytes: int = PARSED_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._stats_ready = False
+
+    async def get_url(self, url: str) -> Optional[Dict]:
+        """The last known content hash and validators for a URL"""
+        try:
+            return await get_database().parsed_document_urls.find_one({"url": url})
+        except Exception as e:
+            logger.warning(f"Parsed document cache lookup failed for {url}: {e}")
+            return None
+
+    async def get_content(self, sha256: str) -> Optional[Dict]:
+        """Cached {"sha256", "content", "doc_type", "outline"} for a content hash, or None"""
+        try:
+            doc = await get_database().parsed_documents.find_one_and_update(
+                {"sha256": sha256},
+                {"$set": {"last_used_at": datetime.utcnow()}}
+            )
+            if not doc:
+                return None
+            return {
+                "sha256": sha256,
+                "content": await asyncio.to_thread(unpack_body, doc),
+                "doc_type": doc["doc_type"],
+                "outline": doc.get("outline")
+            }
+        except Exception as e:
+            logger.warning(f"Parsed document cache read failed for {sha256}: {e}")
+            return None
+
+    async def _ensure_stats(self):
+        """Create the size counter, from the stored documents, if it does not exist yet"""
+        if self._stats_ready:
+            return
+        db = get_database()
+        if not await db.parsed_document_stats.find_one({"_id": STATS_ID}):
+            totals = await db.parsed_documents.aggregate([
+                {"$group": {"_id": None, "bytes": {"$sum": "$stored_bytes"}}}
+            ]).to_list(length=1)
+            # Another process may have created it meanwhile; its count wins
+            await db.parsed_document_stats.update_one(
+                {"_id": STATS_ID},
+                {"$setOnInsert": {"stored_bytes": totals[0]["bytes"] if totals else 0}},
+                upsert=True
+            )
+        self._stats_ready = True
+
+    async def _add_bytes(self, delta: int):
+        if delta:
+            await get_database().parsed_document_stats.update_one(
+                {"_id": STATS_ID}, {"$inc": {"stored_bytes": delta}}
+            )
+
+    async def put_content(self, sha256: str, doc_type: str, content: str, outline: Optional[List[Dict]] = None):
+        try:
+            await self._ensure_stats()
+            packed = await asyncio.to_thread(pack_body, content)
+            stored = packed.get("content_z")
+            stored_bytes = len(stored) if stored is not None else len(packed["content"].encode("utf-8"))
+            now = datetime.utcnow()
+
+            previous = await get_database().parsed_documents.find_one_and_update(
+                {"sha256": sha256},
+                {
+                    "$set": {
+                        **packed,
+                        "doc_type": doc_type,
+                        "outline": outline,
+                        "stored_bytes": stored_bytes,
+                        "last_used_at": now
+                    },
+                    "$setOnInsert": {"created_at": now}
+                },
+                projection={"stored_bytes": 1},
+                upsert=True,
+                return_document=ReturnDocument.BEFORE
+            )
+            await self._add_bytes(stored_bytes - (previous or {}).get("stored_bytes", 0))
+            await self.evict()
+        except Exception as e:
+            logger.warning(f"Parsed document cache write failed for {sha256}: {e}")
+
+    async def put_url(self, url: str, sha256: str, etag: Optional[str], last_modified: Optional[str]):
+        try:
+            await get_database().parsed_document_urls.update_one(
+                {"url": url},
+                {"$set": {
+                    "sha256": sha256,
+                    "etag": etag,
+                    "last_modified": last_modified,
+                    "checked_at": datetime.utcnow()
+                }},
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning(f"Parsed document cache write failed for {url}: {e}")
+
+    async def evict(self):
+        """Drop least recently used documents while the cache is over its size limit"""
+        db = get_database()
+        stats = await db.parsed_document_stats.find_one({"_id": STATS_ID})
+        total = stats["stored_bytes"] if stats else 0
+        if total <= self.max_bytes:
+            return
+
+        target = self.max_bytes * EVICTION_TARGET_RATIO
+        evicted = []
+        cursor = db.parsed_documents.find({}, {"sha256": 1, "stored_bytes": 1}).sort("last_used_at", 1)
+        async for doc in cursor:
+            # Only count what this call deleted; a concurrent eviction may have won
+            result = await db.parsed_documents.delete_one({"_id": doc["_id"]})
+            if result.deleted_count:
+                evicted.append(doc["sha256"])
+                stored_bytes = doc.get("stored_bytes", 0)
+                await self._add_bytes(-stored_bytes)
+                total -= stored_bytes
+            if total <= target:
+                break
+
+        if evicted:
+            await db.parsed_document_urls.delete_many({"sha256": {"$in": evicted}})
+            logger.info(f"Evicted {len(evicted)} parsed documents from the cache")
+
+
+# Global instance
+document_cache = DocumentCache()
@@ -0,0 +1,462 @@
+"""Document text extraction in a process pool
+
+Parsing PDFs, Office files and HTML is CPU-bound, so it runs in worker
+processes instead of on the event loop. Each job has a time limit and, on
+Linux, an address-space limit; a job that exceeds either fails on its own
+without taking the API down. PDFs are split into page ranges that are
+extracted in parallel across workers.
+
+Extractor functions take raw bytes or a path to a temporary file, so sources
+can be handed to workers without pickling open file objects. They return the
+document as (label, text) sections - PDF pages, spreadsheet sheets, or
+document sections between headings - so results can be streamed as they
+become ready.
+"""
+import asyncio
+import io
+import logging
+import os
+import shutil
+import signal
+import tempfile
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncIterator, BinaryIO, Callable, Dict, List, Optional, Set, Tuple, Union
+
+import PyPDF2
+import docx
+from services.html_extraction import boilerplate_cache, extract_html
+from services.xlsx_extraction import extract_workbook
+
+logger = logging.getLogger(__name__)
+
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", str(os.cpu_count() or 1)))
+EXTRACTION_JOB_TIMEOUT_SECONDS = float(os.getenv("EXTRACTION_JOB_TIMEOUT_SECONDS", "60"))
+# Longest a job may wait for a free worker before the request gives up
+EXTRACTION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("EXTRACTION_QUEUE_TIMEOUT_SECONDS", "300"))
+# Extra address space a worker may allocate per job (0 disables the limit)
+EXTRACTION_MEMORY_LIMIT_MB = int(os.getenv("EXTRACTION_MEMORY_LIMIT_MB", "1024"))
+
+# Parent-side watchdog for jobs stuck where the worker's own timeout cannot fire
+WATCHDOG_POLL_SECONDS = 1.0
+WATCHDOG_GRACE_SECONDS = 5.0
+
+# Times a job is moved to a fresh pool when its pool is retired before it starts
+MAX_REQUEUES = 3
+
+# PDF pages extracted per job when a document is split across workers
+PDF_PAGES_PER_JOB = 25
+
+# Sources up to this size are sent to workers as bytes; larger ones via a temp file
+INLINE_SOURCE_BYTES = 2 * 1024 * 1024
+
+# What one section of each document type is called
+SECTION_UNITS = {"pdf": "page", "docx": "section", "xlsx": "sheet", "html": "section"}
+
+# Sections are joined with a blank line into the full document text
+SECTION_SEPARATOR = "\n\n"
+
+Source = Union[bytes, str]
+Section = Tuple[str, str]
+
+
+class ExtractionError(Exception):
+    """Extraction failed in a worker"""
+
+
+class ExtractionTimeout(ExtractionError):
+    """Extraction took longer than the per-job time limit"""
+
+
+class ExtractionTooLarge(ExtractionError):
+    """Extraction exceeded the worker memory limit"""
+
+
+# ---------------------------------------------------------------------------
+# Extractors (run inside worker processes)
+# ---------------------------------------------------------------------------
+
+def _open(source: Source) -> BinaryIO:
+    return io.BytesIO(source) if isinstance(source, bytes) else open(source, "rb")
+
+
+def pdf_page_count(source: Source) -> int:
+    with _open(source) as file:
+        return len(PyPDF2.PdfReader(file).pages)
+
+
+def extract_pdf_pages(source: Source, start: int = 0, end: Optional[int] = None) -> List[Section]:
+    """Extract text from PDF pages [start, end), one section per page"""
+    with _open(source) as file:
+        pages = PyPDF2.PdfReader(file).pages
+        end = len(pages) if end is None else min(end, len(pages))
+        return [(f"Page {i + 1}", pages[i].extract_text().strip()) for i in range(start, end)]
+
+
+def extract_docx_content(source: Source) -> List[Section]:
+    """Extract text from DOCX, split into sections at headings"""
+    with _open(source) as file:
+        doc = docx.Document(file)
+
+    sections = []
+    label = "Beginning"
+    lines: List[str] = []
+    for paragraph in doc.paragraphs:
+        style = paragraph.style.name if paragraph.style is not None else ""
+        if style.startswith("Heading") or style == "Title":
+            if any(line.strip() for line in lines):
+                sections.append((label, "\n".join(lines).strip()))
+            label = paragraph.text.strip() or f"Section {len(sections) + 1}"
+            lines = []
+        lines.append(paragraph.text)
+
+    if any(line.strip() for line in lines):
+        sections.append((label, "\n".join(lines).strip()))
+    return sections
+
+
+def extract_xlsx_content(source: Source) -> List[Section]:
+    """Extract text from XLSX, one section per sheet (streamed, budgeted per sheet)"""
+    with _open(source) as file:
+        return extract_workbook(file)
+
+
+def extract_html_content(source: Source) -> List[Section]:
+    """Extract the main content of an HTML page"""
+    with _open(source) as file:
+        title, text = extract_html(file.read())
+    return [(title or "Page", text)]
+
+
+def join_sections(sections: List[Dict]) -> Tuple[str, List[Dict]]:
+    """
+    Full document text from its sections, plus an outline
+
+    The outline holds each non-empty section's label and [start, end) span
+    in the joined text, so the sections can be recovered with split_sections.
+    """
+    parts: List[str] = []
+    outline: List[Dict] = []
+    offset = 0
+    for section in sections:
+        content = section["content"]
+        if not content.strip():
+            continue
+        if parts:
+            offset += len(SECTION_SEPARATOR)
+        outline.append({"label": section["label"], "start": offset, "end": offset + len(content)})
+        parts.append(content)
+        offset += len(content)
+    return SECTION_SEPARATOR.join(parts), outline
+
+
+def split_sections(content: str, outline: Optional[List[Dict]]) -> List[Section]:
+    """(label, text) sections of a joined document; one section if the outline is unknown"""
+    if not outline:
+        return [("Document", content)]
+    return [(entry["label"], content[entry["start"]:entry["end"]]) for entry in outline]
+
+
+EXTRACTORS: Dict[str, Callable] = {
+    "pdf_page_count": pdf_page_count,
+    "pdf_pages": extract_pdf_pages,
+    "docx": extract_docx_content,
+    "xlsx": extract_xlsx_content,
+    "html": extract_html_content,
+}
+
+
+def _ignore_result(future: asyncio.Future):
+    """Mark an abandoned job's outcome as retrieved, so asyncio does not log it"""
+    if not future.cancelled():
+        future.exception()
+
+
+def _init_worker(memory_limit_mb: int):
+    """Cap the worker's address space above what it already uses"""
+    if memory_limit_mb <= 0:
+        return
+    try:
+        import resource
+        with open("/proc/self/statm") as statm:
+            current = int(statm.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+        limit = current + memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, OSError, ValueError):
+        # Not Linux: run without a memory limit
+        pass
+
+
+def _on_alarm(signum, frame):
+    raise TimeoutError("extraction job timed out")
+
+
+def _run_job(name: str, source: Source, args: Tuple, timeout: float):
+    """Run one extractor with a time limit (worker side)"""
+    if hasattr(signal, "setitimer"):
+        signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return EXTRACTORS[name](source, *args)
+    finally:
+        if hasattr(signal, "setitimer"):
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+# ---------------------------------------------------------------------------
+# Engine (runs in the API process)
+# ---------------------------------------------------------------------------
+
+class ExtractionEngine:
+    """Runs extractors in a process pool with per-job limits"""
+
+    def __init__(
+        self,
+        workers: int = EXTRACTION_WORKERS,
+        job_timeout: float = EXTRACTION_JOB_TIMEOUT_SECONDS,
+        memory_limit_mb: int = EXTRACTION_MEMORY_LIMIT_MB,
+        pages_per_job: int = PDF_PAGES_PER_JOB,
+        queue_timeout: float = EXTRACTION_QUEUE_TIMEOUT_SECONDS
+    ):
+        self.workers = max(1, workers)
+        self.job_timeout = job_timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.pages_per_job = pages_per_job
+        self.queue_timeout = queue_timeout
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # Futures submitted to each pool and not yet collected
+        self._inflight: Dict[ProcessPoolExecutor, Set[Future]] = {}
+        # Tasks draining and killing retired pools
+        self._retiring: Set[asyncio.Task] = set()
+
+    @property
+    def stuck_deadline(self) -> float:
+        """Seconds after a job starts at which its worker is considered stuck"""
+        return 2 * self.job_timeout + WATCHDOG_GRACE_SECONDS
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.memory_limit_mb,)
+            )
+        return self._pool
+
+    def _replace_broken_pool(self, pool: ProcessPoolExecutor):
+        """Drop a pool that lost a worker; the next job starts a fresh one"""
+        if self._pool is pool:
+            self._pool = None
+            logger.warning("⚠️ Extraction worker died, restarting the pool")
+        pool.shutdown(wait=False, cancel_futures=True)
+        self._inflight.pop(pool, None)
+
+    def _retire_pool(self, pool: ProcessPoolExecutor):
+        """
+        Replace a pool with a stuck worker by a fresh one
+
+        New jobs go to the fresh pool at once. Jobs of the old pool that have
+        not started are cancelled and resubmitted by their callers; the old
+        pool's processes are killed once its other running jobs finish (or
+        hit their own deadline), which frees the stuck worker.
+        """
+        if self._pool is not pool:
+            return
+        self._pool = None
+        logger.warning("⚠️ Extraction worker stuck, moving new jobs to a fresh pool")
+        task = asyncio.create_task(self._drain_and_kill(pool))
+        self._retiring.add(task)
+        task.add_done_callback(self._retiring.discard)
+
+    async def _drain_and_kill(self, pool: ProcessPoolExecutor):
+        try:
+            inflight = list(self._inflight.get(pool, ()))
+            for future in inflight:
+                # Only succeeds for jobs that have not reached a worker yet
+                future.cancel()
+            running = [asyncio.wrap_future(future) for future in inflight if not future.done()]
+            for job in running:
+                job.add_done_callback(_ignore_result)
+            if running:
+                await asyncio.wait(running, timeout=self.stuck_deadline)
+        finally:
+            for process in list(getattr(pool, "_processes", {}).values()):
+                process.kill()
+            pool.shutdown(wait=False, cancel_futures=True)
+            self._inflight.pop(pool, None)
+            logger.info("Retired extraction pool with a stuck worker")
+
+    async def start(self):
+        """Start the workers early, before the API process spins up other threads"""
+        pool = self._get_pool()
+        await asyncio.gather(*(asyncio.wrap_future(pool.submit(os.getpid)) for _ in range(self.workers)))
+        logger.info(f"✅ Extraction engine started ({self.workers} workers)")
+
+    async def stop(self):
+        for task in list(self._retiring):
+            task.cancel()
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            await asyncio.to_thread(pool.shutdown, wait=True, cancel_futures=True)
+
+    async def _wait(self, future: Future, queue_deadline: float) -> str:
+        """
+        Wait for a job: "done", "queued" (no worker freed up in time) or "stuck"
+
+        The worker enforces the time limit itself with SIGALRM; the stuck
+        deadline only catches jobs hung in native code that cannot be
+        interrupted, and counts from when the job leaves the queue. A future
+        is marked running when it moves to the pool's call queue, which can
+        hold one job more than there are workers, so it may still wait for
+        one job there. Queued time is bounded by queue_deadline instead.
+        """
+        loop = asyncio.get_running_loop()
+        job = asyncio.wrap_future(future)
+        started = None
+        while True:
+            if started is None and future.running():
+                started = loop.time()
+            if started is None:
+                if loop.time() >= queue_deadline and future.cancel():
+                    return "queued"
+                timeout = WATCHDOG_POLL_SECONDS
+            else:
+                timeout = started + self.stuck_deadline - loop.time()
+                if timeout <= 0:
+                    # Fails with BrokenProcessPool once the pool is retired
+                    job.add_done_callback(_ignore_result)
+                    return "stuck"
+            done, _ = await asyncio.wait({job}, timeout=timeout)
+            if done:
+                return "done"
+
+    async def _run(self, name: str, source: Source, *args):
+        queue_deadline = asyncio.get_running_loop().time() + self.queue_timeout
+        for _ in range(MAX_REQUEUES + 1):
+            pool = self._get_pool()
+            try:
+                future = pool.submit(_run_job, name, source, args, self.job_timeout)
+            except BrokenProcessPool:
+                self._replace_broken_pool(pool)
+                raise ExtractionError("Extraction worker crashed, please retry")
+
+            inflight = self._inflight.setdefault(pool, set())
+            inflight.add(future)
+            try:
+                state = await self._wait(future, queue_deadline)
+            except asyncio.CancelledError:
+                # The request went away; drop the job if it has not started
+                future.cancel()
+                raise
+            finally:
+                inflight.discard(future)
+
+            if state == "queued":
+                raise ExtractionTimeout(f"No extraction worker became free within {self.queue_timeout:.0f}s")
+            if state == "stuck":
+                logger.warning(f"⚠️ Extraction job {name} is stuck in a worker")
+                self._retire_pool(pool)
+                raise ExtractionTimeout(f"Extraction took longer than {self.job_timeout:.0f}s")
+            if not future.cancelled():
+                break
+            # Its pool was retired before the job started; run it on the fresh one
+        else:
+            raise ExtractionError("Extraction workers keep getting stuck, please retry later")
+
+        try:
+            return future.result()
+        except TimeoutError:
+            raise ExtractionTimeout(f"Extraction took longer than {self.job_timeout:.0f}s")
+        except MemoryError:
+            raise ExtractionTooLarge("Document needs more memory than extraction allows")
+        except BrokenProcessPool:
+            self._replace_broken_pool(pool)
+            raise ExtractionError("Extraction worker crashed, please retry")
+
+    async def _prepare(self, source: Union[bytes, BinaryIO]) -> Tuple[Source, Optional[str]]:
+        """Turn a file object into bytes or a temp file path workers can open"""
+        if isinstance(source, bytes):
+            return source, None
+
+        source.seek(0, os.SEEK_END)
+        size = source.tell()
+        source.seek(0)
+        if size <= INLINE_SOURCE_BYTES:
+            return source.read(), None
+
+        def copy_to_temp() -> str:
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".extract") as temp:
+                shutil.copyfileobj(source, temp)
+                return temp.name
+
+        path = await asyncio.to_thread(copy_to_temp)
+        return path, path
+
+    async def iter_sections(
+        self,
+        doc_type: str,
+        source: Union[bytes, BinaryIO],
+        url: Optional[str] = None
+    ) -> AsyncIterator[Dict]:
+        """
+        Extract a pdf, docx, xlsx or html document section by section
+
+        Yields {"index", "total", "label", "content"} in document order as soon
+        as each section is ready. PDF page ranges run on all workers at once.
+        HTML from a known URL has its site's learned boilerplate removed.
+        """
+        if doc_type not in SECTION_UNITS:
+            raise ValueError(f"Unsupported document type: {doc_type}")
+
+        prepared, temp_path = await self._prepare(source)
+        jobs: List[asyncio.Future] = []
+        try:
+            total = None
+            if doc_type == "pdf":
+                total = await self._run("pdf_page_count", prepared)
+                jobs = [
+                    asyncio.ensure_future(self._run(
+                        "pdf_pages", prepared, start, min(start + self.pages_per_job, total)
+                    ))
+                    for start in range(0, total, self.pages_per_job)
+                ]
+            else:
+                jobs = [asyncio.ensure_future(self._run(doc_type, prepared))]
+
+            index = 0
+            for job in jobs:
+                sections = await job
+                if total is None:
+                    total = len(sections)
+                for label, content in sections:
+                    if doc_type == "html":
+                        content = boilerplate_cache.strip(url, content)
+                    yield {"index": index, "total": total, "label": label, "content": content}
+                    index += 1
+
+            if doc_type == "pdf" and len(jobs) > 1:
+                logger.info(f"Extracted {total} PDF pages in {len(jobs)} parallel jobs")
+        finally:
+            # Stop queued jobs if the consumer went away or a job failed
+            for job in jobs:
+                job.cancel()
+            if temp_path:
+                os.unlink(temp_path)
+
+    async def extract_sections(
+        self,
+        doc_type: str,
+        source: Union[bytes, BinaryIO],
+        url: Optional[str] = None
+    ) -> List[Dict]:
+        """All sections of a pdf, docx, xlsx or html document, in order"""
+        return [section async for section in self.iter_sections(doc_type, source, url)]
+
+    async def extract(self, doc_type: str, source: Union[bytes, BinaryIO], url: Optional[str] = None) -> str:
+        """Extract the full text of a pdf, docx, xlsx or html document"""
+        content, _ = join_sections(await self.extract_sections(doc_type, source, url))
+        return content
+
+
+# Global instance
+extraction_engine = ExtractionEngine()
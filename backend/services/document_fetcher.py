@@ -0,0 +1,191 @@
+"""Async streaming download of documents for parsing
+
+Documents are streamed into a SpooledTemporaryFile (memory for small files,
+disk beyond DOCUMENT_SPOOL_MEMORY_BYTES) and the download is aborted as soon
+as it exceeds DOCUMENT_MAX_BYTES. The document type is sniffed from the
+file's leading bytes, so no separate HEAD request is needed.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import zipfile
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO, Dict, Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_MAX_BYTES = int(os.getenv("DOCUMENT_MAX_BYTES", str(50 * 1024 * 1024)))
+DOCUMENT_SPOOL_MEMORY_BYTES = 2 * 1024 * 1024
+DOCUMENT_DOWNLOAD_TIMEOUT_SECONDS = float(os.getenv("DOCUMENT_DOWNLOAD_TIMEOUT_SECONDS", "30"))
+# Concurrent download connections, in total and to any one host
+DOCUMENT_DOWNLOAD_CONNECTIONS = int(os.getenv("DOCUMENT_DOWNLOAD_CONNECTIONS", "32"))
+DOCUMENT_DOWNLOAD_PER_HOST = int(os.getenv("DOCUMENT_DOWNLOAD_PER_HOST", "4"))
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+
+# Bytes inspected when sniffing the document type
+SNIFF_BYTES = 2048
+
+
+class DocumentTooLarge(Exception):
+    """The document exceeds DOCUMENT_MAX_BYTES"""
+
+    def __init__(self, size: Optional[int] = None):
+        self.size = size
+        limit_mb = DOCUMENT_MAX_BYTES // (1024 * 1024)
+        super().__init__(f"Document is larger than the {limit_mb} MB limit")
+
+
+class DownloadedDocument:
+    """A downloaded document spooled to memory or disk; close() when done"""
+
+    def __init__(
+        self,
+        file: BinaryIO,
+        size: int,
+        content_type: str,
+        head: bytes,
+        sha256: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None
+    ):
+        self.file = file
+        self.size = size
+        self.content_type = content_type
+        self.head = head
+        self.sha256 = sha256
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def close(self):
+        self.file.close()
+
+
+_session: Optional[aiohttp.ClientSession] = None
+
+
+def _get_session() -> aiohttp.ClientSession:
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=DOCUMENT_DOWNLOAD_TIMEOUT_SECONDS, sock_connect=10),
+            connector=aiohttp.TCPConnector(
+                limit=DOCUMENT_DOWNLOAD_CONNECTIONS,
+                limit_per_host=DOCUMENT_DOWNLOAD_PER_HOST
+            )
+        )
+    return _session
+
+
+async def close_session():
+    """Close the shared download session (on shutdown)"""
+    if _session is not None and not _session.closed:
+        await _session.close()
+
+
+async def download_document(
+    url: str,
+    max_bytes: int = DOCUMENT_MAX_BYTES,
+    validators: Optional[Dict[str, str]] = None
+) -> Optional[DownloadedDocument]:
+    """
+    Stream a document into a spooled temporary file
+
+    With validators ({"etag", "last_modified"} from an earlier download) the
+    request is conditional and None is returned if the document is unchanged.
+    Raises DocumentTooLarge as soon as the declared or received size passes
+    max_bytes, and aiohttp.ClientError / asyncio.TimeoutError on failures.
+    """
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+    async with _get_session().get(url, headers=headers, allow_redirects=True) as response:
+        if response.status == 304 and headers:
+            return None
+        response.raise_for_status()
+
+        if response.content_length is not None and response.content_length > max_bytes:
+            raise DocumentTooLarge(response.content_length)
+
+        file = SpooledTemporaryFile(max_size=DOCUMENT_SPOOL_MEMORY_BYTES)
+        size = 0
+        head = b""
+        digest = hashlib.sha256()
+        try:
+            async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_BYTES):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise DocumentTooLarge()
+                digest.update(chunk)
+                if len(head) < SNIFF_BYTES:
+                    head += chunk[:SNIFF_BYTES - len(head)]
+                # Past the in-memory limit the file lives on disk; keep writes off the event loop
+                if size > DOCUMENT_SPOOL_MEMORY_BYTES:
+                    await asyncio.to_thread(file.write, chunk)
+                else:
+                    file.write(chunk)
+        except BaseException:
+            file.close()
+            raise
+
+        file.seek(0)
+        logger.info(f"Downloaded {size} bytes from {url}")
+        return DownloadedDocument(
+            file=file,
+            size=size,
+            content_type=response.headers.get("content-type", "").lower(),
+            head=head,
+            sha256=digest.hexdigest(),
+            etag=response.headers.get("etag"),
+            last_modified=response.headers.get("last-modified")
+        )
+
+
+def _zip_doc_type(file: BinaryIO) -> Optional[str]:
+    """Tell DOCX from XLSX by the parts inside the OOXML zip"""
+    try:
+        with zipfile.ZipFile(file) as archive:
+            names = archive.namelist()
+    except zipfile.BadZipFile:
+        return None
+    finally:
+        file.seek(0)
+
+    if any(name.startswith("word/") for name in names):
+        return "docx"
+    if any(name.startswith("xl/") for name in names):
+        return "xlsx"
+    return None
+
+
+def sniff_doc_type(document: DownloadedDocument) -> Optional[str]:
+    """Detect the document type from its magic bytes, or None if unrecognized"""
+    head = document.head
+    if head.startswith(b"%PDF"):
+        return "pdf"
+    if head.startswith(b"PK\x03\x04"):
+        return _zip_doc_type(document.file)
+
+    start = head.lstrip().lower()
+    if start.startswith((b"<!doctype html", b"<html")) or b"<html" in start[:512]:
+        return "html"
+    return None
+
+
+def doc_type_from_content_type(content_type: str) -> Optional[str]:
+    """Map a Content-Type header to a document type, or None"""
+    if 'pdf' in content_type:
+        return "pdf"
+    elif 'word' in content_type or 'officedocument.wordprocessing' in content_type:
+        return "docx"
+    elif 'excel' in content_type or 'spreadsheet' in content_type:
+        return "xlsx"
+    elif 'html' in content_type:
+        return "html"
+    return None
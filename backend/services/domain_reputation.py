@@ -0,0 +1,316 @@
+"""Shared cross-user reputation store for focus mode verdicts
+
+Verdicts are shared per (domain, topic cluster, strict mode), so cold-start
+sessions can reuse checks on popular sites. Each verdict is also kept per
+normalized URL (host without www., path and query; scheme and fragment
+ignored), which overrides the domain prior for that exact page.
+"""
+import asyncio
+import logging
+import math
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+import numpy as np
+from bson import ObjectId
+
+from database.mongodb import get_database
+
+logger = logging.getLogger(__name__)
+
+# Topics whose embeddings are at least this similar share one cluster
+TOPIC_SIMILARITY_THRESHOLD = float(os.getenv("FOCUS_TOPIC_SIMILARITY", "0.82"))
+
+# Verdict confidence halves every REPUTATION_HALF_LIFE_DAYS days
+REPUTATION_HALF_LIFE_DAYS = float(os.getenv("FOCUS_REPUTATION_HALF_LIFE_DAYS", "14"))
+
+# Verdicts whose decayed confidence falls below this are ignored
+REPUTATION_MIN_CONFIDENCE = int(os.getenv("FOCUS_REPUTATION_MIN_CONFIDENCE", "60"))
+
+# Cluster centroids are reloaded this often, and whenever no cluster matches,
+# to pick up clusters created or moved by other processes
+CENTROID_REFRESH_SECONDS = float(os.getenv("FOCUS_CENTROID_REFRESH_SECONDS", "300"))
+
+# Attempts to drift a centroid before giving up when other processes keep moving it
+CENTROID_UPDATE_ATTEMPTS = 5
+
+
+class DomainReputationStore:
+    """
+    Records LLM focus verdicts by (domain, topic cluster, strict mode), with
+    per-URL overrides, so that sessions on similar topics can reuse earlier
+    checks from any user.
+    """
+
+    def __init__(self):
+        self.db = None
+        self._embedding_function = None
+        # In-memory copy of topic cluster centroids: cluster_id -> unit vector
+        self._centroids: Dict[str, np.ndarray] = {}
+        self._centroids_loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    def ensure_db(self):
+        if self.db is None:
+            self.db = get_database()
+
+    @staticmethod
+    def normalize_domain(domain: str) -> str:
+        """Lowercase the domain and drop a leading www. so variants share entries"""
+        domain = (domain or "").lower().split(":", 1)[0]
+        return domain[4:] if domain.startswith("www.") else domain
+
+    @staticmethod
+    def _split_url(url: str):
+        url = (url or "").strip()
+        return urlsplit(url if "://" in url else f"//{url}")
+
+    @classmethod
+    def normalize_url(cls, url: str) -> str:
+        """Host, path and query of a URL, so scheme and fragment variants share entries"""
+        parts = cls._split_url(url)
+        key = cls.normalize_domain(parts.hostname or "") + parts.path.rstrip("/")
+        return f"{key}?{parts.query}" if parts.query else key
+
+    def _embed(self, text: str) -> np.ndarray:
+        """Embed a topic description into a unit vector"""
+        if self._embedding_function is None:
+            from services.vector_store import vector_store
+            self._embedding_function = vector_store.embedding_function
+
+        vector = np.asarray(self._embedding_function([text])[0], dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    async def _load_centroids(self, force: bool = False):
+        """Load topic cluster centroids from MongoDB when missing, stale or forced"""
+        if (
+            not force
+            and self._centroids_loaded_at is not None
+            and time.monotonic() - self._centroids_loaded_at < CENTROID_REFRESH_SECONDS
+        ):
+            return
+
+        self.ensure_db()
+        centroids = {}
+        cursor = self.db.topic_clusters.find({}, {"centroid": 1})
+        async for cluster in cursor:
+            centroids[str(cluster["_id"])] = np.asarray(cluster["centroid"], dtype=np.float32)
+        self._centroids = centroids
+        self._centroids_loaded_at = time.monotonic()
+
+    def _closest_cluster(self, vector: np.ndarray):
+        best_id, best_score = None, -1.0
+        for cluster_id, centroid in self._centroids.items():
+            score = float(np.dot(vector, centroid))
+            if score > best_score:
+                best_id, best_score = cluster_id, score
+        return best_id, best_score
+
+    async def _drift_centroid(self, cluster_id: str, vector: np.ndarray):
+        """
+        Move a cluster's centroid towards a new topic (running mean)
+
+        The new centroid is written only if the cluster's size is still the
+        one it was computed from, so a concurrent drift from another process
+        makes this attempt miss and retry from the fresh centroid instead of
+        being overwritten.
+        """
+        for _ in range(CENTROID_UPDATE_ATTEMPTS):
+            cluster = await self.db.topic_clusters.find_one(
+                {"_id": ObjectId(cluster_id)},
+                {"size": 1, "centroid": 1}
+            )
+            if not cluster:
+                return
+
+            size = cluster.get("size", 1)
+            centroid = np.asarray(cluster["centroid"], dtype=np.float32) * size + vector
+            centroid /= np.linalg.norm(centroid) or 1.0
+            result = await self.db.topic_clusters.update_one(
+                {"_id": cluster["_id"], "size": size},
+                {"$set": {"centroid": centroid.tolist(), "updated_at": datetime.utcnow()}, "$inc": {"size": 1}}
+            )
+            if result.matched_count:
+                self._centroids[cluster_id] = centroid
+                return
+
+        logger.warning(f"⚠️ Topic cluster {cluster_id} kept changing, centroid not updated")
+
+    async def resolve_topic_cluster(
+        self,
+        topic: str,
+        description: str = "",
+        keywords: List[str] = []
+    ) -> Optional[str]:
+        """
+        Map a focus topic onto a shared topic cluster
+
+        Returns the id of the closest existing cluster if it is similar enough,
+        otherwise creates a new cluster seeded with this topic.
+        """
+        try:
+            text = topic
+            if description:
+                text += f". {description}"
+            if keywords:
+                text += f". Keywords: {', '.join(keywords)}"
+
+            vector = await asyncio.to_thread(self._embed, text)
+
+            async with self._lock:
+                await self._load_centroids()
+                best_id, best_score = self._closest_cluster(vector)
+                if best_score < TOPIC_SIMILARITY_THRESHOLD:
+                    # Another process may have created a matching cluster since
+                    await self._load_centroids(force=True)
+                    best_id, best_score = self._closest_cluster(vector)
+
+                if best_id is not None and best_score >= TOPIC_SIMILARITY_THRESHOLD:
+                    await self._drift_centroid(best_id, vector)
+                    logger.info(f"Focus topic '{topic}' joined cluster {best_id} (similarity {best_score:.2f})")
+                    return best_id
+
+                result = await self.db.topic_clusters.insert_one({
+                    "label": topic,
+                    "centroid": vector.tolist(),
+                    "size": 1,
+                    "created_at": datetime.utcnow(),
+                    "updated_at": datetime.utcnow()
+                })
+                cluster_id = str(result.inserted_id)
+                self._centroids[cluster_id] = vector
+                logger.info(f"Focus topic '{topic}' started new cluster {cluster_id}")
+                return cluster_id
+
+        except Exception as e:
+            logger.error(f"Error resolving topic cluster: {e}")
+            return None
+
+    @staticmethod
+    def _decayed_confidence(confidence: float, updated_at: datetime) -> float:
+        """Exponentially decay a verdict's confidence by its age"""
+        age_days = max((datetime.utcnow() - updated_at).total_seconds() / 86400, 0)
+        return confidence * math.pow(0.5, age_days / REPUTATION_HALF_LIFE_DAYS)
+
+    async def _lookup_entry(self, collection, key: Dict) -> Optional[Dict]:
+        entry = await collection.find_one(key)
+        if not entry:
+            return None
+
+        confidence = self._decayed_confidence(entry["confidence"], entry["updated_at"])
+        if confidence < REPUTATION_MIN_CONFIDENCE:
+            return None
+
+        await collection.update_one({"_id": entry["_id"]}, {"$inc": {"hits": 1}})
+
+        return {
+            "allowed": entry["allowed"],
+            "confidence": int(confidence),
+            "reason": entry["reason"],
+            "checks": entry.get("checks", 1)
+        }
+
+    async def lookup(self, url: str, cluster_id: str, strict_mode: bool = False) -> Optional[Dict]:
+        """
+        Return a shared verdict for the URL if one is still fresh enough
+
+        A verdict for the exact URL wins; otherwise the domain's verdict is
+        used as the prior.
+        """
+        if not cluster_id:
+            return None
+
+        try:
+            self.ensure_db()
+            verdict = await self._lookup_entry(self.db.url_reputation, {
+                "url": self.normalize_url(url),
+                "cluster_id": cluster_id,
+                "strict_mode": strict_mode
+            })
+            if verdict:
+                verdict["scope"] = "url"
+                return verdict
+
+            verdict = await self._lookup_entry(self.db.domain_reputation, {
+                "domain": self.normalize_domain(self._split_url(url).hostname or ""),
+                "cluster_id": cluster_id,
+                "strict_mode": strict_mode
+            })
+            if verdict:
+                verdict["scope"] = "domain"
+            return verdict
+
+        except Exception as e:
+            logger.error(f"Error looking up domain reputation: {e}")
+            return None
+
+    async def record(
+        self,
+        url: str,
+        cluster_id: str,
+        allowed: bool,
+        confidence: int,
+        reason: str,
+        strict_mode: bool = False
+    ):
+        """
+        Record an LLM verdict for the URL and its domain within a topic cluster
+
+        For each entry, a verdict that agrees with the stored one refreshes it
+        and keeps the higher (decayed) confidence; a conflicting verdict
+        replaces it. Each is one pipeline upsert, so concurrent verdicts
+        cannot overwrite each other's merge.
+        """
+        if not cluster_id:
+            return
+
+        try:
+            self.ensure_db()
+            now = datetime.utcnow()
+            half_life_ms = REPUTATION_HALF_LIFE_DAYS * 86400 * 1000
+            # Same decay as _decayed_confidence, on the stored verdict
+            decayed = {"$multiply": [
+                "$confidence",
+                {"$pow": [0.5, {"$divide": [{"$max": [{"$subtract": [now, "$updated_at"]}, 0]}, half_life_ms]}]}
+            ]}
+
+            domain = self.normalize_domain(self._split_url(url).hostname or "")
+            merge = [{"$set": {
+                # Every expression reads the stored values, before this update
+                "confidence": {"$cond": [
+                    {"$eq": ["$allowed", allowed]},
+                    {"$max": [confidence, {"$toInt": {"$floor": decayed}}]},
+                    confidence
+                ]},
+                "allowed": allowed,
+                "reason": reason,
+                "domain": domain,
+                "updated_at": now,
+                "checks": {"$add": [{"$ifNull": ["$checks", 0]}, 1]},
+                "hits": {"$ifNull": ["$hits", 0]},
+                "created_at": {"$ifNull": ["$created_at", now]}
+            }}]
+
+            await asyncio.gather(
+                self.db.url_reputation.update_one(
+                    {"url": self.normalize_url(url), "cluster_id": cluster_id, "strict_mode": strict_mode},
+                    merge,
+                    upsert=True
+                ),
+                self.db.domain_reputation.update_one(
+                    {"domain": domain, "cluster_id": cluster_id, "strict_mode": strict_mode},
+                    merge,
+                    upsert=True
+                )
+            )
+
+        except Exception as e:
+            logger.error(f"Error recording domain reputation: {e}")
+
+
+# Global store instance
+domain_reputation_store = DomainReputationStore()
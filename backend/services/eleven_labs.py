@@ -1,3 +1,4 @@
+import asyncio
 import os
 from elevenlabs.client import ElevenLabs
 import logging
@@ -20,6 +21,18 @@ class ElevenLabsClient:
             self.enabled = True
             self.default_voice_id = os.getenv("ELEVENLABS_VOICE_ID", "21m00Tcm4TlvDq8ikWAM")
     
+    def _synthesize(self, text: str, voice_id: str) -> bytes:
+        """Generate audio and collect the streamed bytes (blocking)"""
+        # Generate audio using new API with free tier model
+        audio_generator = self.client.generate(
+            text=text,
+            voice=voice_id,
+            model="eleven_turbo_v2"  # Free tier compatible model
+        )
+        
+        # Collect audio bytes
+        return b"".join(audio_generator)
+    
     async def text_to_speech(
         self,
         text: str,
@@ -34,15 +47,8 @@ class ElevenLabsClient:
         try:
             voice_id = voice_id or self.default_voice_id
             
-            # Generate audio using new API with free tier model
-            audio_generator = self.client.generate(
-                text=text,
-                voice=voice_id,
-                model="eleven_turbo_v2"  # Free tier compatible model
-            )
-            
-            # Collect audio bytes
-            audio_bytes = b"".join(audio_generator)
+            # The SDK call blocks, so run it off the event loop
+            audio_bytes = await asyncio.to_thread(self._synthesize, text, voice_id)
             
             if return_base64:
                 # Convert to base64 for easy transmission
@@ -0,0 +1,98 @@
+"""Streaming exports straight from a Motor cursor"""
+import json
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Callable, Dict, Optional
+
+from bson import ObjectId
+from fastapi.responses import StreamingResponse
+
+# Documents fetched from MongoDB per round trip while exporting
+EXPORT_BATCH_SIZE = 500
+
+# Serialized documents buffered before a chunk is yielded to the client
+EXPORT_CHUNK_DOCS = 100
+
+
+def _json_default(value):
+    """Serialize the BSON types stored by this app"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(doc: Dict) -> str:
+    return json.dumps(doc, default=_json_default, ensure_ascii=False)
+
+
+async def iter_ndjson(cursor, transform: Optional[Callable[[Dict], Dict]] = None) -> AsyncIterator[bytes]:
+    """Yield documents from the cursor as NDJSON, one bounded chunk at a time"""
+    buffer = []
+    async for doc in cursor.batch_size(EXPORT_BATCH_SIZE):
+        buffer.append(dumps(transform(doc) if transform else doc))
+        if len(buffer) >= EXPORT_CHUNK_DOCS:
+            yield ("\n".join(buffer) + "\n").encode("utf-8")
+            buffer = []
+    if buffer:
+        yield ("\n".join(buffer) + "\n").encode("utf-8")
+
+
+async def iter_json_envelope(
+    cursor,
+    key: str,
+    extra: Optional[Dict] = None,
+    transform: Optional[Callable[[Dict], Dict]] = None
+) -> AsyncIterator[bytes]:
+    """
+    Yield a single JSON object of the form {..extra, key: [docs], "count": n}
+
+    The array is written incrementally so the whole export is never held in memory.
+    """
+    head = dumps(extra or {})[:-1]
+    yield (head + (", " if extra else "") + f'"{key}": [').encode("utf-8")
+
+    count = 0
+    buffer = []
+    async for doc in cursor.batch_size(EXPORT_BATCH_SIZE):
+        buffer.append(dumps(transform(doc) if transform else doc))
+        count += 1
+        if len(buffer) >= EXPORT_CHUNK_DOCS:
+            yield ((", " if count > len(buffer) else "") + ", ".join(buffer)).encode("utf-8")
+            buffer = []
+    if buffer:
+        yield ((", " if count > len(buffer) else "") + ", ".join(buffer)).encode("utf-8")
+
+    yield f'], "count": {count}}}'.encode("utf-8")
+
+
+async def _gzip(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Gzip a byte stream incrementally"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_response(
+    chunks: AsyncIterator[bytes],
+    filename: str,
+    media_type: str,
+    gzip: bool = False
+) -> StreamingResponse:
+    """Wrap an export stream in a download response, optionally gzipped"""
+    if gzip:
+        chunks = _gzip(chunks)
+        filename += ".gz"
+        media_type = "application/gzip"
+
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
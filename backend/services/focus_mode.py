@@ -1,9 +1,10 @@
 """Focus Mode service with AI URL validation"""
 import os
 from groq import Groq
-from typing import Dict, List
+from typing import Dict, List, Optional
 from urllib.parse import urlparse
 import re
+from services.domain_reputation import domain_reputation_store
 
 client = Groq(api_key=os.getenv("GROQ_API_KEY"))
 
@@ -47,7 +48,8 @@ class FocusModeService:
         topic: str,
         description: str = "",
         keywords: List[str] = [],
-        strict_mode: bool = False
+        strict_mode: bool = False,
+        cluster_id: Optional[str] = None
     ) -> Dict[str, any]:
         """
         Check if URL is relevant to the focus topic using AI
@@ -58,6 +60,9 @@ class FocusModeService:
             description: Optional topic description
             keywords: Optional keywords
             strict_mode: If True, be more restrictive
+            cluster_id: Optional shared topic cluster; earlier verdicts for
+                the same URL, or else its domain, in this cluster are reused
+                instead of the AI
             
         Returns:
             Dict with 'allowed', 'reason', and 'confidence' keys
@@ -65,6 +70,18 @@ class FocusModeService:
         try:
             domain = self.extract_domain(url)
             
+            # Reuse a verdict for this URL or its domain shared by sessions on a similar topic
+            shared = await domain_reputation_store.lookup(url, cluster_id, strict_mode)
+            if shared:
+                return {
+                    "allowed": shared["allowed"],
+                    "confidence": shared["confidence"],
+                    "reason": shared["reason"],
+                    "url": url,
+                    "domain": domain,
+                    "shared_verdict": True
+                }
+            
             # Build context
             context = f"Topic: {topic}"
             if description:
@@ -129,6 +146,10 @@ REASON: [One sentence explanation]"""
             
             allowed = decision == "ALLOW"
             
+            await domain_reputation_store.record(
+                url, cluster_id, allowed, confidence, reason, strict_mode
+            )
+            
             return {
                 "allowed": allowed,
                 "confidence": confidence,
@@ -154,14 +175,15 @@ REASON: [One sentence explanation]"""
         topic: str,
         description: str = "",
         keywords: List[str] = [],
-        strict_mode: bool = False
+        strict_mode: bool = False,
+        cluster_id: Optional[str] = None
     ) -> Dict[str, Dict]:
         """Check multiple URLs at once"""
         results = {}
         
         for url in urls:
             result = await self.check_url_relevance(
-                url, topic, description, keywords, strict_mode
+                url, topic, description, keywords, strict_mode, cluster_id
             )
             results[url] = result
         
@@ -0,0 +1,81 @@
+"""Short-lived cache of group metadata and membership
+
+Group routes check membership on every call. Instead of loading the group
+document with its whole members array each time, the group is cached for a
+few seconds together with a user_id -> member map, so checks are a dict
+lookup with no database hit.
+
+Entries are invalidated explicitly by the routes that change a group, and
+by every group event seen on the realtime broker, so with REALTIME_BROKER=mongo
+other processes drop their copy too. The TTL bounds staleness otherwise.
+"""
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from bson import ObjectId
+
+from database.mongodb import get_database
+from services.realtime import realtime_hub
+
+logger = logging.getLogger(__name__)
+
+GROUP_CACHE_TTL_SECONDS = float(os.getenv("GROUP_CACHE_TTL_SECONDS", "30"))
+GROUP_CACHE_MAX_ENTRIES = 10000
+
+
+class GroupCache:
+    """LRU + TTL cache of group documents keyed by group id"""
+
+    def __init__(self, ttl: float = GROUP_CACHE_TTL_SECONDS, max_entries: int = GROUP_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # group_id -> (expires_at, group document, members by user_id)
+        self._entries: "OrderedDict[str, Tuple[float, Dict, Dict[str, Dict]]]" = OrderedDict()
+
+    async def _load(self, group_id: str) -> Optional[Tuple[float, Dict, Dict[str, Dict]]]:
+        entry = self._entries.get(group_id)
+        if entry and entry[0] > time.monotonic():
+            self._entries.move_to_end(group_id)
+            return entry
+
+        group = await get_database().groups.find_one({"_id": ObjectId(group_id)})
+        if not group:
+            self._entries.pop(group_id, None)
+            return None
+
+        members = {member["user_id"]: member for member in group.get("members", [])}
+        entry = (time.monotonic() + self.ttl, group, members)
+        self._entries[group_id] = entry
+        self._entries.move_to_end(group_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    async def get(self, group_id: str) -> Optional[Dict]:
+        """The group document (shared, do not mutate), or None if it does not exist"""
+        entry = await self._load(group_id)
+        return entry[1] if entry else None
+
+    async def get_member(self, group_id: str, user_id: str) -> Optional[Dict]:
+        """The user's member entry in the group, or None"""
+        entry = await self._load(group_id)
+        return entry[2].get(user_id) if entry else None
+
+    async def is_member(self, group_id: str, user_id: str) -> bool:
+        return await self.get_member(group_id, user_id) is not None
+
+    def invalidate(self, group_id: str):
+        self._entries.pop(group_id, None)
+
+    async def _on_event(self, channel: str, message: Dict):
+        """Drop the cached group whenever anything about it changes"""
+        if message.get("group_id"):
+            self.invalidate(message["group_id"])
+
+
+# Global cache instance
+group_cache = GroupCache()
+realtime_hub.add_listener(group_cache._on_event)
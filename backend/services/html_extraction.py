@@ -0,0 +1,248 @@
+"""Fast HTML text extraction with boilerplate removal
+
+Pages are parsed with lxml. Scripts, navigation and other page chrome are
+dropped, then the main content is located readability-style: paragraphs
+score their parent containers by length and punctuation, link-heavy
+containers are penalized, and the best container (plus strong siblings) is
+kept.
+
+Chrome that survives (menus built from divs, "share this" blocks, cookie
+notes) repeats across pages of a site. BoilerplateCache learns, per domain,
+which lines appear on many pages and strips them. It lives in the API
+process, since extraction workers do not share memory.
+"""
+import re
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urldefrag, urlparse
+
+import lxml.html
+from lxml import etree
+
+# Elements that never hold readable content
+REMOVED_TAGS = (
+    "script", "style", "noscript", "template", "svg", "canvas", "iframe",
+    "object", "embed", "button", "select", "input", "textarea"
+)
+
+# Page chrome by tag or ARIA role
+CHROME_TAGS = {"nav", "aside", "footer"}
+CHROME_ROLES = {"navigation", "banner", "contentinfo", "complementary", "search"}
+
+# Class/id hints, as used by readability
+UNLIKELY_CANDIDATES = re.compile(
+    r"banner|breadcrumb|combx|comment|community|cookie|disqus|footer|menu|modal|"
+    r"nav|pagination|popup|promo|related|share|sidebar|social|sponsor|subscribe|advert",
+    re.I
+)
+LIKELY_CANDIDATES = re.compile(r"article|body|column|content|entry|main|post|story|text", re.I)
+
+# Elements whose text ends a line
+BLOCK_TAGS = {
+    "address", "article", "blockquote", "br", "dd", "div", "dl", "dt", "figcaption",
+    "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li", "main", "ol", "p",
+    "pre", "section", "table", "tr", "ul"
+}
+
+# Paragraph-like elements that vote for their containers
+SCORED_TAGS = ("p", "pre", "td", "blockquote")
+MIN_PARAGRAPH_CHARS = 25
+
+# Below this score no container is a clear main content; the whole body is used
+MIN_CONTENT_SCORE = 20
+
+# Shorter lines are never treated as boilerplate: headings such as
+# "Parameters" or "Examples" repeat on every page of a docs site
+MIN_BOILERPLATE_CHARS = 30
+
+
+def _class_weight(element) -> int:
+    hints = f"{element.get('class', '')} {element.get('id', '')}"
+    weight = 0
+    if UNLIKELY_CANDIDATES.search(hints):
+        weight -= 25
+    if LIKELY_CANDIDATES.search(hints):
+        weight += 25
+    return weight
+
+
+def _drop_chrome(root):
+    """Remove non-content elements and obvious page chrome in place"""
+    etree.strip_elements(root, etree.Comment, etree.ProcessingInstruction, *REMOVED_TAGS, with_tail=False)
+
+    for element in list(root.iter()):
+        if not isinstance(element.tag, str) or element.tag in ("html", "body"):
+            continue
+        if element.getparent() is None:
+            # Top of a subtree that was already dropped
+            continue
+        hints = f"{element.get('class', '')} {element.get('id', '')}"
+        if (
+            element.tag in CHROME_TAGS
+            or element.get("role") in CHROME_ROLES
+            or (
+                element.tag not in ("article", "main", "a")
+                and UNLIKELY_CANDIDATES.search(hints)
+                and not LIKELY_CANDIDATES.search(hints)
+            )
+        ):
+            element.drop_tree()
+
+
+def _link_density(element) -> float:
+    text_length = len(element.text_content())
+    if not text_length:
+        return 0.0
+    link_length = sum(len(link.text_content()) for link in element.iter("a"))
+    return link_length / text_length
+
+
+def _main_content(body) -> List:
+    """The elements holding the page's main content, in document order"""
+    scores: Dict = {}
+    for paragraph in body.iter(*SCORED_TAGS):
+        text = paragraph.text_content().strip()
+        if len(text) < MIN_PARAGRAPH_CHARS:
+            continue
+        score = 1 + text.count(",") + min(len(text) // 100, 3)
+
+        parent = paragraph.getparent()
+        grandparent = parent.getparent() if parent is not None else None
+        for container, share in ((parent, 1.0), (grandparent, 0.5)):
+            if container is None:
+                continue
+            if container not in scores:
+                scores[container] = _class_weight(container)
+            scores[container] += score * share
+
+    if not scores:
+        return [body]
+
+    scored = {element: score * (1 - _link_density(element)) for element, score in scores.items()}
+    best = max(scored, key=scored.get)
+    if scored[best] < MIN_CONTENT_SCORE:
+        return [body]
+
+    # Siblings that also score well belong to the same article
+    parent = best.getparent()
+    if parent is None:
+        return [best]
+    threshold = max(10, scored[best] * 0.2)
+    return [
+        sibling for sibling in parent
+        if sibling is best or scored.get(sibling, 0) >= threshold
+    ]
+
+
+def _text_lines(element) -> List[str]:
+    """Visible text of an element, one line per block, whitespace collapsed"""
+    for child in element.iter():
+        if isinstance(child.tag, str):
+            if child.tag in BLOCK_TAGS:
+                child.tail = "\n" + (child.tail or "")
+            elif child.tag in ("td", "th"):
+                child.tail = " " + (child.tail or "")
+    lines = (" ".join(line.split()) for line in element.text_content().splitlines())
+    return [line for line in lines if line]
+
+
+def extract_html(data: bytes) -> Tuple[str, str]:
+    """Title and main-content text of an HTML page (blocking; runs in workers)"""
+    try:
+        root = lxml.html.document_fromstring(data)
+    except (etree.ParserError, ValueError):
+        # Empty or unparsable document
+        return "", ""
+
+    title = " ".join((root.findtext(".//title") or "").split())
+    _drop_chrome(root)
+
+    body = root.find("body")
+    if body is None:
+        body = root
+
+    lines: List[str] = []
+    for element in _main_content(body):
+        lines.extend(_text_lines(element))
+    return title, "\n".join(lines)
+
+
+class BoilerplateCache:
+    """
+    Learns lines that repeat across a domain's pages and strips them
+
+    A line is boilerplate once it has been seen on at least `min_pages`
+    pages and on at least `page_share` of the domain's most recent pages
+    (up to `max_pages_per_domain`). Only lines of MIN_BOILERPLATE_CHARS or
+    more are counted or stripped.
+    """
+
+    def __init__(
+        self,
+        max_domains: int = 256,
+        min_pages: int = 3,
+        page_share: float = 0.5,
+        max_lines_per_domain: int = 5000,
+        max_pages_per_domain: int = 500
+    ):
+        self.max_domains = max_domains
+        self.min_pages = min_pages
+        self.page_share = page_share
+        self.max_lines_per_domain = max_lines_per_domain
+        self.max_pages_per_domain = max_pages_per_domain
+        # domain -> {"pages": OrderedDict of recent page URLs, "lines": {line hash: pages}}
+        self._domains: "OrderedDict[str, Dict]" = OrderedDict()
+
+    def _domain(self, domain: str) -> Dict:
+        entry = self._domains.get(domain)
+        if entry is None:
+            entry = {"pages": OrderedDict(), "lines": {}}
+            self._domains[domain] = entry
+            while len(self._domains) > self.max_domains:
+                self._domains.popitem(last=False)
+        self._domains.move_to_end(domain)
+        return entry
+
+    def _learn(self, entry: Dict, page: str, keys: set):
+        if page in entry["pages"]:
+            # A page is only counted once, however often it is re-parsed
+            return
+        entry["pages"][page] = None
+        if len(entry["pages"]) > self.max_pages_per_domain:
+            entry["pages"].popitem(last=False)
+
+        lines = entry["lines"]
+        for key in keys:
+            lines[key] = lines.get(key, 0) + 1
+        if len(lines) > self.max_lines_per_domain:
+            # Forget lines seen only once; they are the least likely chrome
+            entry["lines"] = {key: count for key, count in lines.items() if count > 1}
+
+    def strip(self, url: Optional[str], text: str) -> str:
+        """Text without the lines learned as boilerplate for the URL's domain"""
+        domain = urlparse(url).hostname if url else None
+        if not domain or not text:
+            return text
+
+        lines = text.split("\n")
+        keys = [
+            hash(line.lower()) if len(line) >= MIN_BOILERPLATE_CHARS else None
+            for line in lines
+        ]
+        entry = self._domain(domain)
+        self._learn(entry, urldefrag(url)[0], {key for key in keys if key is not None})
+
+        pages = len(entry["pages"])
+        if pages < self.min_pages:
+            return text
+        threshold = max(self.min_pages, pages * self.page_share)
+        kept = [
+            line for line, key in zip(lines, keys)
+            if key is None or entry["lines"].get(key, 0) < threshold
+        ]
+        # A page made only of repeated lines is returned whole rather than emptied
+        return "\n".join(kept) if kept else text
+
+
+# Global instance
+boilerplate_cache = BoilerplateCache()
@@ -0,0 +1,68 @@
+"""Shared async HTTP client for proxied page loads
+
+One aiohttp session per API process keeps connections alive between
+requests, pools them per host and caches DNS lookups, so proxied page loads
+do not pay for a new TCP/TLS handshake and resolution each time.
+"""
+import logging
+import os
+from typing import Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# Connection pool size, in total and per host
+PROXY_MAX_CONNECTIONS = int(os.getenv("PROXY_MAX_CONNECTIONS", "200"))
+PROXY_MAX_CONNECTIONS_PER_HOST = int(os.getenv("PROXY_MAX_CONNECTIONS_PER_HOST", "20"))
+
+# Seconds resolved addresses and idle keep-alive connections are kept
+PROXY_DNS_CACHE_SECONDS = int(os.getenv("PROXY_DNS_CACHE_SECONDS", "300"))
+PROXY_KEEPALIVE_SECONDS = float(os.getenv("PROXY_KEEPALIVE_SECONDS", "30"))
+
+# Timeouts: connecting, waiting for each read, and the whole request
+PROXY_CONNECT_TIMEOUT_SECONDS = float(os.getenv("PROXY_CONNECT_TIMEOUT_SECONDS", "10"))
+PROXY_READ_TIMEOUT_SECONDS = float(os.getenv("PROXY_READ_TIMEOUT_SECONDS", "10"))
+PROXY_TOTAL_TIMEOUT_SECONDS = float(os.getenv("PROXY_TOTAL_TIMEOUT_SECONDS", "60"))
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+
+class HttpClient:
+    """Lazily created, process-wide aiohttp session with a pooled connector"""
+
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=PROXY_MAX_CONNECTIONS,
+                    limit_per_host=PROXY_MAX_CONNECTIONS_PER_HOST,
+                    ttl_dns_cache=PROXY_DNS_CACHE_SECONDS,
+                    keepalive_timeout=PROXY_KEEPALIVE_SECONDS
+                ),
+                timeout=aiohttp.ClientTimeout(
+                    total=PROXY_TOTAL_TIMEOUT_SECONDS,
+                    sock_connect=PROXY_CONNECT_TIMEOUT_SECONDS,
+                    sock_read=PROXY_READ_TIMEOUT_SECONDS
+                ),
+                headers={'User-Agent': DEFAULT_USER_AGENT}
+            )
+            logger.info(
+                f"✅ Proxy HTTP pool ready ({PROXY_MAX_CONNECTIONS} connections, "
+                f"{PROXY_MAX_CONNECTIONS_PER_HOST} per host)"
+            )
+        return self._session
+
+    async def close(self):
+        """Close the session and its pooled connections (on shutdown)"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+# Global instance
+http_client = HttpClient()
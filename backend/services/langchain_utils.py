@@ -4,9 +4,18 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 import logging
+from services.context_packer import ContextPacker, prompt_budget
+from services.context_retriever import context_retriever
+from services.vector_store import vector_store
 
 logger = logging.getLogger(__name__)
 
+# Chunks retrieved from an indexed document to answer a question
+DOCUMENT_QA_CHUNKS = 12
+
+# Sections sampled (first chunk of each) to summarize an indexed document
+DOCUMENT_SUMMARY_SECTIONS = 24
+
 class LangChainService:
     """LangChain service for advanced AI tasks"""
     
@@ -28,6 +37,12 @@ class LangChainService:
             chunk_size=4000,
             chunk_overlap=200
         )
+        
+        # Smaller chunks for question answering, so retrieval can be selective
+        self.qa_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=1200,
+            chunk_overlap=150
+        )
     
     async def summarize_content(self, content: str, url: str = None) -> str:
         """Summarize webpage or document content"""
@@ -53,6 +68,29 @@ class LangChainService:
             logger.error(f"Summarization error: {e}")
             return "I encountered an error while summarizing the content."
     
+    async def summarize_document(self, document_id: str) -> str:
+        """Summarize an indexed document from the opening of sections spread across it"""
+        try:
+            sections = await vector_store.get_document_section_starts(document_id)
+            if not sections:
+                return "That document has not been indexed."
+            
+            # Evenly spaced sections, so long documents are covered end to end
+            if len(sections) > DOCUMENT_SUMMARY_SECTIONS:
+                step = len(sections) / DOCUMENT_SUMMARY_SECTIONS
+                sections = [sections[int(i * step)] for i in range(DOCUMENT_SUMMARY_SECTIONS)]
+            
+            chunks = [
+                f"[{section['metadata']['section_label']}]\n{section['content']}"
+                for section in sections
+            ]
+            content = ContextPacker(prompt_budget()).add("document", chunks).pack()
+            return await self._summarize_chunk(content)
+            
+        except Exception as e:
+            logger.error(f"Document summarization error: {e}")
+            return "I encountered an error while summarizing the document."
+    
     async def _summarize_chunk(self, text: str) -> str:
         """Summarize a single chunk of text"""
         prompt = ChatPromptTemplate.from_messages([
@@ -64,14 +102,26 @@ class LangChainService:
         result = await chain.ainvoke({"text": text})
         return result.strip()
     
-    async def answer_question(self, question: str, context: str, url: str = None) -> str:
-        """Answer question based on context"""
+    async def answer_question(self, question: str, context: str, url: str = None, document_id: str = None) -> str:
+        """Answer question based on context, or on an indexed document"""
         try:
-            # Split context if too long
-            chunks = self.text_splitter.split_text(context)
+            if document_id:
+                # Only the parts of the indexed document relevant to the question
+                results = await vector_store.query_document(document_id, question, n_results=DOCUMENT_QA_CHUNKS)
+                chunks = [result["content"] for result in results]
+                if not chunks:
+                    return "That document has not been indexed."
+            else:
+                # Split context and rank the chunks by relevance to the question
+                chunks = self.qa_splitter.split_text(context)
+                try:
+                    chunks = await context_retriever.rank(question, chunks, url)
+                except Exception as retrieval_error:
+                    # Fall back to document order
+                    logger.warning(f"Context retrieval failed, using document order: {retrieval_error}")
             
-            # Use first few chunks as context
-            relevant_context = "\n\n".join(chunks[:3])
+            # Most relevant chunks that fit the model's token budget
+            relevant_context = ContextPacker(prompt_budget(question)).add("document", chunks).pack()
             
             prompt = ChatPromptTemplate.from_messages([
                 ("system", "You are a helpful assistant that answers questions based on provided context."),
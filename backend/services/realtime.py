@@ -0,0 +1,228 @@
+"""Real-time pub/sub hub for WebSocket clients
+
+Clients subscribe to per-group channels over /ws. Routes publish small delta
+events through a broker; every process runs one hub that receives events
+from the broker and fans them out to its own sockets.
+
+Brokers are pluggable via REALTIME_BROKER:
+    memory  - in-process only, for single-node deployments (default)
+    mongo   - capped collection + tailable cursor, fans out across processes
+"""
+import asyncio
+import logging
+import os
+from abc import ABC, abstractmethod
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from bson import ObjectId
+from fastapi import WebSocket
+
+from database.mongodb import get_database
+
+logger = logging.getLogger(__name__)
+
+REALTIME_BROKER = os.getenv("REALTIME_BROKER", "memory").lower()
+
+# Size of the capped collection used by the MongoDB broker
+MONGO_BROKER_COLLECTION = "realtime_events"
+MONGO_BROKER_SIZE_BYTES = int(os.getenv("REALTIME_MONGO_SIZE_BYTES", str(16 * 1024 * 1024)))
+
+# Event _ids come from each publishing process, so they are only roughly in
+# insertion order; a resumed tail re-reads this much and skips events seen
+MONGO_RESUME_OVERLAP = timedelta(seconds=5)
+MONGO_SEEN_EVENTS = 10000
+
+Handler = Callable[[str, Dict], Awaitable[None]]
+
+
+def group_channel(group_id: str) -> str:
+    return f"group:{group_id}"
+
+
+class Broker(ABC):
+    """Transport that delivers published events to every process's hub"""
+
+    @abstractmethod
+    async def start(self, handler: Handler):
+        """Begin delivering events to handler(channel, message)"""
+
+    async def stop(self):
+        pass
+
+    @abstractmethod
+    async def publish(self, channel: str, message: Dict):
+        """Deliver message on channel to every started broker"""
+
+
+class InProcessBroker(Broker):
+    """Delivers events directly to the local hub (single node)"""
+
+    def __init__(self):
+        self._handler: Optional[Handler] = None
+
+    async def start(self, handler: Handler):
+        self._handler = handler
+
+    async def publish(self, channel: str, message: Dict):
+        if self._handler:
+            await self._handler(channel, message)
+
+
+class MongoBroker(Broker):
+    """
+    Cross-process fan-out through a capped collection
+
+    Every process tails the collection with an awaitable cursor, so no extra
+    infrastructure is needed beyond the MongoDB the API already uses.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, handler: Handler):
+        db = get_database()
+        if MONGO_BROKER_COLLECTION not in await db.list_collection_names():
+            try:
+                await db.create_collection(
+                    MONGO_BROKER_COLLECTION,
+                    capped=True,
+                    size=MONGO_BROKER_SIZE_BYTES
+                )
+            except Exception as e:
+                # Another process created it first
+                logger.info(f"Realtime collection already exists: {e}")
+        self._task = asyncio.create_task(self._tail(handler))
+
+    async def _tail(self, handler: Handler):
+        from pymongo import CursorType
+
+        db = get_database()
+        collection = db[MONGO_BROKER_COLLECTION]
+
+        # Only events published after this process started are delivered
+        newest = await collection.find_one({}, {"_id": 1}, sort=[("$natural", -1)])
+        floor = newest["_id"] if newest else ObjectId.from_datetime(datetime.utcnow() - MONGO_RESUME_OVERLAP)
+        resume_from = floor
+        seen_order: deque = deque(maxlen=MONGO_SEEN_EVENTS)
+        seen: Set[ObjectId] = set()
+
+        while True:
+            try:
+                # A tailable cursor dies when it falls behind the capped
+                # collection or matches nothing yet; resume after the last event
+                cursor = collection.find(
+                    {"_id": {"$gt": resume_from}},
+                    cursor_type=CursorType.TAILABLE_AWAIT
+                )
+                while cursor.alive:
+                    async for event in cursor:
+                        if event["_id"] in seen:
+                            continue
+                        if len(seen_order) == seen_order.maxlen:
+                            seen.discard(seen_order[0])
+                        seen_order.append(event["_id"])
+                        seen.add(event["_id"])
+                        resume_from = max(
+                            floor,
+                            ObjectId.from_datetime(event["_id"].generation_time - MONGO_RESUME_OVERLAP)
+                        )
+                        await handler(event["channel"], event["message"])
+                    await asyncio.sleep(0.1)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Realtime broker tail error: {e}")
+            await asyncio.sleep(1)
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    async def publish(self, channel: str, message: Dict):
+        await get_database()[MONGO_BROKER_COLLECTION].insert_one({
+            "channel": channel,
+            "message": message,
+            "published_at": datetime.utcnow()
+        })
+
+
+class RealtimeHub:
+    """Tracks this process's WebSocket subscriptions and fans out events"""
+
+    def __init__(self, broker: Broker):
+        self.broker = broker
+        self._channels: Dict[str, Set[WebSocket]] = defaultdict(set)
+        self._users: Dict[WebSocket, str] = {}
+        self._listeners: List[Handler] = []
+
+    async def start(self):
+        await self.broker.start(self._dispatch)
+        logger.info(f"✅ Realtime hub started ({type(self.broker).__name__})")
+
+    async def stop(self):
+        await self.broker.stop()
+
+    def add_listener(self, handler: Handler):
+        """Call handler(channel, message) for every event, before socket fan-out"""
+        self._listeners.append(handler)
+
+    def subscribe(self, websocket: WebSocket, channel: str, user_id: str):
+        self._channels[channel].add(websocket)
+        self._users[websocket] = user_id
+
+    def unsubscribe(self, websocket: WebSocket, channel: Optional[str] = None):
+        """Remove the socket from one channel, or from all channels if none given"""
+        channels = [channel] if channel else list(self._channels)
+        for name in channels:
+            sockets = self._channels.get(name)
+            if sockets is None:
+                continue
+            sockets.discard(websocket)
+            if not sockets:
+                del self._channels[name]
+        if not channel:
+            self._users.pop(websocket, None)
+
+    async def publish(self, channel: str, message: Dict):
+        """Publish an event; failures never break the calling route"""
+        try:
+            await self.broker.publish(channel, message)
+        except Exception as e:
+            logger.error(f"Error publishing realtime event to {channel}: {e}")
+
+    async def _dispatch(self, channel: str, message: Dict):
+        for listener in self._listeners:
+            try:
+                await listener(channel, message)
+            except Exception as e:
+                logger.error(f"Realtime listener error on {channel}: {e}")
+
+        sockets = list(self._channels.get(channel, ()))
+        if not sockets:
+            return
+
+        payload = {"channel": channel, **message}
+        results = await asyncio.gather(
+            *(ws.send_json(payload) for ws in sockets),
+            return_exceptions=True
+        )
+        for ws, result in zip(sockets, results):
+            if isinstance(result, Exception):
+                self.unsubscribe(ws)
+            elif message.get("type") == "group_deleted":
+                self.unsubscribe(ws, channel)
+            elif message.get("type") == "member_left" and self._users.get(ws) == message.get("user_id"):
+                # Former members stop receiving the group's updates
+                self.unsubscribe(ws, channel)
+
+
+def _create_broker() -> Broker:
+    if REALTIME_BROKER == "mongo":
+        return MongoBroker()
+    return InProcessBroker()
+
+
+# Global hub instance
+realtime_hub = RealtimeHub(_create_broker())
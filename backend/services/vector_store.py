@@ -2,12 +2,16 @@ import chromadb
 from chromadb.config import Settings
 from chromadb.utils import embedding_functions
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+import asyncio
 import hashlib
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Chunks written to ChromaDB per call when indexing a whole document
+DOCUMENT_UPSERT_BATCH = 500
+
 class VectorStore:
     """Vector storage for webpage content using ChromaDB"""
     
@@ -27,6 +31,20 @@ class VectorStore:
                 metadata={"description": "Stores webpage content with embeddings"}
             )
             
+            # Shared group contexts live in their own collection, partitioned by group_id
+            self.group_collection = self.client.get_or_create_collection(
+                name="group_contexts",
+                embedding_function=self.embedding_function,
+                metadata={"description": "Stores group shared contexts with embeddings"}
+            )
+            
+            # Fully indexed parsed documents, partitioned by document_id
+            self.document_collection = self.client.get_or_create_collection(
+                name="document_chunks",
+                embedding_function=self.embedding_function,
+                metadata={"description": "Stores parsed document chunks with embeddings"}
+            )
+            
             logger.info("✅ Vector store initialized successfully")
             
         except Exception as e:
@@ -168,7 +186,8 @@ class VectorStore:
                 query_params["where"] = {"url": filter_url}
             
             # Query the collection
-            results = self.collection.query(**query_params)
+            # Run off the event loop so a busy collection cannot stall other requests
+            results = await asyncio.to_thread(self.collection.query, **query_params)
             
             # Format results
             formatted_results = []
@@ -239,6 +258,219 @@ class VectorStore:
             logger.error(f"Error getting page history: {e}")
             return []
     
+    async def store_group_context(
+        self,
+        group_id: str,
+        context_id: str,
+        title: str,
+        url: str,
+        user_name: str,
+        content: str,
+        timestamp: Optional[datetime] = None
+    ) -> Dict[str, any]:
+        """
+        Index a group shared context into the group's vector partition
+        
+        Embedding runs in a worker thread so the event loop stays responsive.
+        """
+        try:
+            content_chunks = [chunk for chunk in self._chunk_text(content) if chunk]
+            if not content_chunks:
+                return {"success": True, "chunks_stored": 0}
+            
+            timestamp = (timestamp or datetime.utcnow()).isoformat()
+            ids = [f"{context_id}_chunk_{i}" for i in range(len(content_chunks))]
+            metadatas = [
+                {
+                    "group_id": group_id,
+                    "context_id": context_id,
+                    "title": title,
+                    "url": url,
+                    "user_name": user_name,
+                    "timestamp": timestamp,
+                    "chunk_index": i,
+                    "total_chunks": len(content_chunks)
+                }
+                for i in range(len(content_chunks))
+            ]
+            
+            await asyncio.to_thread(
+                self.group_collection.upsert,
+                ids=ids,
+                documents=content_chunks,
+                metadatas=metadatas
+            )
+            
+            logger.info(f"✅ Indexed {len(content_chunks)} chunks for group {group_id} context {context_id}")
+            return {"success": True, "chunks_stored": len(content_chunks)}
+            
+        except Exception as e:
+            logger.error(f"Error indexing group context: {e}")
+            return {"success": False, "error": str(e)}
+    
+    async def query_group_context(
+        self,
+        group_id: str,
+        query: str,
+        n_results: int = 8
+    ) -> List[Dict[str, any]]:
+        """Query a single group's partition for the chunks most relevant to the query"""
+        try:
+            results = await asyncio.to_thread(
+                self.group_collection.query,
+                query_texts=[query],
+                n_results=n_results,
+                where={"group_id": group_id}
+            )
+            
+            formatted_results = []
+            if results['documents'] and len(results['documents']) > 0:
+                for i in range(len(results['documents'][0])):
+                    formatted_results.append({
+                        "content": results['documents'][0][i],
+                        "metadata": results['metadatas'][0][i],
+                        "distance": results['distances'][0][i] if results.get('distances') else None
+                    })
+            
+            return formatted_results
+            
+        except Exception as e:
+            logger.error(f"Error querying group context: {e}")
+            return []
+    
+    async def delete_group_context(self, context_id: Optional[str] = None, group_id: Optional[str] = None):
+        """Remove the vectors of one shared context, or of a whole group"""
+        try:
+            where = {"context_id": context_id} if context_id else {"group_id": group_id}
+            await asyncio.to_thread(self.group_collection.delete, where=where)
+        except Exception as e:
+            logger.error(f"Error deleting group context vectors: {e}")
+    
+    async def has_document(self, document_id: str) -> bool:
+        """Whether a document has been fully indexed (its completion marker exists)"""
+        try:
+            results = await asyncio.to_thread(
+                self.document_collection.get,
+                ids=[f"{document_id}_complete"],
+                include=[]
+            )
+            return bool(results['ids'])
+        except Exception as e:
+            logger.error(f"Error checking document index: {e}")
+            return False
+    
+    async def store_document(
+        self,
+        document_id: str,
+        title: str,
+        url: str,
+        doc_type: str,
+        sections: List[Tuple[str, str]]
+    ) -> Dict[str, any]:
+        """
+        Index every section of a parsed document under its document_id
+        
+        Sections are chunked separately so each chunk knows the page, sheet
+        or heading it came from. A marker record is written after the last
+        chunk; a document without one (an earlier run failed part way) is
+        indexed again from scratch.
+        """
+        try:
+            if await self.has_document(document_id):
+                return {"success": True, "chunks_stored": 0, "already_indexed": True}
+            
+            # Drop chunks left by an interrupted run
+            await asyncio.to_thread(self.document_collection.delete, where={"document_id": document_id})
+            
+            ids, documents, metadatas = [], [], []
+            for section_index, (label, text) in enumerate(sections):
+                for section_chunk, chunk in enumerate(c for c in self._chunk_text(text) if c):
+                    ids.append(f"{document_id}_chunk_{len(ids)}")
+                    documents.append(chunk)
+                    metadatas.append({
+                        "document_id": document_id,
+                        "title": title,
+                        "url": url,
+                        "doc_type": doc_type,
+                        "section_index": section_index,
+                        "section_label": label,
+                        "section_chunk": section_chunk,
+                        "chunk_index": len(metadatas)
+                    })
+            
+            for start in range(0, len(ids), DOCUMENT_UPSERT_BATCH):
+                end = start + DOCUMENT_UPSERT_BATCH
+                await asyncio.to_thread(
+                    self.document_collection.upsert,
+                    ids=ids[start:end],
+                    documents=documents[start:end],
+                    metadatas=metadatas[start:end]
+                )
+            
+            # No section_index, so queries for chunks never return the marker
+            await asyncio.to_thread(
+                self.document_collection.upsert,
+                ids=[f"{document_id}_complete"],
+                documents=[title or document_id],
+                metadatas=[{"document_id": document_id, "complete": True, "total_chunks": len(ids)}]
+            )
+            
+            logger.info(f"✅ Indexed {len(ids)} chunks for document {document_id}")
+            return {"success": True, "chunks_stored": len(ids), "already_indexed": False}
+            
+        except Exception as e:
+            logger.error(f"Error indexing document: {e}")
+            return {"success": False, "error": str(e)}
+    
+    async def query_document(
+        self,
+        document_id: str,
+        query: str,
+        n_results: int = 12
+    ) -> List[Dict[str, any]]:
+        """The chunks of one indexed document most relevant to the query"""
+        try:
+            results = await asyncio.to_thread(
+                self.document_collection.query,
+                query_texts=[query],
+                n_results=n_results,
+                where={"$and": [{"document_id": document_id}, {"section_index": {"$gte": 0}}]}
+            )
+            
+            formatted_results = []
+            if results['documents'] and len(results['documents']) > 0:
+                for i in range(len(results['documents'][0])):
+                    formatted_results.append({
+                        "content": results['documents'][0][i],
+                        "metadata": results['metadatas'][0][i],
+                        "distance": results['distances'][0][i] if results.get('distances') else None
+                    })
+            
+            return formatted_results
+            
+        except Exception as e:
+            logger.error(f"Error querying document: {e}")
+            return []
+    
+    async def get_document_section_starts(self, document_id: str) -> List[Dict[str, any]]:
+        """The first chunk of every section of an indexed document, in document order"""
+        try:
+            results = await asyncio.to_thread(
+                self.document_collection.get,
+                where={"$and": [{"document_id": document_id}, {"section_chunk": 0}]}
+            )
+            
+            chunks = [
+                {"content": content, "metadata": metadata}
+                for content, metadata in zip(results['documents'] or [], results['metadatas'] or [])
+            ]
+            chunks.sort(key=lambda chunk: chunk["metadata"]["section_index"])
+            return chunks
+            
+        except Exception as e:
+            logger.error(f"Error reading document sections: {e}")
+            return []
+    
     def get_stats(self) -> Dict[str, any]:
         """Get statistics about stored content"""
         try:
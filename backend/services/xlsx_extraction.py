@@ -0,0 +1,212 @@
+"""Streaming spreadsheet extraction
+
+Workbooks are opened in openpyxl's read-only mode, so rows are parsed from
+the sheet XML as they are iterated instead of loading every cell up front.
+Each sheet is capped by a row and a cell budget.
+
+A sheet is rendered either as its rows joined with " | ", or as a compact
+table summary: column types, per-column stats and a few sample rows. The
+summary costs far fewer tokens for large tables; by default it is used for
+sheets that do not fit the row budget.
+"""
+import os
+from datetime import date, datetime, time
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+import openpyxl
+from openpyxl.utils import get_column_letter
+
+# Rows and cells read per sheet; the rest of a sheet is skipped
+XLSX_MAX_ROWS_PER_SHEET = int(os.getenv("XLSX_MAX_ROWS_PER_SHEET", "2000"))
+XLSX_MAX_CELLS_PER_SHEET = int(os.getenv("XLSX_MAX_CELLS_PER_SHEET", "50000"))
+
+# "auto": summarize sheets over the budgets, "always", or "never"
+XLSX_TABLE_SUMMARY = os.getenv("XLSX_TABLE_SUMMARY", "auto").lower()
+
+# Rows shown in a table summary, and distinct values tracked per column
+SUMMARY_SAMPLE_ROWS = 5
+SUMMARY_MAX_DISTINCT = 50
+SUMMARY_EXAMPLE_VALUES = 3
+
+
+def _cell_text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _value_kind(value) -> str:
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, (int, float)):
+        return "number"
+    if isinstance(value, (datetime, date, time)):
+        return "date"
+    return "text"
+
+
+def _format_number(value: float) -> str:
+    return f"{value:.6g}"
+
+
+class ColumnStats:
+    """Running statistics for one spreadsheet column"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.kinds: Dict[str, int] = {}
+        self.distinct: Dict[str, None] = {}
+        self.distinct_capped = False
+        self.minimum = None
+        self.maximum = None
+        self.total = 0.0
+        self.numbers = 0
+        # Dates are compared as ISO strings, so date, datetime and time values can mix
+        self.first_date: Optional[str] = None
+        self.last_date: Optional[str] = None
+
+    def add(self, value):
+        if value is None or (isinstance(value, str) and not value.strip()):
+            return
+        self.count += 1
+        kind = _value_kind(value)
+        self.kinds[kind] = self.kinds.get(kind, 0) + 1
+
+        if kind == "number":
+            if self.minimum is None or value < self.minimum:
+                self.minimum = value
+            if self.maximum is None or value > self.maximum:
+                self.maximum = value
+            self.total += value
+            self.numbers += 1
+        elif kind == "date":
+            text = value.isoformat()
+            if self.first_date is None or text < self.first_date:
+                self.first_date = text
+            if self.last_date is None or text > self.last_date:
+                self.last_date = text
+
+        if not self.distinct_capped:
+            self.distinct[_cell_text(value)] = None
+            if len(self.distinct) > SUMMARY_MAX_DISTINCT:
+                self.distinct_capped = True
+
+    def describe(self) -> str:
+        if not self.count:
+            return f"{self.name}: empty"
+
+        kind = max(self.kinds, key=self.kinds.get)
+        if len(self.kinds) > 1:
+            kind = f"mostly {kind}"
+        parts = [kind, f"{self.count} values"]
+
+        if self.numbers and "number" in kind:
+            parts.append(f"min {_format_number(self.minimum)}")
+            parts.append(f"max {_format_number(self.maximum)}")
+            parts.append(f"mean {_format_number(self.total / self.numbers)}")
+        elif "date" in kind:
+            parts.append(f"from {self.first_date} to {self.last_date}")
+        else:
+            distinct = f"over {SUMMARY_MAX_DISTINCT}" if self.distinct_capped else str(len(self.distinct))
+            examples = ", ".join(list(self.distinct)[:SUMMARY_EXAMPLE_VALUES])
+            parts.append(f"{distinct} distinct, e.g. {examples}")
+
+        return f"{self.name}: " + ", ".join(parts)
+
+
+def _sheet_rows(sheet) -> Iterator[Tuple]:
+    """Non-empty rows of a read-only sheet, without trailing empty cells"""
+    if hasattr(sheet, "reset_dimensions"):
+        # Some writers store a wrong (often huge) dimension; without this,
+        # read-only sheets pad every row out to it
+        sheet.reset_dimensions()
+    for row in sheet.iter_rows(values_only=True):
+        end = len(row)
+        while end and (row[end - 1] is None or row[end - 1] == ""):
+            end -= 1
+        if end:
+            yield row[:end]
+
+
+def _is_header(row: Tuple) -> bool:
+    return all(isinstance(value, str) and value.strip() for value in row)
+
+
+def extract_sheet(
+    sheet,
+    name: str,
+    max_rows: int = XLSX_MAX_ROWS_PER_SHEET,
+    max_cells: int = XLSX_MAX_CELLS_PER_SHEET,
+    summary: str = XLSX_TABLE_SUMMARY
+) -> str:
+    """Render one sheet as rows or as a table summary, within the budgets"""
+    header: Optional[Tuple] = None
+    columns: List[ColumnStats] = []
+    lines: List[str] = []
+    samples: List[str] = []
+    rows = cells = 0
+    truncated = False
+
+    for row in _sheet_rows(sheet):
+        if not rows and len(row) > max_cells:
+            # A first row wider than the whole budget is clipped, not dropped
+            row = row[:max_cells]
+            truncated = True
+        elif rows >= max_rows or cells + len(row) > max_cells:
+            truncated = True
+            break
+        rows += 1
+        cells += len(row)
+
+        if header is None and rows == 1 and _is_header(row):
+            header = row
+            columns = [ColumnStats(value.strip()) for value in row]
+            lines.append(" | ".join(_cell_text(value) for value in row))
+            continue
+
+        while len(columns) < len(row):
+            columns.append(ColumnStats(get_column_letter(len(columns) + 1)))
+        for column, value in zip(columns, row):
+            column.add(value)
+
+        row_text = " | ".join(_cell_text(value) for value in row)
+        if len(samples) < SUMMARY_SAMPLE_ROWS:
+            samples.append(row_text)
+        if summary != "always":
+            lines.append(row_text)
+
+    title = f"=== Sheet: {name} ==="
+    if summary == "always" or (summary == "auto" and truncated):
+        data_rows = rows - (1 if header else 0)
+        scope = f"first {data_rows} rows" if truncated else f"{data_rows} rows"
+        parts = [
+            title,
+            f"Table: {scope} x {len(columns)} columns",
+            "Columns:",
+            *(f"- {column.describe()}" for column in columns),
+            "Sample rows:",
+        ]
+        if header:
+            parts.append(" | ".join(_cell_text(value) for value in header))
+        parts.extend(samples)
+        return "\n".join(parts)
+
+    if truncated:
+        lines.append(f"... [sheet truncated after {rows} rows]")
+    return "\n".join([title, *lines])
+
+
+def extract_workbook(file: BinaryIO) -> List[Tuple[str, str]]:
+    """(sheet name, text) for every worksheet of an XLSX file"""
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        return [
+            (sheet.title, extract_sheet(sheet, sheet.title))
+            for sheet in workbook.worksheets
+        ]
+    finally:
+        # Read-only workbooks keep the archive open until closed
+        workbook.close()
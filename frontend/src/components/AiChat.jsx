@@ -8,6 +8,51 @@ import remarkGfm from 'remark-gfm'
 
 const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000'
 
+// Parse a document via the NDJSON streaming endpoint, reporting each event as
+// pages arrive. Resolves with the final "done" event (same fields as /api/document/parse).
+const parseDocumentStream = async (url, onEvent) => {
+  const response = await fetch(`${API_URL}/api/document/parse-stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ url })
+  })
+  if (!response.ok) {
+    throw new Error(`Document parse failed with status ${response.status}`)
+  }
+
+  const reader = response.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+  let result = null
+
+  const handleLine = (line) => {
+    if (!line.trim()) return
+    const event = JSON.parse(line)
+    if (event.event === 'error') {
+      throw new Error(event.detail)
+    }
+    if (event.event === 'done') {
+      result = event
+    }
+    onEvent?.(event)
+  }
+
+  while (true) {
+    const { done, value } = await reader.read()
+    if (done) break
+    buffer += decoder.decode(value, { stream: true })
+    const lines = buffer.split('\n')
+    buffer = lines.pop()
+    lines.forEach(handleLine)
+  }
+  handleLine(buffer)
+
+  if (!result) {
+    throw new Error('Document parse ended unexpectedly')
+  }
+  return result
+}
+
 export default function AiChat() {
   const [isOpen, setIsOpen] = useState(false)
   const [messages, setMessages] = useState([
@@ -150,23 +195,31 @@ export default function AiChat() {
       document.body.appendChild(parsingMsg);
       
       try {
-        const response = await axios.post(`${API_URL}/api/document/parse`, {
-          url: activeTab.url
+        let unit = 'page';
+        const parsed = await parseDocumentStream(activeTab.url, (event) => {
+          if (event.event === 'start') {
+            unit = event.unit;
+          } else if (event.event === 'section' && event.progress.total > 1) {
+            const label = parsingMsg.querySelector('span');
+            if (label) {
+              label.textContent = `📄 Parsing document... ${unit} ${event.progress.done} of ${event.progress.total}`;
+            }
+          }
         });
         
         // Remove parsing indicator
         document.getElementById('doc-parsing-indicator')?.remove();
         
-        if (response.data.success) {
-          console.log(`[AiChat] Successfully parsed ${response.data.doc_type.toUpperCase()}`);
+        if (parsed.success) {
+          console.log(`[AiChat] Successfully parsed ${parsed.doc_type.toUpperCase()}`);
           
           // Show success message
           const successMsg = document.createElement('div');
           successMsg.style.cssText = parsingMsg.style.cssText.replace('#3b82f6', '#10b981');
           
-          if (response.data.is_truncated) {
+          if (parsed.is_truncated) {
             successMsg.innerHTML = `<span>✅ Document parsed (large file - showing key sections)</span>`;
-            console.log(`[AiChat] Document truncated: ${response.data.total_length} chars -> ${response.data.content.length} chars`);
+            console.log(`[AiChat] Document truncated: ${parsed.total_length} chars -> ${parsed.content.length} chars`);
           } else {
             successMsg.innerHTML = `<span>✅ Document parsed successfully!</span>`;
           }
@@ -174,16 +227,16 @@ export default function AiChat() {
           document.body.appendChild(successMsg);
           setTimeout(() => successMsg.remove(), 3000);
           
-          let result = `Document: ${response.data.title}\nType: ${response.data.doc_type.toUpperCase()}\nURL: ${activeTab.url}\n`;
+          let result = `Document: ${parsed.title}\nType: ${parsed.doc_type.toUpperCase()}\nURL: ${activeTab.url}\n`;
           
-          if (response.data.is_truncated) {
-            result += `\n⚠️ Note: This is a large document (${response.data.total_length} characters). Showing key sections for context.\n`;
+          if (parsed.is_truncated) {
+            result += `\n⚠️ Note: This is a large document (${parsed.total_length} characters). Showing key sections for context.\n`;
           }
           
-          result += `\nContent:\n${response.data.content}`;
+          result += `\nContent:\n${parsed.content}`;
           
           // Store in vector database (full content is already stored by backend)
-          storePageInVector(activeTab.url, response.data.title, response.data.content, `${response.data.doc_type} document`);
+          storePageInVector(activeTab.url, parsed.title, parsed.content, `${parsed.doc_type} document`);
           
           return result;
         }
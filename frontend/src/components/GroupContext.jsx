@@ -3,6 +3,7 @@ import { X, Users, Plus, Copy, Check, LogOut, Trash2, RefreshCw, ArrowLeft } fro
 import axios from 'axios'
 
 const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000'
+const WS_URL = import.meta.env.VITE_WS_URL || API_URL.replace(/^http/, 'ws') + '/ws'
 
 export default function GroupContext({ isOpen, onClose }) {
   const [groups, setGroups] = useState([])
@@ -24,13 +25,69 @@ export default function GroupContext({ isOpen, onClose }) {
   }, [isOpen])
 
   useEffect(() => {
-    if (activeGroup) {
-      loadGroupContexts(activeGroup.id)
-      // Auto-refresh contexts every 10 seconds when group is active
-      const interval = setInterval(() => {
-        loadGroupContexts(activeGroup.id)
-      }, 10000)
-      return () => clearInterval(interval)
+    if (!activeGroup) return
+
+    loadGroupContexts(activeGroup.id)
+
+    // Receive new contexts as they are shared instead of polling.
+    // Fall back to polling only while the socket is unavailable.
+    const userId = localStorage.getItem('user_id') || 'default_user'
+    let socket = null
+    let pollInterval = null
+    let reconnectTimeout = null
+    let closed = false
+
+    const startPolling = () => {
+      if (pollInterval) return
+      pollInterval = setInterval(() => loadGroupContexts(activeGroup.id), 10000)
+    }
+
+    const stopPolling = () => {
+      clearInterval(pollInterval)
+      pollInterval = null
+    }
+
+    const connect = () => {
+      socket = new WebSocket(`${WS_URL}?user_id=${encodeURIComponent(userId)}`)
+
+      socket.onopen = () => {
+        socket.send(JSON.stringify({ action: 'subscribe', group_id: activeGroup.id }))
+      }
+
+      socket.onmessage = (event) => {
+        const message = JSON.parse(event.data)
+        if (message.group_id !== activeGroup.id) return
+
+        if (message.type === 'subscribed') {
+          stopPolling()
+          // Catch up on anything shared while disconnected
+          loadGroupContexts(activeGroup.id)
+        } else if (message.type === 'context_added') {
+          setGroupContexts(prev =>
+            prev.some(ctx => ctx.id === message.context.id) ? prev : [message.context, ...prev]
+          )
+        } else if (message.type === 'context_deleted') {
+          setGroupContexts(prev => prev.filter(ctx => ctx.id !== message.context_id))
+        } else if (message.type === 'group_deleted') {
+          setActiveGroup(null)
+          loadGroups()
+        }
+      }
+
+      socket.onclose = () => {
+        if (closed) return
+        startPolling()
+        reconnectTimeout = setTimeout(connect, 5000)
+      }
+    }
+
+    connect()
+
+    return () => {
+      closed = true
+      stopPolling()
+      clearTimeout(reconnectTimeout)
+      if (socket) socket.close()
     }
   }, [activeGroup])
 
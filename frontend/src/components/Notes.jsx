@@ -56,9 +56,21 @@ export default function Notes({ isOpen, onClose }) {
     }
   }
 
-  const handleEdit = (note) => {
+  const handleEdit = async (note) => {
+    let content = note.content
+    if (note.truncated) {
+      // Long notes are listed as a preview; load the full text before editing
+      try {
+        const response = await axios.get(`${API_URL}/api/notes/${note._id}`)
+        content = response.data.note.content
+      } catch (error) {
+        console.error('Error loading note:', error)
+        alert('Failed to load note')
+        return
+      }
+    }
     setEditingNote(note._id)
-    setEditContent(note.content)
+    setEditContent(content)
   }
 
   const handleSaveEdit = async (noteId) => {
@@ -67,7 +79,7 @@ export default function Notes({ isOpen, onClose }) {
         content: editContent
       })
       setNotes(notes.map(note => 
-        note._id === noteId ? { ...note, content: editContent } : note
+        note._id === noteId ? { ...note, content: editContent, truncated: false } : note
       ))
       setEditingNote(null)
       setEditContent('')
@@ -244,7 +256,7 @@ export default function Notes({ isOpen, onClose }) {
                         </div>
                       </div>
                     ) : (
-                      <p className="text-sm whitespace-pre-wrap break-words mb-3">{note.content}</p>
+                      <p className="text-sm whitespace-pre-wrap break-words mb-3">{note.content}{note.truncated && '…'}</p>
                     )}
 
                     {/* Metadata */}
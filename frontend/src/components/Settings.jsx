@@ -46,10 +46,18 @@ export default function Settings({ isOpen, onClose, onNotesClick, onQuizClick, o
 
   const loadBookmarks = async () => {
     try {
-      const response = await axios.get(`${API_URL}/api/data/bookmarks`)
-      if (response.data.success) {
-        setBookmarks(response.data.bookmarks)
-      }
+      // Bookmarks are paginated; follow next_cursor to load them all
+      let allBookmarks = []
+      let cursor = null
+      do {
+        const response = await axios.get(`${API_URL}/api/data/bookmarks`, {
+          params: { limit: 500, cursor }
+        })
+        if (!response.data.success) break
+        allBookmarks = allBookmarks.concat(response.data.bookmarks)
+        cursor = response.data.next_cursor
+      } while (cursor)
+      setBookmarks(allBookmarks)
     } catch (error) {
       console.error('Error loading bookmarks:', error)
     }